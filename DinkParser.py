@@ -26,22 +26,23 @@ if BINGO_API_BASE.endswith('/drop'):
 
 DROP_API_KEY = os.environ.get('DROP_API_KEY', 'your_secret_drop_key_here')
 
-def send_to_bingo_api(player_name, item_name, drop_type='loot', source=None, value=0, value_string='', rarity=None):
-    """Send drop to bingo board API with value information"""
+def send_drops_to_bingo_api(player_name, items, drop_type='loot', source=None):
+    """
+    Send every item from one Dink loot message to the bingo API in a single
+    request (/drops/batch) rather than one /drop call per item.
+    items: [{'item', 'value', 'value_string', 'rarity', 'idempotency_key'}, ...]
+    """
     try:
-        response = requests.post(f"{BINGO_API_BASE}/drop",
+        response = requests.post(f"{BINGO_API_BASE}/drops/batch",
             headers={
                 'Content-Type': 'application/json',
                 'X-API-Key': DROP_API_KEY
             },
             json={
                 'player': player_name,
-                'item': item_name,
                 'drop_type': drop_type,
                 'source': source,
-                'value': value,  # ← NEW: Send numeric value
-                'value_string': value_string,  # ← NEW: Send original text (e.g., "2.95M")
-                'rarity': rarity  # Raw "1 in X" text from Dink's Item Rarity/Rank field, when known
+                'items': items
             },
             timeout=5)
 
@@ -53,6 +54,9 @@ def send_to_bingo_api(player_name, item_name, drop_type='loot', source=None, val
                     print(f"   Tile {tile['tile']}: {', '.join(tile['items'])} ({tile['value']} points)")
             else:
                 print(f"ℹ️  Bingo API: {result.get('message')}")
+        elif response.status_code == 202:
+            # API is in async ingest mode - the drops are queued, tile results aren't known yet
+            print(f"📥 Bingo API: queued {len(items)} item(s) (ingest {response.json().get('ingest_id')})")
         elif response.status_code == 401:
             print(f"❌ Bingo API: Unauthorized - Check DROP_API_KEY environment variable")
         else:
@@ -63,7 +67,8 @@ def send_to_bingo_api(player_name, item_name, drop_type='loot', source=None, val
         print(f"❌ Bingo API error: {e}")
 
 
-def send_to_history_only(player_name, item_name, drop_type='loot', source=None, timestamp=None, value=0, value_string='', rarity=None):
+def send_to_history_only(player_name, item_name, drop_type='loot', source=None, timestamp=None, value=0, value_string='', rarity=None,
+                         idempotency_key=None):
     """Send drop to history-only endpoint (no tile checking)"""
     try:
         response = requests.post(f"{BINGO_API_BASE}/history-only",
@@ -79,7 +84,8 @@ def send_to_history_only(player_name, item_name, drop_type='loot', source=None,
                                      'timestamp': timestamp or datetime.utcnow().isoformat(),
                                      'value': value,
                                      'value_string': value_string,
-                                     'rarity': rarity
+                                     'rarity': rarity,
+                                     'idempotency_key': idempotency_key
                                  },
                                  timeout=5)
 
@@ -92,7 +98,7 @@ def send_to_history_only(player_name, item_name, drop_type='loot', source=None,
         return False, False
 
 
-def send_death_to_api(player_name, npc=None, timestamp=None):
+def send_death_to_api(player_name, npc=None, timestamp=None, idempotency_key=None):
     """Send death to bingo board API"""
     try:
         response = requests.post(f"{BINGO_API_BASE}/death",
@@ -103,11 +109,12 @@ def send_death_to_api(player_name, npc=None, timestamp=None):
                                  json={
                                      'player': player_name,
                                      'npc': npc,
-                                     'timestamp': timestamp or datetime.utcnow().isoformat()
+                                     'timestamp': timestamp or datetime.utcnow().isoformat(),
+                                     'idempotency_key': idempotency_key
                                  },
                                  timeout=5)
 
-        if response.status_code == 200:
+        if response.status_code in (200, 202):  # 202 = queued by the API's async ingest mode
             result = response.json()
             if result.get('success'):
                 npc_text = f" to {npc}" if npc else ""
@@ -242,6 +249,7 @@ def parse_pb_embed(embed, message):
       2. Any raid/boss completion that includes a time field
     """
     pb_info = {
+        'message_id': str(message.id),
         'timestamp': message.created_at.isoformat(),
         'player': None,
         'boss': None,
@@ -345,7 +353,8 @@ def parse_pb_embed(embed, message):
     return pb_info if pb_info['player'] else None
 
 
-def send_pb_to_api(player_name, boss_name, time_seconds, time_string, party_size=1, invocation_level=None, timestamp=None):
+def send_pb_to_api(player_name, boss_name, time_seconds, time_string, party_size=1, invocation_level=None, timestamp=None,
+                   idempotency_key=None):
     """Send personal best to bingo board API"""
     payload = {
         'player': player_name,
@@ -354,7 +363,8 @@ def send_pb_to_api(player_name, boss_name, time_seconds, time_string, party_size
         'time_string': time_string,
         'party_size': party_size,
         'invocation_level': invocation_level,
-        'timestamp': timestamp or datetime.utcnow().isoformat()
+        'timestamp': timestamp or datetime.utcnow().isoformat(),
+        'idempotency_key': idempotency_key
     }
     headers = {'Content-Type': 'application/json', 'X-API-Key': DROP_API_KEY}
     for attempt in range(3):
@@ -374,6 +384,9 @@ def send_pb_to_api(player_name, boss_name, time_seconds, time_string, party_size
                           + (f" @ invoc {invocation_level}" if invocation_level else "")
                           + f" (party {party_size})")
                     return True, False
+            elif response.status_code == 202:
+                # Queued by the API's async ingest mode - duplicates are filtered when it's written
+                return True, False
             elif response.status_code in (502, 503, 504):
                 print(f"⚠️  PB API {response.status_code} on attempt {attempt + 1}, retrying...")
                 time.sleep(3 * (attempt + 1))
@@ -533,22 +546,28 @@ async def on_message(message):
                 # 1:1 to a single item — for multi-item messages we can't fairly attribute
                 # either back to one line, so both fall back only in the single-item case.
                 is_single_item = len(drop_data['items']) == 1
-                for item in drop_data['items']:
+                batch = []
+                for item_index, item in enumerate(drop_data['items']):
                     item_value = item.get('value_numeric', 0)
                     item_value_string = item.get('value', '')
                     if is_single_item and not item_value and drop_data.get('total_value_numeric'):
                         item_value = drop_data['total_value_numeric']
                         item_value_string = drop_data.get('total_value', '') or item_value_string
 
-                    send_to_bingo_api(
-                        player_name=drop_data['player'],
-                        item_name=item['name'],
-                        drop_type=drop_type,  # ← PASS THE DROP TYPE
-                        source=drop_data.get('source'),
-                        value=item_value,
-                        value_string=item_value_string,
-                        rarity=drop_data.get('rarity') if is_single_item else None
-                    )
+                    batch.append({
+                        'item': item['name'],
+                        'value': item_value,
+                        'value_string': item_value_string,
+                        'rarity': drop_data.get('rarity') if is_single_item else None,
+                        'idempotency_key': drop_idempotency_key(drop_data, item_index)
+                    })
+
+                send_drops_to_bingo_api(
+                    player_name=drop_data['player'],
+                    items=batch,
+                    drop_type=drop_type,
+                    source=drop_data.get('source')
+                )
 
             save_drop_to_file(drop_data)
 
@@ -575,7 +594,8 @@ async def on_message(message):
                 time_string=pb_data['time_string'],
                 party_size=pb_data['party_size'],
                 invocation_level=pb_data.get('invocation_level'),
-                timestamp=pb_data['timestamp']
+                timestamp=pb_data['timestamp'],
+                idempotency_key=pb_data['message_id']
             )
 
     # Check for Player Death
@@ -590,12 +610,23 @@ async def on_message(message):
                 print(f"Cause: {death_data['npc']}")
             print(f"{'=' * 50}\n")
 
-            send_death_to_api(death_data['player'], death_data.get('npc'), death_data['timestamp'])
+            send_death_to_api(death_data['player'], death_data.get('npc'), death_data['timestamp'],
+                              idempotency_key=death_data['message_id'])
+
+
+def drop_idempotency_key(drop_data, item_index):
+    """
+    Idempotency key for one item of a Dink drop message: the Discord message id
+    plus the item's position, so re-imports and retries of the same message are
+    recognised by the API while two identical items in one message are not.
+    """
+    return f"{drop_data['message_id']}:{item_index}"
 
 
 def parse_drop_embed(embed, message):
     """Extract all information from the Dink embed"""
     drop_info = {
+        'message_id': str(message.id),
         'timestamp': datetime.now().isoformat(),
         'player': None,
         'items': [],
@@ -692,6 +723,7 @@ def parse_drop_embed(embed, message):
 def parse_death_embed(embed, message):
     """Extract player name and NPC from death notification"""
     death_info = {
+        'message_id': str(message.id),
         'timestamp': message.created_at.isoformat(),
         'player': None,
         'npc': None
@@ -874,7 +906,7 @@ async def import_history(ctx, channel_id: str = None, limit: int = 1000):
 
                         if drop_data['player'] and drop_data['items']:
                             is_single_item = len(drop_data['items']) == 1
-                            for item in drop_data['items']:
+                            for item_index, item in enumerate(drop_data['items']):
                                 item_value = item.get('value_numeric', 0)
                                 item_value_string = item.get('value', '')
                                 if is_single_item and not item_value and drop_data.get('total_value_numeric'):
@@ -889,7 +921,8 @@ async def import_history(ctx, channel_id: str = None, limit: int = 1000):
                                     timestamp=drop_data['timestamp'],
                                     value=item_value,
                                     value_string=item_value_string,
-                                    rarity=drop_data.get('rarity') if is_single_item else None
+                                    rarity=drop_data.get('rarity') if is_single_item else None,
+                                    idempotency_key=drop_idempotency_key(drop_data, item_index)
                                 )
 
                                 if success:
@@ -1116,7 +1149,8 @@ async def import_deaths(ctx, channel_id: str = None, limit: int = 5000):
                         success = send_death_to_api(
                             death_data['player'],
                             npc=death_data.get('npc'),
-                            timestamp=death_data['timestamp']
+                            timestamp=death_data['timestamp'],
+                            idempotency_key=death_data['message_id']
                         )
 
                         if success:
@@ -1324,7 +1358,8 @@ async def import_pbs(ctx, channel_id: str = None, limit: int = 5000):
                 time_string=pb_data['time_string'],
                 party_size=pb_data['party_size'],
                 invocation_level=pb_data.get('invocation_level'),
-                timestamp=pb_data['timestamp']
+                timestamp=pb_data['timestamp'],
+                idempotency_key=pb_data['message_id']
             )
 
             if success:
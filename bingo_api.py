@@ -1,23 +1,44 @@
-from flask import Flask, jsonify, request, Response
+from flask import Flask, jsonify, request, Response, g, has_request_context
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from werkzeug.security import check_password_hash
 import json
 import os
+import sys
 import re
+import click
+import copy
 import csv
 import io
-from datetime import datetime, timedelta
-from pymongo import MongoClient
+from datetime import datetime, timedelta, timezone
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from bson import ObjectId
 import requests
+import atexit
+import base64
+import queue
 import random
+import secrets
+import signal
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 try:
     import cloudscraper
     HAS_CLOUDSCRAPER = True
 except ImportError:
     HAS_CLOUDSCRAPER = False
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
 
 app = Flask(__name__)
 CORS(app)  # Allow cross-origin requests from GitHub Pages
@@ -44,6 +65,9 @@ tenants_collection = db['tenants']
 # Default tenant (your personal board - backward compatibility)
 DEFAULT_TENANT_ID = 'unsociables_001'
 
+# Shared WiseOldMan response cache (see fetch_osrs_highscores)
+wom_cache_collection = db['wom_cache']
+
 # Legacy collections (kept for backward compatibility during transition)
 bingo_collection = db['bingo_board']
 history_collection = db['drop_history']
@@ -51,19 +75,141 @@ deaths_collection = db['deaths']
 rank_history_collection = db['rank_history']
 
 
+# Tenant lookups happen on every request (often two or three times - see
+# get_tenant_from_request/get_tenant_collections), and /bingo alone is polled
+# every few seconds by every open browser, but tenant docs themselves only
+# change when someone runs the credential/migration scripts. So lookups are
+# served from a small in-process cache keyed by (field, value) for any of the
+# three ways a tenant is identified. One fetched doc is stored under all three
+# keys so an api_key lookup also warms the later tenant_id lookup.
+#
+# "Not found" results are cached too (e.g. the GitHub Pages origin, whose
+# subdomain never matches a tenant), except for api keys, so a client spraying
+# random keys can't fill the cache. TENANT_CACHE_MAX_ENTRIES is a crude bound:
+# when it's hit the whole cache is dropped and refilled on demand.
+# Edits made outside this process only show up once the TTL lapses; changes
+# made from inside it go through update_tenant(), which evicts the tenant.
+# Callers get their own copy of the cached doc, so mutating one (its
+# nested settings included) can't leak into the next request.
+TENANT_CACHE_TTL_SECONDS = float(os.environ.get('TENANT_CACHE_TTL_SECONDS', 60))
+TENANT_CACHE_MAX_ENTRIES = 1024
+
+_tenant_cache = {}  # (field, value) -> (expires_at, tenant doc or None)
+_tenant_cache_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+_tenant_cache_lock = threading.Lock()
+
+
+def _store_tenant_in_cache(tenant, expires_at):
+    if len(_tenant_cache) >= TENANT_CACHE_MAX_ENTRIES:
+        _tenant_cache.clear()
+    for field in ('tenant_id', 'api_key', 'subdomain'):
+        value = tenant.get(field)
+        if value:
+            _tenant_cache[(field, value)] = (expires_at, tenant)
+
+
+def _cached_tenant_lookup(field, value):
+    """find_one on tenants_collection by a single field, served from the TTL cache when fresh."""
+    key = (field, value)
+    now = time.monotonic()
+    with _tenant_cache_lock:
+        entry = _tenant_cache.get(key)
+        if entry and entry[0] > now:
+            _tenant_cache_stats['hits'] += 1
+            return copy.deepcopy(entry[1])
+        _tenant_cache_stats['misses'] += 1
+
+    tenant = tenants_collection.find_one({field: value})
+
+    expires_at = now + TENANT_CACHE_TTL_SECONDS
+    with _tenant_cache_lock:
+        if tenant:
+            _store_tenant_in_cache(tenant, expires_at)
+        elif field != 'api_key':
+            if len(_tenant_cache) >= TENANT_CACHE_MAX_ENTRIES:
+                _tenant_cache.clear()
+            _tenant_cache[key] = (expires_at, None)
+    return copy.deepcopy(tenant)
+
+
+def invalidate_tenant_cache(tenant_id=None):
+    """
+    Drop cached tenant lookups - every entry for one tenant_id (covering its
+    api_key/subdomain keys too), or the whole cache if tenant_id is None.
+    """
+    with _tenant_cache_lock:
+        if tenant_id is None:
+            _tenant_cache.clear()
+        else:
+            stale = [key for key, (_, tenant) in _tenant_cache.items()
+                     if tenant and tenant.get('tenant_id') == tenant_id]
+            for key in stale:
+                del _tenant_cache[key]
+        _tenant_cache_stats['invalidations'] += 1
+
+
+def update_tenant(tenant_id, fields, unset=()):
+    """$set fields (and $unset `unset`) on a tenant doc and drop its cached lookups (old api_key included)."""
+    update = {'$set': fields} if fields else {}
+    if unset:
+        update['$unset'] = {field: '' for field in unset}
+    result = tenants_collection.update_one({'tenant_id': tenant_id}, update)
+    invalidate_tenant_cache(tenant_id)
+    return result.matched_count > 0
+
+
+def get_tenant_cache_stats():
+    with _tenant_cache_lock:
+        return {**_tenant_cache_stats, 'entries': len(_tenant_cache), 'ttl_seconds': TENANT_CACHE_TTL_SECONDS}
+
+
 def get_tenant_by_id(tenant_id):
     """Get tenant document by ID"""
-    return tenants_collection.find_one({'tenant_id': tenant_id})
+    return _cached_tenant_lookup('tenant_id', tenant_id)
 
 
 def get_tenant_by_api_key(api_key):
     """Get tenant by API key"""
-    return tenants_collection.find_one({'api_key': api_key})
+    return _cached_tenant_lookup('api_key', api_key)
 
 
 def get_tenant_by_subdomain(subdomain):
     """Get tenant by subdomain"""
-    return tenants_collection.find_one({'subdomain': subdomain.lower()})
+    return _cached_tenant_lookup('subdomain', subdomain.lower())
+
+
+@app.cli.command('rotate-api-key')
+@click.argument('subdomain')
+def rotate_api_key_command(subdomain):
+    """Give a tenant (by subdomain) a new random api_key; the old one stops working."""
+    tenant = get_tenant_by_subdomain(subdomain)
+    if not tenant:
+        print(f"[X] No tenant with subdomain {subdomain!r}")
+        return
+    api_key = secrets.token_urlsafe(32)
+    update_tenant(tenant['tenant_id'], {'api_key': api_key})
+    print(f"[OK] {subdomain}: new api_key {api_key}")
+    print("[!] Other API processes keep accepting the old key for up to TENANT_CACHE_TTL_SECONDS")
+
+
+@app.cli.command('set-wom-group')
+@click.argument('subdomain')
+@click.argument('group_id')
+def set_wom_group_command(subdomain, group_id):
+    """Track a tenant's clan as WiseOldMan group GROUP_ID for KC snapshots ("none" to stop)."""
+    tenant = get_tenant_by_subdomain(subdomain)
+    if not tenant:
+        print(f"[X] No tenant with subdomain {subdomain!r}")
+        return
+    if group_id.lower() == 'none':
+        update_tenant(tenant['tenant_id'], {}, unset=['settings.wom_group_id'])
+        print(f"[OK] {subdomain}: WOM group cleared")
+        return
+    if not group_id.isdigit():
+        print(f"[X] WOM group ids are numeric, got {group_id!r}")
+        return
+    update_tenant(tenant['tenant_id'], {'settings.wom_group_id': int(group_id)})
+    print(f"[OK] {subdomain}: KC snapshots now read WOM group {group_id}")
 
 
 def get_tenant_from_request():
@@ -82,6 +228,15 @@ def get_tenant_from_request():
     function alone - see get_authenticated_tenant_by_api_key/
     get_authenticated_tenant/verify_admin_password for the write path.
     """
+    # Memoized on flask.g: handlers and the helpers they call (load_bingo_data,
+    # is_within_event_window, ...) all ask "which tenant is this?" separately.
+    if 'request_tenant' in g:
+        return g.request_tenant
+    g.request_tenant = _resolve_tenant_from_request()
+    return g.request_tenant
+
+
+def _resolve_tenant_from_request():
     # Check for API key in header
     api_key = request.headers.get('X-API-Key') or request.headers.get('Authorization')
     if api_key:
@@ -167,39 +322,344 @@ def get_authenticated_tenant():
 # by player) all over this file - without an index that's a full collection
 # scan plus an in-memory sort on every request, which gets slow (and on
 # Atlas's free M0 tier, can hit its 32MB in-memory sort limit) as history grows.
-# Indexes are created lazily, once per tenant per process, the first time that
-# tenant's collections are touched - avoids a separate migration step while
-# keeping these queries fast. create_index() is a no-op if the index already
-# exists, so this is safe to (rarely) call more than once.
-_indexed_tenant_subdomains = set()
+#
+# Every index the app relies on is declared here, next to the query that needs
+# it, rather than being created ad hoc. They're applied to every tenant in a
+# background thread when the API starts (see bootstrap_indexes below) and can
+# be (re)applied or audited on demand with the `flask --app bingo_api
+# ensure-indexes` / `index-report` commands. A tenant created while the API is
+# running gets its indexes in a background thread the first time its context
+# is built (see schedule_tenant_indexes) - the unique ones back ingest_key
+# dedupe and the kc_latest upsert, so they can't wait for a restart. Each
+# process does that once per tenant, tenants the startup pass covers are
+# left to it, and a failed attempt isn't retried for
+# TENANT_INDEX_RETRY_SECONDS, so no request waits on index builds.
+# create_index() is a no-op if the index already exists, so all of this is
+# safe to re-run.
+
+# Idempotency keys on ingested docs - see insert_ingest_docs
+INGEST_KEY_INDEX = {
+    'keys': [('ingest_key', 1)],
+    'options': {'unique': True, 'partialFilterExpression': {'ingest_key': {'$exists': True}}}
+}
 
+# Change feed position - see /export/<dataset>/changes
+CHANGE_FEED_INDEX = {'keys': [('changed_at', 1), ('_id', 1)]}
+
+TENANT_INDEXES = {
+    'history': [
+        # /history pages on (timestamp, _id), optionally for one player
+        {'keys': [('timestamp', -1), ('_id', -1)]},
+        {'keys': [('player', 1), ('timestamp', -1), ('_id', -1)]},
+        # check_duplicate_in_history / backfill_rarity: player + item + time window
+        {'keys': [('player', 1), ('item', 1), ('timestamp', -1)]},
+        # /history?search= exact/prefix modes and /kc/notable-drops (see history_search_filter)
+        {'keys': [('item_key', 1), ('timestamp', -1)]},
+        # /kc/notable-drops: real drops of an item (see link_drop_twins)
+        {'keys': [('item_key', 1), ('is_primary', 1)]},
+        # /history?search_mode=text: word search within item names
+        {'keys': [('item', 'text')], 'options': {'name': 'item_text'}},
+        INGEST_KEY_INDEX,
+        CHANGE_FEED_INDEX,
+    ],
+    'deaths': [
+        {'keys': [('timestamp', -1)]},
+        {'keys': [('player', 1)]},
+        # /deaths/by-npc: match on npc, newest first per npc
+        {'keys': [('npc', 1), ('timestamp', -1)]},
+        INGEST_KEY_INDEX,
+        CHANGE_FEED_INDEX,
+    ],
+    'rank_history': [
+        {'keys': [('timestamp', -1)]},
+        CHANGE_FEED_INDEX,
+    ],
+    'kc': [
+        {'keys': [('player', 1), ('timestamp', -1)]},
+        # /kc/effort + event recap: latest 'start'/'current' snapshot per player
+        {'keys': [('snapshot_type', 1), ('player', 1), ('timestamp', -1)]},
+        # Delta reconstruction: every delta chained off a keyframe, in order
+        {'keys': [('base_id', 1), ('timestamp', 1), ('_id', 1)],
+         'options': {'partialFilterExpression': {'base_id': {'$exists': True}}}},
+        CHANGE_FEED_INDEX,
+    ],
+    'personal_bests': [
+        {'keys': [('player', 1), ('boss', 1)]},
+        {'keys': [('time_seconds', 1)]},
+        INGEST_KEY_INDEX,
+        CHANGE_FEED_INDEX,
+    ],
+    'archive': [
+        {'keys': [('archived_at', -1)]},
+    ],
+    'history_daily': [
+        # One rollup row per bucket (see rollup_history_docs); also serves day-range scans
+        {'keys': [('day', 1), ('player', 1), ('item', 1), ('drop_type', 1)], 'options': {'unique': True}},
+    ],
+    'kc_latest': [
+        # One row per player (see upsert_kc_latest)
+        {'keys': [('player', 1)], 'options': {'unique': True}},
+        # /kc/leaderboards cache version: newest row change
+        {'keys': [('changed_at', -1)]},
+    ],
+}
 
-def _ensure_tenant_indexes(collections, subdomain):
-    if subdomain in _indexed_tenant_subdomains:
-        return
+# Indexes on shared (non-tenant) collections, keyed by collection name.
+GLOBAL_INDEXES = {
+    'tenants': [
+        {'keys': [('api_key', 1)]},
+        {'keys': [('subdomain', 1)]},
+        {'keys': [('tenant_id', 1)]},
+    ],
+    'wom_cache': [
+        # Entries are only served while fresh (WOM_CACHE_TTL_SECONDS); let Mongo drop old ones
+        {'keys': [('fetched_at', 1)], 'options': {'expireAfterSeconds': 86400}},
+    ],
+}
+
+
+def tenant_collections_for_subdomain(subdomain):
+    """Collection handles for a tenant, by the subdomain its collections are named after."""
+    return {
+        'bingo': db[f'tenant_{subdomain}_bingo'],
+        'history': db[f'tenant_{subdomain}_history'],
+        'deaths': db[f'tenant_{subdomain}_deaths'],
+        'rank_history': db[f'tenant_{subdomain}_rank_history'],
+        'kc': db[f'tenant_{subdomain}_kc'],
+        'personal_bests': db[f'tenant_{subdomain}_personal_bests'],
+        'archive': db[f'tenant_{subdomain}_archive'],
+        'history_daily': db[f'tenant_{subdomain}_history_daily'],
+        'kc_latest': db[f'tenant_{subdomain}_kc_latest']
+    }
+
+
+def _all_tenant_subdomains():
+    return sorted({t['subdomain'] for t in tenants_collection.find({}, {'subdomain': 1}) if t.get('subdomain')})
+
+
+def tenant_cli_command(name):
+    """
+    Register a `flask --app bingo_api <name> [SUBDOMAIN]` maintenance command.
+    The decorated fn(subdomain, collections) runs for that one tenant, or for
+    every tenant when SUBDOMAIN is left out; its docstring is the help text.
+    """
+    def decorator(fn):
+        @click.argument('subdomain', required=False)
+        def command(subdomain=None):
+            for tenant_subdomain in ([subdomain] if subdomain else _all_tenant_subdomains()):
+                fn(tenant_subdomain, tenant_collections_for_subdomain(tenant_subdomain))
+
+        help_text = f"{fn.__doc__.strip()} Runs for the tenant with SUBDOMAIN, or every tenant if omitted."
+        app.cli.command(name, help=help_text)(command)
+        return fn
+    return decorator
+
+
+def _registered_index_targets():
+    """(label, collection, index specs) for every collection in the registry, across all tenants."""
+    targets = [(name, db[name], specs) for name, specs in GLOBAL_INDEXES.items()]
+    for subdomain in _all_tenant_subdomains():
+        collections = tenant_collections_for_subdomain(subdomain)
+        for key, specs in TENANT_INDEXES.items():
+            targets.append((collections[key].name, collections[key], specs))
+    return targets
+
+
+def ensure_all_indexes():
+    """Create every registered index on every tenant. Returns {collection name: error or 'ok'}."""
+    results = {}
+    for label, collection, specs in _registered_index_targets():
+        try:
+            for spec in specs:
+                collection.create_index(spec['keys'], **spec.get('options', {}))
+            results[label] = 'ok'
+        except Exception as e:
+            results[label] = str(e)
+            print(f"[!] Failed to create indexes on '{label}': {e}")
+    for subdomain in _all_tenant_subdomains():
+        if all(results.get(f'tenant_{subdomain}_{key}') == 'ok' for key in TENANT_INDEXES):
+            with _indexed_subdomains_lock:
+                _indexed_subdomains.add(subdomain)
+    return results
+
+
+_indexed_subdomains = set()  # tenants whose TENANT_INDEXES this process has ensured
+_bootstrap_subdomains = set()  # tenants the startup pass (bootstrap_indexes) covers
+_pending_subdomains = set()  # tenants with a schedule_tenant_indexes thread running
+_index_retry_at = {}  # subdomain -> time.monotonic() before which a failed attempt isn't retried
+_indexed_subdomains_lock = threading.Lock()
+TENANT_INDEX_RETRY_SECONDS = 300
+
+
+def ensure_tenant_indexes(subdomain):
+    """
+    Create the registered TENANT_INDEXES for one tenant, once per process,
+    and put its history_daily rollup into use if it has no history yet.
+    Returns True when done.
+    """
+    with _indexed_subdomains_lock:
+        if subdomain in _indexed_subdomains:
+            return True
+    collections = tenant_collections_for_subdomain(subdomain)
     try:
-        collections['history'].create_index([('timestamp', -1)])
-        collections['history'].create_index([('player', 1)])
-        collections['deaths'].create_index([('timestamp', -1)])
-        collections['deaths'].create_index([('player', 1)])
-        collections['rank_history'].create_index([('timestamp', -1)])
-        collections['kc'].create_index([('player', 1), ('timestamp', -1)])
-        collections['personal_bests'].create_index([('player', 1), ('boss', 1)])
-        collections['personal_bests'].create_index([('time_seconds', 1)])
-        _indexed_tenant_subdomains.add(subdomain)
+        for key, specs in TENANT_INDEXES.items():
+            for spec in specs:
+                collections[key].create_index(spec['keys'], **spec.get('options', {}))
+        init_history_daily(collections, rebuild=False)
     except Exception as e:
         print(f"[!] Failed to create indexes for tenant '{subdomain}': {e}")
+        return False
+    with _indexed_subdomains_lock:
+        _indexed_subdomains.add(subdomain)
+    return True
 
 
-def get_tenant_collections(tenant_id=None):
+def schedule_tenant_indexes(subdomain):
     """
-    Get MongoDB collections for a specific tenant.
-    Returns dict with all tenant-specific collections.
+    Run ensure_tenant_indexes for a tenant in a background thread, unless this
+    process has done it already, the startup pass covers the tenant, a run is
+    in progress, or the last one failed less than TENANT_INDEX_RETRY_SECONDS ago.
     """
-    if tenant_id is None:
-        tenant = get_tenant_from_request()
-        tenant_id = tenant['tenant_id'] if tenant else DEFAULT_TENANT_ID
+    with _indexed_subdomains_lock:
+        if (subdomain in _indexed_subdomains or subdomain in _bootstrap_subdomains
+                or subdomain in _pending_subdomains
+                or time.monotonic() < _index_retry_at.get(subdomain, 0)):
+            return
+        _pending_subdomains.add(subdomain)
+
+    def run():
+        done = False
+        try:
+            done = ensure_tenant_indexes(subdomain)
+        finally:
+            with _indexed_subdomains_lock:
+                _pending_subdomains.discard(subdomain)
+                if not done:
+                    _index_retry_at[subdomain] = time.monotonic() + TENANT_INDEX_RETRY_SECONDS
+
+    threading.Thread(target=run, name=f'tenant-indexes-{subdomain}', daemon=True).start()
+
+
+def index_report():
+    """
+    Per collection: registered indexes that don't exist yet ('missing'), and
+    existing indexes with no recorded use since the server last restarted
+    ('unused', from $indexStats - so only meaningful on a long-running
+    cluster). _id_ is ignored.
+    """
+    report = {}
+    for label, collection, specs in _registered_index_targets():
+        try:
+            existing = {name: [tuple(k) for k in info['key']]
+                        for name, info in collection.index_information().items() if name != '_id_'}
+            # Text indexes are stored under internal keys, so those are matched by name
+            missing = [spec['keys'] for spec in specs
+                       if [tuple(k) for k in spec['keys']] not in existing.values()
+                       and spec.get('options', {}).get('name') not in existing]
+            try:
+                usage = {s['name']: s['accesses']['ops'] for s in collection.aggregate([{'$indexStats': {}}])}
+            except Exception:
+                usage = {}  # $indexStats needs clusterMonitor on some Atlas tiers
+            unused = sorted(name for name in existing if usage.get(name) == 0)
+            report[label] = {'missing': missing, 'unused': unused, 'existing': sorted(existing)}
+        except Exception as e:
+            report[label] = {'error': str(e)}
+    return report
+
+
+def bootstrap_indexes():
+    with _indexed_subdomains_lock:
+        _bootstrap_subdomains.update(_all_tenant_subdomains())
+    results = ensure_all_indexes()
+    failed = [label for label, status in results.items() if status != 'ok']
+    print(f"[OK] Indexes ensured on {len(results) - len(failed)}/{len(results)} collections")
+    backfilled = backfill_item_keys()
+    if backfilled:
+        print(f"[OK] Backfilled item_key on {backfilled} history docs")
+    backfilled = backfill_changed_at()
+    if backfilled:
+        print(f"[OK] Backfilled changed_at on {backfilled} docs")
+    for subdomain in _all_tenant_subdomains():
+        collections = tenant_collections_for_subdomain(subdomain)
+        converted = backfill_history_timestamps(collections)
+        if converted:
+            print(f"[OK] {subdomain}: converted {converted} string history timestamps")
+        linked = 0
+        if collections['history'].find_one({'is_primary': {'$exists': False}}, {'_id': 1}):
+            linked = link_all_drop_twins(collections)
+            print(f"[OK] {subdomain}: linked {linked} loot/collection_log history docs")
+        if (converted or linked) and history_daily_ready(collections):
+            rebuild_history_daily(collections)  # rows moved day or changed is_primary
+        rows = init_history_daily(collections)
+        if rows:
+            print(f"[OK] {subdomain}: history_daily built ({rows} rows)")
+        if kc_latest_needs_rebuild(collections):
+            print(f"[OK] {subdomain}: kc_latest rebuilt for {rebuild_kc_latest(collections)} players")
+
+
+def backfill_item_keys(subdomains=None):
+    """
+    Set item_key on history docs written before it existed. Only touches docs
+    missing it, so after the first run this is an index lookup that finds
+    nothing. Returns the number of docs updated.
+    """
+    updated = 0
+    for subdomain in subdomains or _all_tenant_subdomains():
+        result = tenant_collections_for_subdomain(subdomain)['history'].update_many(
+            {'item_key': {'$exists': False}},
+            [{'$set': {'item_key': {'$toLower': {'$trim': {'input': {'$ifNull': ['$item', '']}}}},
+                       'changed_at': datetime.utcnow()}}]
+        )
+        updated += result.modified_count
+    return updated
+
 
+def backfill_history_timestamps(collections):
+    """
+    Convert history timestamps still stored as ISO strings (from before every
+    ingest path parsed them) to datetimes. Mongo sorts strings apart from
+    dates, so /history's (timestamp, _id) keyset cursor never reaches those
+    rows, the rollup skips them and twin linking can't window them. Converted
+    docs drop their twin link so link_all_drop_twins redoes it. Returns the
+    number of docs converted; unparseable strings are left as they are.
+    """
+    writes = []
+    skipped = 0
+    for doc in collections['history'].find({'timestamp': {'$type': 'string'}}, {'timestamp': 1}):
+        try:
+            timestamp = as_naive_utc(datetime.fromisoformat(doc['timestamp'].replace('Z', '+00:00')))
+        except ValueError:
+            skipped += 1
+            continue
+        writes.append(UpdateOne({'_id': doc['_id'], 'timestamp': doc['timestamp']},
+                                {'$set': {'timestamp': timestamp, 'changed_at': datetime.utcnow()},
+                                 '$unset': {'event_id': '', 'is_primary': '', 'paired': ''}}))
+    if skipped:
+        print(f"[!] {skipped} history docs have an unparseable timestamp string")
+    if not writes:
+        return 0
+    return collections['history'].bulk_write(writes, ordered=False).modified_count
+
+
+@app.cli.command('ensure-indexes')
+def ensure_indexes_command():
+    """Create every registered index for every tenant."""
+    print(json.dumps(ensure_all_indexes(), indent=2))
+
+
+@tenant_cli_command('backfill-item-keys')
+def backfill_item_keys_command(subdomain, collections):
+    """Set item_key on existing history docs."""
+    print(f"[OK] {subdomain}: item_key set on {backfill_item_keys([subdomain])} history docs")
+
+
+@app.cli.command('index-report')
+def index_report_command():
+    """List missing and unused indexes for every tenant."""
+    print(json.dumps(index_report(), indent=2, default=str))
+
+
+def _build_tenant_context(tenant_id):
     # Get tenant subdomain for collection naming
     tenant = get_tenant_by_id(tenant_id)
     if not tenant:
@@ -207,18 +667,48 @@ def get_tenant_collections(tenant_id=None):
         tenant = get_tenant_by_id(DEFAULT_TENANT_ID)
 
     subdomain = tenant['subdomain'] if tenant else 'unsociables'
+    if tenant:
+        schedule_tenant_indexes(subdomain)
 
-    collections = {
-        'bingo': db[f'tenant_{subdomain}_bingo'],
-        'history': db[f'tenant_{subdomain}_history'],
-        'deaths': db[f'tenant_{subdomain}_deaths'],
-        'rank_history': db[f'tenant_{subdomain}_rank_history'],
-        'kc': db[f'tenant_{subdomain}_kc'],
-        'personal_bests': db[f'tenant_{subdomain}_personal_bests'],
-        'archive': db[f'tenant_{subdomain}_archive']
+    return {
+        'tenant': tenant,
+        'tenant_id': tenant_id,
+        'subdomain': subdomain,
+        'collections': tenant_collections_for_subdomain(subdomain)
     }
-    _ensure_tenant_indexes(collections, subdomain)
-    return collections
+
+
+def get_tenant_context(tenant_id=None):
+    """
+    The tenant doc, subdomain and collection handles for a request, resolved
+    once and then reused from flask.g by every helper the handler calls.
+    tenant_id=None means "whichever tenant this request already resolved"
+    (falling back to get_tenant_from_request() if nothing has yet). Outside
+    a request (startup, CLI commands, worker threads) it's built fresh each
+    call, and tenant_id=None means the default tenant.
+    """
+    if not has_request_context():
+        return _build_tenant_context(tenant_id or DEFAULT_TENANT_ID)
+
+    context = g.get('tenant_context')
+    if tenant_id is None:
+        if context:
+            return context
+        tenant = get_tenant_from_request()
+        tenant_id = tenant['tenant_id'] if tenant else DEFAULT_TENANT_ID
+
+    if context and context['tenant_id'] == tenant_id:
+        return context
+    g.tenant_context = _build_tenant_context(tenant_id)
+    return g.tenant_context
+
+
+def get_tenant_collections(tenant_id=None):
+    """
+    Get MongoDB collections for a specific tenant.
+    Returns dict with all tenant-specific collections.
+    """
+    return get_tenant_context(tenant_id)['collections']
 
 
 def parse_rarity_denominator(raw):
@@ -238,6 +728,500 @@ def parse_rarity_denominator(raw):
         return None
 
 
+def build_history_doc(player, item, drop_type='loot', source=None, value=0, value_string='',
+                      rarity=None, timestamp=None, ingest_key=None):
+    """
+    One drop_history document, as every ingest path (/drop, /drops/batch,
+    /history-only, /manual-drop) stores it. `timestamp` may be an ISO string
+    (as the bot sends it), a datetime, or None for "now". `ingest_key` is the
+    caller's idempotency key, if it sent one (see insert_ingest_docs).
+    """
+    if timestamp is None:
+        timestamp = datetime.utcnow()
+    elif isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    doc = {
+        'player': player,
+        'item': item,
+        'item_key': normalize_item_name(item),
+        'drop_type': drop_type,
+        'source': source,
+        'value': value,
+        'value_string': value_string,
+        'rarity': rarity,
+        'rarity_1_in': parse_rarity_denominator(rarity),
+        'timestamp': timestamp
+    }
+    if ingest_key:
+        doc['ingest_key'] = ingest_key
+    return doc
+
+
+# Re-running !import_history/!import_deaths/!import_pbs, or the bot retrying
+# a post it never saw a response for, used to store the same drop/death twice.
+# Ingest calls now carry an idempotency key (the bot uses the Discord message
+# id, plus the item's position for multi-item drops) which is stored as
+# `ingest_key` under a unique index (see TENANT_INDEXES), so a replay is
+# rejected by the database itself rather than by a lookup beforehand. The
+# index is partial - documents from before keys existed, or from callers that
+# don't send one, aren't constrained.
+def get_ingest_key(data):
+    """The caller's idempotency key for a single-document ingest call (body field or header)."""
+    key = data.get('idempotency_key') or request.headers.get('Idempotency-Key')
+    return str(key) if key else None
+
+
+def insert_ingest_docs(collection, docs):
+    """
+    insert_many that treats a duplicate ingest_key as "already recorded"
+    rather than an error, stamping each doc's changed_at. Returns the docs that were actually inserted, in
+    their original order; any other write error is raised as usual.
+    """
+    if not docs:
+        return []
+    now = datetime.utcnow()
+    for doc in docs:
+        doc.setdefault('changed_at', now)  # change feed position (see /changes/<dataset>)
+    try:
+        collection.insert_many(docs, ordered=False)
+        return docs
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        if any(err.get('code') != 11000 for err in errors):
+            raise
+        duplicate_indexes = {err['index'] for err in errors}
+        return [doc for i, doc in enumerate(docs) if i not in duplicate_indexes]
+
+
+# Daily rollup of drop history: one row per (UTC day, player, item,
+# drop_type) holding count, value sum, max single value and max rarity_1_in.
+# It's kept current at insert time by record_history_docs - every path that
+# adds to history goes through it - so day/player/item-level reads cost
+# O(days x players) instead of a scan over every drop. count/value cover raw
+# docs, so a loot + collection_log pair for one pickup counts twice there, as
+# it does in the history collection; drops/drop_value cover is_primary docs
+# only (one per pickup, see link_drop_twins), as /analytics/summary counts.
+#
+# A tenant's rollup is only read once history_daily_ready() - until then
+# readers fall back to scanning history. A tenant with no history yet is
+# marked ready the first time its context is built (there's nothing to roll
+# up), and bootstrap rebuilds any tenant whose history predates the rollup.
+# `flask --app bingo_api rebuild-history-daily` re-runs that on demand; it
+# only replaces days before today, since today's rows are being $inc'd by
+# live drops (see rebuild_history_daily). HISTORY_DAILY_VERSION is bumped
+# whenever the row fields change, which sends every tenant back through a
+# rebuild before its rollup is read again.
+HISTORY_DAILY_STATE_ID = 'history_daily_state'
+HISTORY_DAILY_VERSION = 2
+
+
+def as_naive_utc(timestamp):
+    """A history timestamp as naive UTC (how Mongo returns them, and how event window dates are kept)."""
+    if timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def history_day(timestamp):
+    """UTC midnight of a history timestamp - the rollup's day key."""
+    timestamp = as_naive_utc(timestamp)
+    return datetime(timestamp.year, timestamp.month, timestamp.day)
+
+
+def rollup_history_docs(collections, docs):
+    """Fold newly inserted history docs into the tenant's history_daily rollup."""
+    buckets = {}
+    for doc in docs:
+        key = (history_day(doc['timestamp']), doc['player'], doc['item'], doc.get('drop_type', 'loot'))
+        bucket = buckets.setdefault(key, {'count': 0, 'value': 0, 'drops': 0, 'drop_value': 0,
+                                          'max_value': 0, 'max_rarity_1_in': None})
+        value = doc.get('value') or 0
+        bucket['count'] += 1
+        bucket['value'] += value
+        if doc.get('is_primary') is not False:
+            bucket['drops'] += 1
+            bucket['drop_value'] += value
+        bucket['max_value'] = max(bucket['max_value'], value)
+        if doc.get('rarity_1_in') is not None:
+            bucket['max_rarity_1_in'] = max(bucket['max_rarity_1_in'] or 0, doc['rarity_1_in'])
+    if not buckets:
+        return
+
+    operations = []
+    for (day, player, item, drop_type), bucket in buckets.items():
+        update = {
+            '$inc': {'count': bucket['count'], 'value': bucket['value'],
+                     'drops': bucket['drops'], 'drop_value': bucket['drop_value']},
+            '$max': {'max_value': bucket['max_value']}
+        }
+        if bucket['max_rarity_1_in'] is not None:
+            update['$max']['max_rarity_1_in'] = bucket['max_rarity_1_in']
+        operations.append(UpdateOne(
+            {'day': day, 'player': player, 'item': item, 'drop_type': drop_type}, update, upsert=True))
+    collections['history_daily'].bulk_write(operations, ordered=False)
+
+
+# Dink often reports one pickup twice - a "Loot Drop" and a "Collection Log"
+# message for the same item, seconds apart. Both are kept in history, but
+# they're linked when the second one arrives: it joins the first one's
+# event_id with is_primary False, and the first is marked paired so it can't
+# collect a second twin. One real drop is then exactly one is_primary doc,
+# and "how many X have been found" is an indexed count_documents.
+# event_id is the primary doc's own _id, so link_all_drop_twins (the backfill
+# for older history) gives the same answer however often it's re-run.
+DROP_TWIN_WINDOW_SECONDS = 5
+
+
+def _drop_twins_match(primary, doc):
+    return (primary['player'] == doc['player'] and primary['item'] == doc['item']
+            and primary.get('drop_type') != doc.get('drop_type') and not primary.get('paired')
+            and abs((as_naive_utc(primary['timestamp']) - as_naive_utc(doc['timestamp'])).total_seconds())
+            <= DROP_TWIN_WINDOW_SECONDS)
+
+
+def link_drop_twins(collections, docs):
+    """
+    Set event_id/is_primary on history docs about to be inserted, pointing a
+    loot/collection_log twin at its already-stored (or same-batch) partner.
+    Returns the stored primaries that need marking as paired once the insert
+    lands, as {twin doc index: primary _id}.
+    """
+    batch_primaries = []
+    stored_links = {}
+    for i, doc in enumerate(docs):
+        doc.setdefault('_id', ObjectId())
+        primary = next((p for p in batch_primaries if _drop_twins_match(p, doc)), None)
+        if primary is None:
+            window = timedelta(seconds=DROP_TWIN_WINDOW_SECONDS)
+            primary = collections['history'].find_one({
+                'player': doc['player'],
+                'item': doc['item'],
+                'timestamp': {'$gte': doc['timestamp'] - window, '$lte': doc['timestamp'] + window},
+                'drop_type': {'$ne': doc.get('drop_type')},
+                'is_primary': True,
+                'paired': {'$ne': True}
+            }, {'event_id': 1}, sort=[('timestamp', 1)])
+            if primary:
+                stored_links[i] = primary['_id']
+        if primary:
+            primary['paired'] = True
+            doc['event_id'] = primary['event_id']
+            doc['is_primary'] = False
+            doc['paired'] = False
+        else:
+            doc['event_id'] = str(doc['_id'])
+            doc['is_primary'] = True
+            doc['paired'] = False
+            batch_primaries.append(doc)
+    return stored_links
+
+
+def link_all_drop_twins(collections):
+    """Recompute event_id/is_primary/paired across a tenant's whole history. Returns docs updated."""
+    cursor = (collections['history']
+              .find({}, {'player': 1, 'item': 1, 'drop_type': 1, 'timestamp': 1,
+                         'event_id': 1, 'is_primary': 1, 'paired': 1})
+              .sort([('player', 1), ('item', 1), ('timestamp', 1)])
+              .allow_disk_use(True)
+              .batch_size(EXPORT_BATCH_SIZE))
+    updated = 0
+    writes = []
+    primary = None  # (stored doc, new paired flag) for the current event
+
+    def link(doc, event_id, is_primary, paired):
+        # Only docs whose link actually changed are written
+        fields = {'event_id': event_id, 'is_primary': is_primary, 'paired': paired}
+        if any(doc.get(field) != value for field, value in fields.items()):
+            writes.append(UpdateOne({'_id': doc['_id']}, {'$set': {**fields, 'changed_at': datetime.utcnow()}}))
+
+    for doc in cursor:
+        if not isinstance(doc.get('timestamp'), datetime):
+            link(doc, str(doc['_id']), True, False)  # legacy string timestamp: can't be windowed
+            continue
+        candidate = primary and {**primary[0], 'event_id': str(primary[0]['_id']), 'paired': primary[1]}
+        if candidate and _drop_twins_match(candidate, doc):
+            primary = (primary[0], True)
+            link(doc, str(primary[0]['_id']), False, False)
+        else:
+            if primary:
+                link(primary[0], str(primary[0]['_id']), True, primary[1])
+            primary = (doc, False)
+        if len(writes) >= EXPORT_BATCH_SIZE:
+            collections['history'].bulk_write(writes, ordered=False)
+            updated += len(writes)
+            writes = []
+    if primary:
+        link(primary[0], str(primary[0]['_id']), True, primary[1])
+    if writes:
+        collections['history'].bulk_write(writes, ordered=False)
+        updated += len(writes)
+    return updated
+
+
+@tenant_cli_command('link-drop-twins')
+def link_drop_twins_command(subdomain, collections):
+    """Link loot/collection_log twins across existing history."""
+    relinked = link_all_drop_twins(collections)
+    print(f"[OK] {subdomain}: {relinked} history docs relinked")
+    if relinked and history_daily_ready(collections):
+        print(f"[OK] {subdomain}: history_daily rebuilt ({rebuild_history_daily(collections)} rows)")
+
+
+def record_history_docs(collections, docs, tenant_id=None):
+    """
+    Insert drop history docs (see insert_ingest_docs), linking loot/
+    collection_log twins, and fold the ones that were actually inserted into
+    history_daily and the value totals. Returns the inserted docs.
+    """
+    stored_links = link_drop_twins(collections, docs)
+    inserted = insert_ingest_docs(collections['history'], docs)
+    inserted_ids = {doc['_id'] for doc in inserted}
+    paired = [primary_id for i, primary_id in stored_links.items() if docs[i]['_id'] in inserted_ids]
+    if paired:
+        collections['history'].update_many({'_id': {'$in': paired}},
+                                           {'$set': {'paired': True, 'changed_at': datetime.utcnow()}})
+    if inserted:
+        try:
+            rollup_history_docs(collections, inserted)
+        except Exception as e:
+            # The drop itself is saved; rebuild-history-daily repairs the rollup
+            print(f"[!] history_daily rollup failed: {e}")
+        try:
+            add_to_value_totals(collections, tenant_id, inserted)
+        except Exception as e:
+            print(f"[!] Value totals update failed: {e}")
+    return inserted
+
+
+def history_daily_ready(collections):
+    """True once rebuild-history-daily has populated the rollup (at HISTORY_DAILY_VERSION) for this tenant."""
+    return collections['bingo'].find_one({'_id': HISTORY_DAILY_STATE_ID, 'version': HISTORY_DAILY_VERSION},
+                                         {'_id': 1}) is not None
+
+
+def mark_history_daily_ready(collections, rows=0):
+    collections['bingo'].update_one(
+        {'_id': HISTORY_DAILY_STATE_ID},
+        {'$set': {'rebuilt_at': datetime.utcnow(), 'rows': rows, 'version': HISTORY_DAILY_VERSION}},
+        upsert=True
+    )
+
+
+def init_history_daily(collections, rebuild=True):
+    """
+    Put a tenant's rollup into use if it isn't yet: a tenant with no history
+    is marked ready straight away, one with history is rebuilt (if rebuild).
+    Returns the rows built, or None if nothing was done.
+    """
+    if history_daily_ready(collections):
+        return None
+    if collections['history'].find_one({}, {'_id': 1}) is None:
+        mark_history_daily_ready(collections)
+        return 0
+    return rebuild_history_daily(collections) if rebuild else None
+
+
+def _merge_history_daily(collections, match, rebuilt_at):
+    """Aggregate the history docs matching `match` into history_daily buckets, replacing those rows."""
+    collections['history'].aggregate([
+        {'$match': match},
+        {'$group': {
+            '_id': {
+                'day': {'$dateTrunc': {'date': '$timestamp', 'unit': 'day'}},
+                'player': '$player',
+                'item': '$item',
+                'drop_type': {'$ifNull': ['$drop_type', 'loot']}
+            },
+            'count': {'$sum': 1},
+            'value': {'$sum': {'$ifNull': ['$value', 0]}},
+            'drops': {'$sum': {'$cond': [{'$eq': ['$is_primary', False]}, 0, 1]}},
+            'drop_value': {'$sum': {'$cond': [{'$eq': ['$is_primary', False]}, 0, {'$ifNull': ['$value', 0]}]}},
+            'max_value': {'$max': {'$ifNull': ['$value', 0]}},
+            'max_rarity_1_in': {'$max': '$rarity_1_in'}
+        }},
+        {'$project': {
+            '_id': 0, 'day': '$_id.day', 'player': '$_id.player', 'item': '$_id.item',
+            'drop_type': '$_id.drop_type', 'count': 1, 'value': 1, 'drops': 1, 'drop_value': 1,
+            'max_value': 1, 'max_rarity_1_in': 1,
+            'rebuilt_at': {'$literal': rebuilt_at}
+        }},
+        {'$merge': {
+            'into': collections['history_daily'].name,
+            'on': ['day', 'player', 'item', 'drop_type'],
+            'whenMatched': 'replace',
+            'whenNotMatched': 'insert'
+        }}
+    ], allowDiskUse=True)
+
+
+def rebuild_history_daily(collections):
+    """
+    Recompute a tenant's history_daily rollup from its history collection.
+    Rows are merged in place rather than swapped in with $out, so increments
+    from drops recorded meanwhile aren't thrown away: only days before today
+    (UTC) are replaced, since today's rows are being $inc'd by live drops. A
+    tenant's first build has no trustworthy rows for today either, so once
+    it's marked ready today is recounted from history on its own - a much
+    shorter window for a concurrent drop than the full rebuild. Returns the
+    number of rows.
+    """
+    started_at = datetime.utcnow()
+    today = history_day(started_at)
+    first_build = not history_daily_ready(collections)
+    for spec in TENANT_INDEXES['history_daily']:  # $merge needs the unique bucket index
+        collections['history_daily'].create_index(spec['keys'], **spec.get('options', {}))
+    _merge_history_daily(collections, {'timestamp': {'$type': 'date', '$lt': today}}, started_at)
+    # Rows in the rebuilt range that history no longer backs
+    collections['history_daily'].delete_many({'rebuilt_at': {'$ne': started_at}, 'day': {'$lt': today}})
+    if first_build:
+        mark_history_daily_ready(collections)
+        collections['history_daily'].delete_many({'day': {'$gte': today}})
+        _merge_history_daily(collections, {'timestamp': {'$type': 'date', '$gte': today}}, started_at)
+    rows = collections['history_daily'].count_documents({})
+    mark_history_daily_ready(collections, rows)
+    return rows
+
+
+# Running GP totals for the total-value widget, which every open board
+# refreshes once a minute. Kept in the tenant's bingo collection as counter
+# docs {'total', 'watermark', 'seeded'}: one for all time, and one per event
+# start holding the value of drops timestamped *before* it - the event's
+# total is all time minus that, so a drop recorded during an event only ever
+# touches the all-time counter, whatever a (briefly cached) event window says.
+#
+# Writers $inc with upsert, so no drop is lost to a counter that doesn't
+# exist yet. Each counter covers two disjoint sets of drops, split by when
+# the history doc's _id was made (ObjectIds carry their creation second):
+# drops from `watermark` on are $inc'd by their writer (the filter skips
+# older ones), and drops before it are summed from history once, by the
+# first read after the counter is created (see _read_value_counter). A
+# counter created by a writer takes that drop's _id time as its watermark;
+# one created by a read takes the start of the next second, so drops already
+# written this second are summed (only one whose insert is still in flight
+# at that instant can fall between the two sets).
+#
+# The backfill-rarity value fill-in adjusts the totals, but nothing else that
+# edits or deletes history does; `flask --app bingo_api repair-value-totals`
+# drops the counters so they're re-seeded from history.
+VALUE_TOTAL_ALL_TIME_ID = 'value_total'
+
+
+def value_total_id(before=None):
+    """_id of a counter: all time, or value timestamped before an event start (naive UTC)."""
+    return f'value_before:{before.isoformat()}' if before else VALUE_TOTAL_ALL_TIME_ID
+
+
+def _object_id_time(object_id):
+    return as_naive_utc(object_id.generation_time)
+
+
+def add_to_value_totals(collections, tenant_id, docs, adjustment=False):
+    """
+    $inc the running totals by history docs' values. With adjustment=True the
+    docs are (already counted) docs whose 'value' is a change to apply.
+    """
+    window = get_event_window(tenant_id)
+    operations = []
+    for doc in docs:
+        value = doc.get('value') or 0
+        if not value:
+            continue
+        doc_time = _object_id_time(doc['_id'])
+        targets = [value_total_id()]
+        if window['start'] and as_naive_utc(doc['timestamp']) < window['start']:
+            targets.append(value_total_id(window['start']))
+        for doc_id in targets:
+            if adjustment:
+                # Seeded counters summed the old value; unseeded ones will read the new one
+                covered = {'$or': [{'seeded': True}, {'watermark': {'$lte': doc_time}}]}
+                operations.append(UpdateOne({'_id': doc_id, **covered}, {'$inc': {'total': value}}))
+            else:
+                operations.append(UpdateOne({'_id': doc_id, 'watermark': {'$lte': doc_time}},
+                                            {'$inc': {'total': value}, '$setOnInsert': {'watermark': doc_time}},
+                                            upsert=True))
+    if not operations:
+        return
+    try:
+        collections['bingo'].bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        # The counter exists with a later watermark: the seed sums this drop instead
+        if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+            raise
+
+
+def _read_value_counter(collections, before=None):
+    """A counter's total, creating it and/or seeding it from history first if needed."""
+    doc_id = value_total_id(before)
+    counter = collections['bingo'].find_one({'_id': doc_id})
+    if counter is None:
+        watermark = datetime.utcnow().replace(microsecond=0) + timedelta(seconds=1)
+        counter = collections['bingo'].find_one_and_update(
+            {'_id': doc_id}, {'$setOnInsert': {'total': 0, 'watermark': watermark}},
+            upsert=True, return_document=ReturnDocument.AFTER)
+    if counter.get('seeded'):
+        return counter['total']
+
+    match = {'_id': {'$lt': ObjectId.from_datetime(counter['watermark'])}}
+    if before:
+        match['timestamp'] = {'$lt': before}
+    result = list(collections['history'].aggregate([
+        {'$match': match},
+        {'$group': {'_id': None, 'total': {'$sum': '$value'}}}
+    ]))
+    base = result[0]['total'] if result else 0
+    seeded = collections['bingo'].find_one_and_update(
+        {'_id': doc_id, 'seeded': {'$ne': True}},
+        {'$inc': {'total': base}, '$set': {'seeded': True}},
+        return_document=ReturnDocument.AFTER)
+    if seeded is None:  # another reader seeded it first
+        seeded = collections['bingo'].find_one({'_id': doc_id})
+    return seeded['total']
+
+
+def get_value_total(collections, since=None):
+    """Running GP total: all time, or for drops timestamped from `since` (an event start, naive UTC) on."""
+    total = _read_value_counter(collections)
+    if since:
+        total -= _read_value_counter(collections, since)
+    return total
+
+
+def repair_value_totals(collections, tenant_id):
+    """Drop every running total counter and re-seed the all-time and current-event ones from history."""
+    collections['bingo'].delete_many({'_id': {'$regex': r'^value_(total|before)'}})
+    totals = {value_total_id(): get_value_total(collections)}
+    window = _load_event_window(tenant_id)
+    if window['enabled'] and window['start']:
+        totals[value_total_id(window['start'])] = get_value_total(collections, window['start'])
+    return totals
+
+
+@tenant_cli_command('repair-value-totals')
+def repair_value_totals_command(subdomain, collections):
+    """Recompute running GP totals from history."""
+    tenant = get_tenant_by_subdomain(subdomain)
+    if not tenant:
+        print(f"[X] No tenant with subdomain '{subdomain}'")
+        return
+    totals = repair_value_totals(collections, tenant['tenant_id'])
+    print(f"[OK] {subdomain}: " + ', '.join(f"{doc_id}={total}" for doc_id, total in totals.items()))
+
+
+@tenant_cli_command('rebuild-history-daily')
+def rebuild_history_daily_command(subdomain, collections):
+    """Rebuild the history_daily rollup from history."""
+    print(f"[OK] {subdomain}: history_daily rebuilt ({rebuild_history_daily(collections)} rows)")
+
+
+def completion_timestamp_iso(timestamp):
+    """Normalize a drop's timestamp once so it can be stamped onto any tile it completes (completedAt)."""
+    try:
+        return (datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                if isinstance(timestamp, str) else timestamp).isoformat()
+    except (ValueError, AttributeError):
+        return datetime.utcnow().isoformat()
+
+
 def check_tenant_feature(tenant, feature):
     """Check if tenant has access to a specific feature"""
     if not tenant:
@@ -295,20 +1279,219 @@ print(
 print()
 
 
-def fetch_osrs_highscores(player_name):
-    """Fetch player's KC from WiseOldMan API - returns (kc_data, debug_log)"""
+# WiseOldMan calls share one keep-alive session and go through a
+# process-wide limiter that spaces requests to stay inside WOM's rate limit:
+# 20/min for anonymous clients, 100/min with an API key (WOM_API_KEY).
+# WOM_REQUESTS_PER_MINUTE overrides either. A 429 is retried once after the
+# Retry-After WOM sends. A snapshot run fetches on KC_SNAPSHOT_WORKERS
+# threads so one player's round trip overlaps the next one's wait for a slot;
+# the limiter still bounds the run (uncached players cost ~3s each without a
+# key, ~0.6s with one), which is why the scheduled run happens in the
+# background (see create_kc_snapshot).
+WOM_API_KEY = os.environ.get('WOM_API_KEY')
+WOM_REQUESTS_PER_MINUTE = int(os.environ.get('WOM_REQUESTS_PER_MINUTE', 100 if WOM_API_KEY else 20))
+KC_SNAPSHOT_WORKERS = 3
+
+wom_session = requests.Session()
+wom_session.headers['User-Agent'] = 'OSRS-Bingo-Tracker/1.0'
+if WOM_API_KEY:
+    wom_session.headers['x-api-key'] = WOM_API_KEY
+wom_session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=KC_SNAPSHOT_WORKERS))
+
+_wom_rate_lock = threading.Lock()
+_wom_next_request_at = 0.0
+
+
+def _wait_for_wom_slot():
+    global _wom_next_request_at
+    with _wom_rate_lock:
+        now = time.monotonic()
+        slot = max(now, _wom_next_request_at)
+        _wom_next_request_at = slot + 60.0 / WOM_REQUESTS_PER_MINUTE
+    if slot > now:
+        time.sleep(slot - now)
+
+
+def wom_get(url, timeout=10):
+    """GET a WiseOldMan API URL through the shared session and rate limiter."""
+    _wait_for_wom_slot()
+    response = wom_session.get(url, timeout=timeout)
+    if response.status_code == 429:
+        try:
+            retry_after = min(float(response.headers.get('Retry-After', 5)), 30)
+        except ValueError:
+            retry_after = 5
+        time.sleep(retry_after)
+        _wait_for_wom_slot()
+        response = wom_session.get(url, timeout=timeout)
+    return response
+
+
+# Parsed boss KC per player is cached for WOM_CACHE_TTL_SECONDS, so the
+# admin "fetch KC" button and the scheduled /kc/snapshot asking for the same
+# player minutes apart cost one WOM call. Entries live in memory and, with
+# WOM_CACHE_IN_MONGO (on by default), in the shared wom_cache collection too,
+# so they survive Render spinning the API down. Each entry keeps WOM's own
+# updatedAt for the player: WOM's data only changes when the player is
+# updated there, so a refetch that comes back with the same updatedAt is
+# logged as unchanged.
+WOM_CACHE_TTL_SECONDS = int(os.environ.get('WOM_CACHE_TTL_SECONDS', 600))
+WOM_CACHE_IN_MONGO = os.environ.get('WOM_CACHE_IN_MONGO', 'true').lower() == 'true'
+
+_wom_cache = {}  # player key -> {'bosses', 'updated_at', 'fetched_at'}
+_wom_cache_lock = threading.Lock()
+
+
+def _wom_cache_key(player_name):
+    return player_name.strip().lower().replace('_', ' ')
+
+
+def _wom_cache_get(key, fresh_only=True):
+    """Cached entry for a player, or None. fresh_only=False also returns expired entries."""
+    with _wom_cache_lock:
+        entry = _wom_cache.get(key)
+    if entry is None and WOM_CACHE_IN_MONGO and USE_MONGODB:
+        try:
+            entry = wom_cache_collection.find_one({'_id': key})
+        except Exception as e:
+            print(f"[!] WOM cache read failed: {e}")
+        if entry:
+            with _wom_cache_lock:
+                _wom_cache[key] = entry
+    if entry and fresh_only:
+        age = (datetime.utcnow() - entry['fetched_at']).total_seconds()
+        if age >= WOM_CACHE_TTL_SECONDS:
+            return None
+    return entry
+
+
+def _wom_cache_put(key, bosses, updated_at):
+    entry = {'_id': key, 'bosses': bosses, 'updated_at': updated_at, 'fetched_at': datetime.utcnow()}
+    with _wom_cache_lock:
+        _wom_cache[key] = entry
+    if WOM_CACHE_IN_MONGO and USE_MONGODB:
+        try:
+            wom_cache_collection.replace_one({'_id': key}, entry, upsert=True)
+        except Exception as e:
+            print(f"[!] WOM cache write failed: {e}")
+
+
+# Bosses excluded from all tracking and display
+EXCLUDED_BOSSES = {'Brutus'}
+
+# WiseOldMan uses different keys for bosses - map them to our format
+WOM_BOSS_MAPPING = {
+    'abyssal_sire': 'Abyssal Sire',
+    'alchemical_hydra': 'Alchemical Hydra',
+    'amoxliatl': 'Amoxliatl',
+    'araxxor': 'Araxxor',
+    'artio': 'Artio',
+    'barrows_chests': 'Barrows Chests',
+    'bryophyta': 'Bryophyta',
+    'callisto': 'Callisto',
+    'calvarion': "Cal'varion",
+    'cerberus': 'Cerberus',
+    'chambers_of_xeric': 'Chambers of Xeric',
+    'chambers_of_xeric_challenge_mode': 'Chambers of Xeric: Challenge Mode',
+    'chaos_elemental': 'Chaos Elemental',
+    'chaos_fanatic': 'Chaos Fanatic',
+    'commander_zilyana': 'Commander Zilyana',
+    'corporeal_beast': 'Corporeal Beast',
+    'crazy_archaeologist': 'Crazy Archaeologist',
+    'dagannoth_prime': 'Dagannoth Prime',
+    'dagannoth_rex': 'Dagannoth Rex',
+    'dagannoth_supreme': 'Dagannoth Supreme',
+    'deranged_archaeologist': 'Deranged Archaeologist',
+    'doom_of_mokhaiotl': 'Doom of Mokhaiotl',
+    'duke_sucellus': 'Duke Sucellus',
+    'general_graardor': 'General Graardor',
+    'giant_mole': 'Giant Mole',
+    'grotesque_guardians': 'Grotesque Guardians',
+    'hespori': 'Hespori',
+    'kalphite_queen': 'Kalphite Queen',
+    'king_black_dragon': 'King Black Dragon',
+    'kraken': 'Kraken',
+    'kreearra': "Kree'Arra",
+    'kril_tsutsaroth': "K'ril Tsutsaroth",
+    'lunar_chests': "Moons",
+    'mimic': 'Mimic',
+    'nex': 'Nex',
+    'nightmare': 'Nightmare',
+    'phosanis_nightmare': "Phosani's Nightmare",
+    'obor': 'Obor',
+    'phantom_muspah': 'Phantom Muspah',
+    'sarachnis': 'Sarachnis',
+    'scorpia': 'Scorpia',
+    'scurrius': 'Scurrius',
+    'skotizo': 'Skotizo',
+    'shellbane_gryphon': 'Shellbane Gryphon',
+    'sol_heredit': 'Sol Heredit',
+    'spindel': 'Spindel',
+    'tempoross': 'Tempoross',
+    'the_gauntlet': 'The Gauntlet',
+    'the_corrupted_gauntlet': 'The Corrupted Gauntlet',
+    'the_hueycoatl': 'The Hueycoatl',
+    'the_leviathan': 'The Leviathan',
+    'the_whisperer': 'The Whisperer',
+    'the_royal_titans': 'Royal Titans',
+    'theatre_of_blood': 'Theatre of Blood',
+    'theatre_of_blood_hard_mode': 'Theatre of Blood: Hard Mode',
+    'thermonuclear_smoke_devil': 'Thermonuclear Smoke Devil',
+    'tombs_of_amascut': 'Tombs of Amascut',
+    'tombs_of_amascut_expert': 'Tombs of Amascut: Expert Mode',
+    'tzkal_zuk': 'TzKal-Zuk',
+    'tztok_jad': 'TzTok-Jad',
+    'vardorvis': 'Vardorvis',
+    'venenatis': 'Venenatis',
+    'vetion': "Vet'ion",
+    'vorkath': 'Vorkath',
+    'wintertodt': 'Wintertodt',
+    'yama': 'Yama',
+    'zalcano': 'Zalcano',
+    'zulrah': 'Zulrah'
+}
+
+
+def parse_wom_bosses(bosses_data):
+    """
+    Turn a WiseOldMan snapshot's 'bosses' dict into {display_name: kc}.
+    Iterates WiseOldMan's full response so new bosses are picked up automatically
+    without needing a code change. The mapping overrides display names for special
+    cases (apostrophes, abbreviations); anything not in the mapping gets an
+    auto-derived name (underscores → title case).
+    """
+    boss_data = {}
+    for wom_key, boss_value in (bosses_data or {}).items():
+        kc = (boss_value or {}).get('kills', 0)
+        if not kc or kc <= 0:
+            continue
+        display_name = WOM_BOSS_MAPPING.get(wom_key) or wom_key.replace('_', ' ').title()
+        if display_name in EXCLUDED_BOSSES:
+            continue
+        boss_data[display_name] = kc
+    return boss_data
+
+
+def fetch_osrs_highscores(player_name, use_cache=True):
+    """
+    Fetch player's KC from WiseOldMan API - returns (kc_data, debug_log).
+    Served from the WOM cache when a fresh entry exists, unless use_cache=False.
+    """
     debug = []
+    cache_key = _wom_cache_key(player_name)
+    if use_cache:
+        cached = _wom_cache_get(cache_key)
+        if cached:
+            debug.append(f"♻️ Served from cache (fetched {cached['fetched_at'].isoformat()}, "
+                         f"WOM updatedAt {cached.get('updated_at')})")
+            return dict(cached['bosses']), debug
 
     try:
         # WiseOldMan API endpoint
         url = f"https://api.wiseoldman.net/v2/players/{player_name.replace(' ', '_')}"
         debug.append(f"🌐 Fetching from WiseOldMan: {url}")
 
-        headers = {
-            'User-Agent': 'OSRS-Bingo-Tracker/1.0'
-        }
-
-        response = requests.get(url, headers=headers, timeout=10)
+        response = wom_get(url)
         debug.append(f"📡 HTTP Status: {response.status_code}")
 
         if response.status_code == 404:
@@ -355,100 +1538,17 @@ def fetch_osrs_highscores(player_name):
             first_key = list(bosses_data.keys())[0]
             debug.append(f"🔍 Sample ({first_key}): {bosses_data[first_key]}")
 
-        boss_data = {}
-
-        # Bosses excluded from all tracking and display
-        EXCLUDED_BOSSES = {'Brutus'}
-
-        # WiseOldMan uses different keys for bosses - map them to our format
-        boss_mapping = {
-            'abyssal_sire': 'Abyssal Sire',
-            'alchemical_hydra': 'Alchemical Hydra',
-            'amoxliatl': 'Amoxliatl',
-            'araxxor': 'Araxxor',
-            'artio': 'Artio',
-            'barrows_chests': 'Barrows Chests',
-            'bryophyta': 'Bryophyta',
-            'callisto': 'Callisto',
-            'calvarion': "Cal'varion",
-            'cerberus': 'Cerberus',
-            'chambers_of_xeric': 'Chambers of Xeric',
-            'chambers_of_xeric_challenge_mode': 'Chambers of Xeric: Challenge Mode',
-            'chaos_elemental': 'Chaos Elemental',
-            'chaos_fanatic': 'Chaos Fanatic',
-            'commander_zilyana': 'Commander Zilyana',
-            'corporeal_beast': 'Corporeal Beast',
-            'crazy_archaeologist': 'Crazy Archaeologist',
-            'dagannoth_prime': 'Dagannoth Prime',
-            'dagannoth_rex': 'Dagannoth Rex',
-            'dagannoth_supreme': 'Dagannoth Supreme',
-            'deranged_archaeologist': 'Deranged Archaeologist',
-            'doom_of_mokhaiotl': 'Doom of Mokhaiotl',
-            'duke_sucellus': 'Duke Sucellus',
-            'general_graardor': 'General Graardor',
-            'giant_mole': 'Giant Mole',
-            'grotesque_guardians': 'Grotesque Guardians',
-            'hespori': 'Hespori',
-            'kalphite_queen': 'Kalphite Queen',
-            'king_black_dragon': 'King Black Dragon',
-            'kraken': 'Kraken',
-            'kreearra': "Kree'Arra",
-            'kril_tsutsaroth': "K'ril Tsutsaroth",
-            'lunar_chests': "Moons",
-            'mimic': 'Mimic',
-            'nex': 'Nex',
-            'nightmare': 'Nightmare',
-            'phosanis_nightmare': "Phosani's Nightmare",
-            'obor': 'Obor',
-            'phantom_muspah': 'Phantom Muspah',
-            'sarachnis': 'Sarachnis',
-            'scorpia': 'Scorpia',
-            'scurrius': 'Scurrius',
-            'skotizo': 'Skotizo',
-            'shellbane_gryphon': 'Shellbane Gryphon',
-            'sol_heredit': 'Sol Heredit',
-            'spindel': 'Spindel',
-            'tempoross': 'Tempoross',
-            'the_gauntlet': 'The Gauntlet',
-            'the_corrupted_gauntlet': 'The Corrupted Gauntlet',
-            'the_hueycoatl': 'The Hueycoatl',
-            'the_leviathan': 'The Leviathan',
-            'the_whisperer': 'The Whisperer',
-            'the_royal_titans': 'Royal Titans',
-            'theatre_of_blood': 'Theatre of Blood',
-            'theatre_of_blood_hard_mode': 'Theatre of Blood: Hard Mode',
-            'thermonuclear_smoke_devil': 'Thermonuclear Smoke Devil',
-            'tombs_of_amascut': 'Tombs of Amascut',
-            'tombs_of_amascut_expert': 'Tombs of Amascut: Expert Mode',
-            'tzkal_zuk': 'TzKal-Zuk',
-            'tztok_jad': 'TzTok-Jad',
-            'vardorvis': 'Vardorvis',
-            'venenatis': 'Venenatis',
-            'vetion': "Vet'ion",
-            'vorkath': 'Vorkath',
-            'wintertodt': 'Wintertodt',
-            'yama': 'Yama',
-            'zalcano': 'Zalcano',
-            'zulrah': 'Zulrah'
-        }
-
-        # Extract KC from snapshot - iterate WiseOldMan's full response so new bosses
-        # are picked up automatically without needing a code change.
-        # The mapping overrides display names for special cases (apostrophes, abbreviations);
-        # anything not in the mapping gets an auto-derived name (underscores → title case).
-        for wom_key, boss_value in bosses_data.items():
-            kc = boss_value.get('kills', 0)
-            if not kc or kc <= 0:
-                continue
-            display_name = boss_mapping.get(wom_key) or wom_key.replace('_', ' ').title()
-            if display_name in EXCLUDED_BOSSES:
-                continue
-            boss_data[display_name] = kc
+        boss_data = parse_wom_bosses(bosses_data)
 
         debug.append(f"✅ Found {len(boss_data)} bosses with KC > 0")
         if boss_data:
             sample = list(boss_data.items())[:3]
             debug.append(f"Sample: {sample}")
+            updated_at = data.get('updatedAt')
+            previous = _wom_cache_get(cache_key, fresh_only=False)
+            if previous and updated_at and previous.get('updated_at') == updated_at:
+                debug.append(f"ℹ️ Unchanged on WOM since {updated_at}")
+            _wom_cache_put(cache_key, boss_data, updated_at)
 
         return (boss_data if boss_data else None), debug
 
@@ -457,6 +1557,410 @@ def fetch_osrs_highscores(player_name):
         return None, debug
 
 
+WOM_GROUP_HISCORES_PAGE = 50  # WOM's max ?limit for group hiscores
+
+
+def fetch_wom_group_hiscores(group_id, names, debug):
+    """
+    {player cache key: {display_name: kc}} for `names` (cache keys) from the
+    group's per-boss hiscores - one request per boss (and per 50 ranked
+    members), however many members there are. Only bosses in
+    WOM_BOSS_MAPPING are asked for.
+    """
+    kc = {key: {} for key in names}
+    for wom_key, display_name in WOM_BOSS_MAPPING.items():
+        if display_name in EXCLUDED_BOSSES:
+            continue
+        offset = 0
+        while True:
+            url = (f"https://api.wiseoldman.net/v2/groups/{group_id}/hiscores"
+                   f"?metric={wom_key}&limit={WOM_GROUP_HISCORES_PAGE}&offset={offset}")
+            response = wom_get(url, timeout=20)
+            if response.status_code != 200:
+                raise ValueError(f"HTTP {response.status_code} for {wom_key} hiscores")
+            entries = response.json() or []
+            for entry in entries:
+                member = entry.get('player') or {}
+                key = _wom_cache_key(member.get('displayName') or member.get('username') or '')
+                kills = (entry.get('data') or {}).get('kills') or 0
+                if key in kc and kills > 0:
+                    kc[key][display_name] = kills
+            # Ranked by kills, so a short page or an unkilled last entry is the end
+            if len(entries) < WOM_GROUP_HISCORES_PAGE or ((entries[-1].get('data') or {}).get('kills') or 0) <= 0:
+                break
+            offset += WOM_GROUP_HISCORES_PAGE
+    debug.append(f"✅ Group {group_id}: {len(names)} members read from per-boss hiscores")
+    return kc
+
+
+def fetch_wom_group_bosses(group_id):
+    """
+    Boss KC for the members of a WiseOldMan group from as few WOM requests as
+    possible - returns ({player cache key: kc_data}, debug_log).
+
+    The group details endpoint lists every member with their WOM updatedAt.
+    A member whose latestSnapshot is embedded in the response is parsed
+    directly (WOM doesn't normally embed it for group memberships); otherwise
+    a member whose updatedAt matches our cached entry hasn't changed on WOM
+    since we last parsed them, so the cached KC is reused even past the TTL.
+    That only saves calls for inactive members - every member who's played
+    since still needs a fetch. When there are more of those than the group's
+    per-boss hiscores take to page through, they're read from there instead
+    (fetch_wom_group_hiscores). Members resolved none of these ways are left
+    out and the caller falls back to fetch_osrs_highscores for them.
+    """
+    debug = []
+    resolved = {}
+    stale = {}  # cache key -> WOM updatedAt, for members neither embedded nor cached
+    try:
+        url = f"https://api.wiseoldman.net/v2/groups/{group_id}"
+        debug.append(f"🌐 Fetching WOM group roster: {url}")
+        response = wom_get(url, timeout=20)
+        debug.append(f"📡 HTTP Status: {response.status_code}")
+        if response.status_code != 200:
+            debug.append(f"❌ Error: {response.text[:200]}")
+            return resolved, debug
+        memberships = response.json().get('memberships') or []
+    except Exception as e:
+        debug.append(f"💥 Exception: {type(e).__name__}: {str(e)}")
+        return resolved, debug
+
+    for membership in memberships:
+        member = membership.get('player') or {}
+        name = member.get('displayName') or member.get('username')
+        if not name:
+            continue
+        key = _wom_cache_key(name)
+        updated_at = member.get('updatedAt')
+        bosses_data = ((member.get('latestSnapshot') or {}).get('data') or {}).get('bosses')
+        if bosses_data is not None:
+            boss_data = parse_wom_bosses(bosses_data)
+        else:
+            cached = _wom_cache_get(key, fresh_only=False)
+            if not (cached and updated_at and cached.get('updated_at') == updated_at):
+                stale[key] = updated_at
+                continue
+            boss_data = cached['bosses']
+        if boss_data:
+            _wom_cache_put(key, boss_data, updated_at)
+            resolved[key] = dict(boss_data)
+
+    debug.append(f"✅ Group {group_id}: {len(memberships)} members, {len(resolved)} resolved without a player call")
+    pages = -(-len(memberships) // WOM_GROUP_HISCORES_PAGE)
+    hiscores_calls = pages * sum(1 for name in WOM_BOSS_MAPPING.values() if name not in EXCLUDED_BOSSES)
+    if len(stale) > hiscores_calls:
+        try:
+            for key, boss_data in fetch_wom_group_hiscores(group_id, stale, debug).items():
+                # Bosses WOM_BOSS_MAPPING doesn't list yet keep their last fetched KC
+                cached = _wom_cache_get(key, fresh_only=False)
+                boss_data = {**((cached or {}).get('bosses') or {}), **boss_data}
+                if boss_data:
+                    _wom_cache_put(key, boss_data, stale[key])
+                    resolved[key] = dict(boss_data)
+        except Exception as e:
+            debug.append(f"💥 Group hiscores failed, falling back to player calls: {type(e).__name__}: {str(e)}")
+    return resolved, debug
+
+
+# ============================================
+# KC SNAPSHOT STORAGE (keyframes + deltas)
+# ============================================
+# A full bosses dict is 60+ keys and most players log no kills between two
+# 3-hourly snapshots, so snapshots are stored as deltas against the player's
+# previous snapshot: {'delta': {boss: kc}, 'base_id', 'depth'}, where base_id
+# is the keyframe the chain started from and depth counts the deltas since
+# it (a boss that vanished from WOM is recorded as None). A snapshot that
+# changes nothing since one of the same type isn't written at all - it only
+# moves kc_latest's timestamp on (touch_kc_latest). Every KC_KEYFRAME_EVERY-th snapshot -
+# and every 'start' snapshot, which /kc/effort and the recap use as the
+# baseline - is a full keyframe with 'bosses' as before, which keeps any
+# reconstruction to one keyframe plus at most KC_KEYFRAME_EVERY - 1 deltas.
+# Docs written before this (all full 'bosses') are simply keyframes.
+#
+# Nothing outside this section reads 'delta' docs directly: readers go
+# through latest_kc_snapshots / replay_kc_docs and get full 'bosses' back.
+#
+# kc_latest holds each player's current snapshot (full bosses, plus the
+# chain position the next delta needs), their latest 'start' snapshot as
+# start_bosses/start_timestamp and their latest 'current' one as
+# current_bosses/current_timestamp, upserted by write_kc_snapshots. It is what
+# /kc/all, the leaderboards, the KC export and kc_effort read, and where the
+# next write finds its base, so none of them scan KC history. A failed
+# upsert only leaves it stale - deltas hold absolute KC, so a delta taken
+# against an older state is still correct - and the `flask --app bingo_api
+# rebuild-kc-latest` command rebuilds it from history.
+KC_KEYFRAME_EVERY = int(os.environ.get('KC_KEYFRAME_EVERY', 16))
+KC_DELTA_FIELDS = ('delta', 'base_id', 'depth')
+
+
+def kc_delta(before, after):
+    """{boss: kc} for every boss that changed from before to after (None = removed)."""
+    delta = {boss: kc for boss, kc in after.items() if before.get(boss) != kc}
+    delta.update({boss: None for boss in before if boss not in after})
+    return delta
+
+
+def _apply_kc_delta(bosses, delta):
+    for boss, kc in delta.items():
+        if kc is None:
+            bosses.pop(boss, None)
+        else:
+            bosses[boss] = kc
+
+
+def replay_kc_docs(docs):
+    """Fill in 'bosses' on one player's KC docs, given oldest first. Returns the docs."""
+    bosses = {}
+    for doc in docs:
+        if 'base_id' in doc:
+            _apply_kc_delta(bosses, doc['delta'])
+            doc['bosses'] = dict(bosses)
+        else:
+            bosses = dict(doc.get('bosses', {}))
+    return docs
+
+
+def reconstruct_kc_docs(kc_collection, docs):
+    """
+    Fill in 'bosses' on arbitrary KC docs (any players, any positions in
+    their chains) with two queries: their keyframes, then the deltas on
+    those keyframes. Returns the docs.
+    """
+    base_ids = list({doc['base_id'] for doc in docs if 'base_id' in doc})
+    if not base_ids:
+        return docs
+
+    keyframes = {k['_id']: k.get('bosses', {})
+                 for k in kc_collection.find({'_id': {'$in': base_ids}}, {'bosses': 1})}
+    chains = {}
+    for delta in (kc_collection.find({'base_id': {'$in': base_ids}}, {'base_id': 1, 'delta': 1})
+                  .sort([('timestamp', 1), ('_id', 1)])):
+        chains.setdefault(delta['base_id'], []).append(delta)
+
+    for doc in docs:
+        if 'base_id' not in doc:
+            continue
+        bosses = dict(keyframes.get(doc['base_id'], {}))
+        for delta in chains.get(doc['base_id'], []):
+            _apply_kc_delta(bosses, delta['delta'])
+            if delta['_id'] == doc['_id']:
+                break
+        doc['bosses'] = bosses
+    return docs
+
+
+def latest_kc_snapshots(kc_collection, players=None, snapshot_type=None, earliest=False, until=None):
+    """
+    {player: snapshot} with full 'bosses' - each player's newest snapshot
+    (oldest with earliest=True), optionally only among players, snapshots of
+    snapshot_type and/or snapshots taken at or before `until`.
+    """
+    match = {}
+    if players is not None:
+        match['player'] = {'$in': list(players)}
+    if snapshot_type:
+        match['snapshot_type'] = snapshot_type
+    if until is not None:
+        match['timestamp'] = {'$lte': until}
+    direction = 1 if earliest else -1
+    pipeline = [
+        {'$match': match},
+        # (player, timestamp) in either index direction, so both orders use the index
+        {'$sort': {'player': -direction, 'timestamp': direction}},
+        {'$group': {'_id': '$player', 'snapshot': {'$first': '$$ROOT'}}}
+    ]
+    docs = [result['snapshot'] for result in kc_collection.aggregate(pipeline)]
+    reconstruct_kc_docs(kc_collection, docs)
+    return {doc['player']: doc for doc in docs}
+
+
+def _kc_latest_row(doc, start=None, current=None):
+    """
+    The kc_latest row for a full snapshot doc. start/current: the player's
+    latest 'start'/'current' snapshots, where doc isn't one itself.
+    """
+    row = {
+        'player': doc['player'],
+        'bosses': doc['bosses'],
+        'timestamp': doc['timestamp'],
+        'snapshot_type': doc.get('snapshot_type'),
+        'snapshot_id': doc['_id'],
+        'base_id': doc.get('base_id', doc['_id']),
+        'depth': doc.get('depth', 0),
+        'changed_at': doc.get('changed_at', doc['timestamp'])
+    }
+    if doc.get('snapshot_type') == 'start':
+        start = doc
+    elif doc.get('snapshot_type') == 'current':
+        current = doc
+    if start is not None:
+        row.update({'start_bosses': start['bosses'], 'start_timestamp': start['timestamp']})
+    if current is not None:
+        row.update({'current_bosses': current['bosses'], 'current_timestamp': current['timestamp']})
+    return row
+
+
+def upsert_kc_latest(collections, docs):
+    """Point kc_latest at these just-written snapshots, unless a newer one already landed."""
+    ops = [UpdateOne({'player': doc['player'], 'timestamp': {'$lte': doc['timestamp']}},
+                     {'$set': _kc_latest_row(doc)}, upsert=True)
+           for doc in docs]
+    try:
+        collections['kc_latest'].bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        # A newer row already exists: the upsert's insert hits the unique player index
+        if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+            raise
+
+
+def touch_kc_latest(collections, snapshots, changed_at):
+    """
+    Record snapshots that matched the player's last one: nothing goes into
+    KC history, but kc_latest still moves on to their timestamp and type
+    (and current_bosses, for a 'current' one) so effort and leaderboards
+    show when each player was last checked. Rows not in kc_latest yet are
+    left to the next rebuild.
+    """
+    ops = []
+    for snapshot in snapshots:
+        fields = {'timestamp': snapshot['timestamp'], 'snapshot_type': snapshot['snapshot_type'],
+                  'changed_at': changed_at}
+        if snapshot['snapshot_type'] == 'current':
+            fields.update({'current_bosses': snapshot['bosses'], 'current_timestamp': snapshot['timestamp']})
+        ops.append(UpdateOne({'player': snapshot['player'], 'timestamp': {'$lte': snapshot['timestamp']}},
+                             {'$set': fields}))
+    collections['kc_latest'].bulk_write(ops, ordered=False)
+
+
+def rebuild_kc_latest(collections):
+    """Recompute kc_latest from KC history. Returns the number of players."""
+    latest = latest_kc_snapshots(collections['kc'])
+    starts = latest_kc_snapshots(collections['kc'], snapshot_type='start')
+    currents = latest_kc_snapshots(collections['kc'], snapshot_type='current')
+    if latest:
+        collections['kc_latest'].bulk_write(
+            [UpdateOne({'player': player},
+                       {'$set': _kc_latest_row(doc, starts.get(player), currents.get(player))}, upsert=True)
+             for player, doc in latest.items()],
+            ordered=False
+        )
+    collections['kc_latest'].delete_many({'player': {'$nin': list(latest)}})
+    return len(latest)
+
+
+def kc_latest_needs_rebuild(collections):
+    """True if KC history has players (or start/current snapshots) that kc_latest has never seen."""
+    for snapshot_type in (None, 'start', 'current'):
+        query = {'snapshot_type': snapshot_type} if snapshot_type else {}
+        latest_query = {f'{snapshot_type}_bosses': {'$exists': True}} if snapshot_type else {}
+        if (collections['kc_latest'].find_one(latest_query, {'_id': 1}) is None
+                and collections['kc'].find_one(query, {'_id': 1}) is not None):
+            return True
+    return False
+
+
+@tenant_cli_command('rebuild-kc-latest')
+def rebuild_kc_latest_command(subdomain, collections):
+    """Rebuild kc_latest from KC history."""
+    print(f"[OK] {subdomain}: kc_latest rebuilt for {rebuild_kc_latest(collections)} players")
+
+
+def write_kc_snapshots(collections, snapshots):
+    """
+    Store [{'player', 'bosses', 'snapshot_type', 'timestamp'}] as keyframes or
+    deltas (see above) with one insert_many, and upsert kc_latest. Returns the
+    written doc for each snapshot, in order - None where nothing changed since
+    the player's last one.
+    """
+    players = {s['player'] for s in snapshots}
+    previous = {row['player']: row for row in collections['kc_latest'].find({'player': {'$in': list(players)}})}
+    if len(previous) < len(players):
+        # Not in kc_latest yet (new player, or before a rebuild) - fall back to history
+        previous.update(latest_kc_snapshots(collections['kc'], players=players - set(previous)))
+    written = []
+    unchanged = []
+    for snapshot in snapshots:
+        prev = previous.get(snapshot['player'])
+        doc = {
+            'player': snapshot['player'],
+            'timestamp': snapshot['timestamp'],
+            'snapshot_type': snapshot['snapshot_type']
+        }
+        depth = prev.get('depth', 0) + 1 if prev else 0
+        if prev is None or snapshot['snapshot_type'] == 'start' or depth >= KC_KEYFRAME_EVERY:
+            doc['bosses'] = snapshot['bosses']
+        else:
+            delta = kc_delta(prev['bosses'], snapshot['bosses'])
+            # A change of type is still written: history has to hold each
+            # player's latest 'current' snapshot for bounded effort lookups
+            if not delta and snapshot['snapshot_type'] == prev.get('snapshot_type'):
+                written.append(None)
+                unchanged.append(snapshot)
+                continue
+            doc.update({'delta': delta, 'base_id': prev.get('base_id') or prev['_id'], 'depth': depth})
+        written.append(doc)
+
+    # changed_at is the write time, not the fetch time ('timestamp'): a
+    # snapshot run can take minutes, and the change feed only waits
+    # CHANGE_FEED_SETTLE_SECONDS for a write to land
+    now = datetime.utcnow()
+    docs = [doc for doc in written if doc is not None]
+    if docs:
+        for doc in docs:
+            doc['changed_at'] = now
+        collections['kc'].insert_many(docs)
+    try:
+        if docs:
+            upsert_kc_latest(collections, [{**doc, 'bosses': snapshot['bosses']}
+                                           for doc, snapshot in zip(written, snapshots) if doc is not None])
+        if unchanged:
+            touch_kc_latest(collections, unchanged, now)
+    except Exception as e:
+        print(f"[!] kc_latest update failed: {e}")
+    return written
+
+
+def kc_effort(collections, until=None):
+    """
+    KC gained per player between their latest 'start' snapshot and their
+    latest 'current' one. Live (until=None) that's the pair kc_latest keeps -
+    one query however big the roster; for a past cut-off (an archived event's
+    end date) both are looked up in KC history as of `until`. Returns
+    [{'player', 'effort': {boss: gained}, 'start_timestamp',
+    'current_timestamp'}] for players with any gains. Shared by /kc/effort
+    and compute_event_recap.
+    """
+    if until is None:
+        pairs = [(row['player'], {'bosses': row['start_bosses'], 'timestamp': row['start_timestamp']},
+                  {'bosses': row['current_bosses'], 'timestamp': row['current_timestamp']})
+                 for row in collections['kc_latest'].find(
+                     {'start_bosses': {'$exists': True}, 'current_bosses': {'$exists': True}},
+                     {'player': 1, 'start_bosses': 1, 'start_timestamp': 1,
+                      'current_bosses': 1, 'current_timestamp': 1})]
+    else:
+        starts = latest_kc_snapshots(collections['kc'], snapshot_type='start', until=until)
+        currents = latest_kc_snapshots(collections['kc'], snapshot_type='current', until=until)
+        pairs = [(player, start, currents[player]) for player, start in starts.items() if player in currents]
+
+    results = []
+    for player, start, current in pairs:
+        effort = {}
+        for boss, current_kc in current['bosses'].items():
+            if boss in EXCLUDED_BOSSES:
+                continue
+            gain = current_kc - start['bosses'].get(boss, 0)
+            if gain > 0:
+                effort[boss] = gain
+        if effort:
+            results.append({
+                'player': player,
+                'effort': effort,
+                'start_timestamp': start['timestamp'],
+                'current_timestamp': current['timestamp']
+            })
+    return results
+
+
 @app.route('/kc/fetch/<player_name>', methods=['POST'])
 @limiter.limit("20 per minute")
 def fetch_player_kc(player_name):
@@ -470,54 +1974,86 @@ def fetch_player_kc(player_name):
     tenant_id = tenant['tenant_id']
     collections = get_tenant_collections(tenant_id)
 
-    # Fetch from OSRS
-    kc_data, _ = fetch_osrs_highscores(player_name)
+    # Fetch from WOM (?fresh=true skips the WOM cache)
+    kc_data, _ = fetch_osrs_highscores(player_name, use_cache=request.args.get('fresh', 'false').lower() != 'true')
 
     if not kc_data:
         return jsonify({'error': f'Could not fetch KC for {player_name}'}), 404
 
     # Store snapshot in tenant's KC collection
     try:
-        collections['kc'].insert_one({
+        written = write_kc_snapshots(collections, [{
             'player': player_name,
             'timestamp': datetime.utcnow(),
             'snapshot_type': 'current',
             'bosses': kc_data
-        })
+        }])
 
         return jsonify({
             'success': True,
             'player': player_name,
             'kc_count': len(kc_data),
-            'bosses': kc_data
+            'bosses': kc_data,
+            'unchanged': written[0] is None
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+_kc_snapshot_running = set()  # tenant_ids with a background snapshot run in progress
+_kc_snapshot_lock = threading.Lock()
+
+
 @app.route('/kc/snapshot', methods=['POST'])
 @limiter.limit("10 per minute")
 def create_kc_snapshot():
-    """Create KC snapshot for all players"""
-    debug_log = []
-    debug_log.append("[*] KC Snapshot endpoint called")
-
+    """
+    Create KC snapshot for all players. With {"background": true} the run
+    happens on a worker thread and this returns 202 straight away (the
+    scheduled workflow does that - an uncached roster can take minutes);
+    otherwise it responds once every player is fetched, with the results.
+    """
     if not USE_MONGODB:
         return jsonify({
             'success': False,
             'error': 'MongoDB not available',
-            'debug': debug_log
+            'debug': ["[*] KC Snapshot endpoint called"]
         }), 503
 
     tenant = get_authenticated_tenant()
     if not tenant:
-        return jsonify({'success': False, 'error': 'Unauthorized', 'debug': debug_log}), 401
-    tenant_id = tenant['tenant_id']
-    collections = get_tenant_collections(tenant_id)
+        return jsonify({'success': False, 'error': 'Unauthorized',
+                        'debug': ["[*] KC Snapshot endpoint called"]}), 401
+    collections = get_tenant_collections(tenant['tenant_id'])
 
-    data = request.json
+    data = request.json or {}
     snapshot_type = data.get('type', 'manual')
-    debug_log.append(f"[*] Snapshot type: {snapshot_type}")
+    if not data.get('background'):
+        body, status = run_kc_snapshot(tenant, collections, snapshot_type)
+        return jsonify(body), status
+
+    with _kc_snapshot_lock:
+        already_running = tenant['tenant_id'] in _kc_snapshot_running
+        _kc_snapshot_running.add(tenant['tenant_id'])
+    if not already_running:
+        def run():
+            try:
+                body, _ = run_kc_snapshot(tenant, collections, snapshot_type)
+                print(f"[OK] KC snapshot for {tenant['subdomain']}: "
+                      f"{body.get('successful', 0)}/{body.get('snapshots', 0)} succeeded")
+            except Exception as e:
+                print(f"[X] KC snapshot for {tenant['subdomain']} failed: {e}")
+            finally:
+                with _kc_snapshot_lock:
+                    _kc_snapshot_running.discard(tenant['tenant_id'])
+
+        threading.Thread(target=run, name=f"kc-snapshot-{tenant['subdomain']}", daemon=True).start()
+    return jsonify({'success': True, 'background': True, 'already_running': already_running}), 202
+
+
+def run_kc_snapshot(tenant, collections, snapshot_type):
+    """Fetch and store a KC snapshot for every player in a tenant's history. Returns (body, HTTP status)."""
+    debug_log = ["[*] KC Snapshot endpoint called", f"[*] Snapshot type: {snapshot_type}"]
 
     # Get all unique players from tenant's history
     try:
@@ -525,56 +2061,66 @@ def create_kc_snapshot():
         debug_log.append(f"[OK] Found {len(players)} players: {players}")
     except Exception as e:
         debug_log.append(f"[X] Error getting players: {str(e)}")
-        return jsonify({
+        return {
             'success': False,
             'error': str(e),
             'debug': debug_log
-        }), 500
+        }, 500
 
     if not players:
         debug_log.append("[!] No players in history!")
-        return jsonify({
+        return {
             'success': False,
             'message': 'No players found in drop history',
             'snapshots': 0,
             'results': [],
             'debug': debug_log
-        })
-
-    results = []
-
-    for player in players:
-        player_debug = []
-        player_debug.append(f"[*] Fetching KC for: {player}")
-
+        }, 200
+
+    # Tenants that track their clan as a WOM group (settings.wom_group_id) get
+    # the whole roster from one group request; only players the group can't
+    # answer for fall back to a per-player fetch
+    group_bosses = {}
+    wom_group_id = (tenant.get('settings') or {}).get('wom_group_id')
+    if wom_group_id:
+        group_bosses, group_debug = fetch_wom_group_bosses(wom_group_id)
+        debug_log.extend(group_debug)
+        missing = [p for p in players if _wom_cache_key(p) not in group_bosses]
+        debug_log.append(f"[*] {len(players) - len(missing)}/{len(players)} players from WOM group, "
+                         f"{len(missing)} fetched individually")
+
+    def fetch_player(player):
+        player_debug = [f"[*] Fetching KC for: {player}"]
+        kc_data = group_bosses.get(_wom_cache_key(player))
+        if kc_data:
+            player_debug.append(f"♻️ Served from WOM group {wom_group_id}")
+            return player, kc_data, datetime.utcnow(), player_debug
         kc_data, fetch_debug = fetch_osrs_highscores(player)  # Returns tuple
         player_debug.extend(fetch_debug)  # Add all fetch debug info
+        return player, kc_data, datetime.utcnow(), player_debug
+
+    # Fetch concurrently (bounded, and paced by the WOM rate limiter - see
+    # KC_SNAPSHOT_WORKERS), then write every snapshot in one insert_many
+    with ThreadPoolExecutor(max_workers=KC_SNAPSHOT_WORKERS) as executor:
+        fetched = list(executor.map(fetch_player, players))
 
+    results = []
+    snapshots = []
+    for player, kc_data, fetched_at, player_debug in fetched:
         if kc_data:
             player_debug.append(f"[OK] Got {len(kc_data)} boss KCs")
-
-            try:
-                result = collections['kc'].insert_one({
-                    'player': player,
-                    'timestamp': datetime.utcnow(),
-                    'snapshot_type': snapshot_type,
-                    'bosses': kc_data
-                })
-                player_debug.append(f"[OK] SAVED to MongoDB! ID: {result.inserted_id}")
-                results.append({
-                    'player': player,
-                    'success': True,
-                    'kc_count': len(kc_data),
-                    'debug': player_debug
-                })
-            except Exception as e:
-                player_debug.append(f"[X] MongoDB save failed: {str(e)}")
-                results.append({
-                    'player': player,
-                    'success': False,
-                    'error': str(e),
-                    'debug': player_debug
-                })
+            snapshots.append({
+                'player': player,
+                'timestamp': fetched_at,
+                'snapshot_type': snapshot_type,
+                'bosses': kc_data
+            })
+            results.append({
+                'player': player,
+                'success': True,
+                'kc_count': len(kc_data),
+                'debug': player_debug
+            })
         else:
             player_debug.append(f"[X] No KC data")
             results.append({
@@ -583,19 +2129,31 @@ def create_kc_snapshot():
                 'error': 'No KC data',
                 'debug': player_debug
             })
-
         debug_log.extend(player_debug)
 
+    if snapshots:
+        try:
+            written = [doc for doc in write_kc_snapshots(collections, snapshots) if doc is not None]
+            keyframes = sum(1 for doc in written if 'base_id' not in doc)
+            debug_log.append(f"[OK] SAVED {len(written)} snapshots to MongoDB "
+                             f"({keyframes} full, {len(written) - keyframes} deltas, "
+                             f"{len(snapshots) - len(written)} unchanged and skipped)")
+        except Exception as e:
+            debug_log.append(f"[X] MongoDB save failed: {str(e)}")
+            for result in results:
+                if result['success']:
+                    result.update({'success': False, 'error': str(e)})
+
     successful = sum(1 for r in results if r.get('success'))
     debug_log.append(f"[*] FINAL: {successful}/{len(results)} succeeded")
 
-    return jsonify({
+    return {
         'success': True,
         'snapshots': len(results),
         'successful': successful,
         'results': results,
         'debug': debug_log
-    })
+    }, 200
 
 
 @app.route('/kc/player/<player_name>', methods=['GET'])
@@ -610,28 +2168,17 @@ def get_player_kc(player_name):
     collections = get_tenant_collections(tenant_id)
 
     try:
-        # Get all snapshots for this player
-        snapshots = list(collections['kc'].find(
+        # Get all snapshots for this player, replayed oldest first into full bosses
+        snapshots = replay_kc_docs(list(collections['kc'].find(
             {'player': player_name},
-            sort=[('timestamp', -1)]
-        ))
-
-        # Convert ObjectId to string
-        for snapshot in snapshots:
-            snapshot['_id'] = str(snapshot['_id'])
-            snapshot['timestamp'] = snapshot['timestamp'].isoformat()
+            sort=[('timestamp', 1), ('_id', 1)]
+        )))
 
         # Get starting snapshot
-        start_snapshot = collections['kc'].find_one(
-            {'player': player_name, 'snapshot_type': 'start'},
-            sort=[('timestamp', 1)]
-        )
+        start_snapshot = next((s for s in snapshots if s.get('snapshot_type') == 'start'), None)
 
         # Get current snapshot
-        current_snapshot = collections['kc'].find_one(
-            {'player': player_name},
-            sort=[('timestamp', -1)]
-        )
+        current_snapshot = snapshots[-1] if snapshots else None
 
         # Calculate effort (KC gained)
         effort = {}
@@ -646,6 +2193,14 @@ def get_player_kc(player_name):
                         'gained': gained
                     }
 
+        # Convert ObjectId to string, newest first
+        snapshots.reverse()
+        for snapshot in snapshots:
+            for field in KC_DELTA_FIELDS:
+                snapshot.pop(field, None)
+            snapshot['_id'] = str(snapshot['_id'])
+            snapshot['timestamp'] = snapshot['timestamp'].isoformat()
+
         return jsonify({
             'player': player_name,
             'snapshots': snapshots,
@@ -668,30 +2223,18 @@ def get_boss_leaderboard(boss_name):
     collections = get_tenant_collections(tenant_id)
 
     try:
-        # Get latest snapshot for each player
-        pipeline = [
-            {'$sort': {'timestamp': -1}},
-            {'$group': {
-                '_id': '$player',
-                'latest_snapshot': {'$first': '$$ROOT'}
-            }},
-            {'$project': {
-                'player': '$_id',
-                'kc': f'$latest_snapshot.bosses.{boss_name}',
-                'timestamp': '$latest_snapshot.timestamp'
-            }},
-            {'$match': {'kc': {'$exists': True, '$ne': None}}},
-            {'$sort': {'kc': -1}}
-        ]
-
-        results = list(collections['kc'].aggregate(pipeline))
+        # Latest snapshot for each player that has this boss, highest KC first
+        boss_field = f'bosses.{boss_name}'
+        results = (collections['kc_latest']
+                   .find({boss_field: {'$ne': None}}, {'player': 1, boss_field: 1, 'timestamp': 1})
+                   .sort(boss_field, -1))
 
         # Convert to simple format
         leaderboard = []
         for result in results:
             leaderboard.append({
                 'player': result['player'],
-                'kc': result['kc'],
+                'kc': result['bosses'][boss_name],
                 'timestamp': result['timestamp'].isoformat()
             })
 
@@ -703,6 +2246,89 @@ def get_boss_leaderboard(boss_name):
         return jsonify({'error': str(e)}), 500
 
 
+# /kc/leaderboards ranks every boss at once. Ranks only change when a
+# snapshot lands in kc_latest, so each tenant's boards are computed once and
+# kept in memory, keyed by kc_latest's version (its newest changed_at plus
+# its row count). Each request costs one indexed lookup to check the version,
+# and a snapshot written by any worker invalidates every worker's copy.
+_kc_leaderboards_cache = {}  # tenant_id -> (version, leaderboards)
+_kc_leaderboards_lock = threading.Lock()
+
+
+def compute_kc_leaderboards(rows):
+    """
+    {boss: [{'player', 'kc', 'rank', 'percentile', 'timestamp'}]} from kc_latest rows,
+    highest KC first. One sort over every (boss, player) pair, then one walk:
+    tied KCs share a rank and the next distinct KC skips past them (1, 2, 2, 4),
+    and percentile is the share of that boss's board at or below the KC.
+    """
+    entries = sorted(
+        (boss, -kc, row['player'].lower(), row['player'], row['timestamp'])
+        for row in rows
+        for boss, kc in row['bosses'].items()
+        if kc is not None and boss not in EXCLUDED_BOSSES
+    )
+    boards = {}
+    for boss, neg_kc, _, player, timestamp in entries:
+        board = boards.setdefault(boss, [])
+        tied = board and board[-1]['kc'] == -neg_kc
+        board.append({
+            'player': player,
+            'kc': -neg_kc,
+            'rank': board[-1]['rank'] if tied else len(board) + 1,
+            'timestamp': timestamp.isoformat()
+        })
+    for board in boards.values():
+        for entry in board:
+            entry['percentile'] = round(100.0 * (len(board) - entry['rank'] + 1) / len(board), 1)
+    return boards
+
+
+def get_kc_leaderboards(collections, tenant_id):
+    """Every boss's leaderboard for a tenant, served from the cache while kc_latest is unchanged."""
+    newest = collections['kc_latest'].find_one({}, {'changed_at': 1}, sort=[('changed_at', -1)])
+    version = (newest or {}).get('changed_at'), collections['kc_latest'].estimated_document_count()
+    with _kc_leaderboards_lock:
+        entry = _kc_leaderboards_cache.get(tenant_id)
+        if entry and entry[0] == version:
+            return entry[1]
+
+    rows = collections['kc_latest'].find({}, {'player': 1, 'bosses': 1, 'timestamp': 1})
+    leaderboards = compute_kc_leaderboards(rows)
+    with _kc_leaderboards_lock:
+        _kc_leaderboards_cache[tenant_id] = (version, leaderboards)
+    return leaderboards
+
+
+@app.route('/kc/leaderboards', methods=['GET'])
+def get_all_boss_leaderboards():
+    """KC leaderboards for every boss, with ranks and percentiles (?limit= caps each board)"""
+    if not USE_MONGODB:
+        return jsonify({'error': 'MongoDB not available'}), 503
+
+    # Get tenant collections
+    tenant = get_tenant_from_request()
+    tenant_id = tenant['tenant_id'] if tenant else DEFAULT_TENANT_ID
+    collections = get_tenant_collections(tenant_id)
+
+    try:
+        limit = int(request.args['limit']) if request.args.get('limit') else None
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    try:
+        leaderboards = get_kc_leaderboards(collections, tenant_id)
+        if limit is not None:
+            leaderboards = {boss: board[:max(limit, 0)] for boss, board in leaderboards.items()}
+
+        return jsonify({
+            'bosses': sorted(leaderboards, key=str.lower),
+            'leaderboards': leaderboards
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/kc/all', methods=['GET'])
 def get_all_kc():
     """Get current KC for all players"""
@@ -716,22 +2342,12 @@ def get_all_kc():
 
     try:
         # Get latest snapshot for each player
-        pipeline = [
-            {'$sort': {'timestamp': -1}},
-            {'$group': {
-                '_id': '$player',
-                'latest_snapshot': {'$first': '$$ROOT'}
-            }}
-        ]
-
-        results = list(collections['kc'].aggregate(pipeline))
+        latest = collections['kc_latest'].find({}, {'player': 1, 'bosses': 1, 'timestamp': 1, 'snapshot_type': 1})
 
         _excluded = {'Brutus'}
         all_kc = {}
-        for result in results:
-            player = result['_id']
-            snapshot = result['latest_snapshot']
-            all_kc[player] = {
+        for snapshot in latest:
+            all_kc[snapshot['player']] = {
                 'bosses': {k: v for k, v in snapshot['bosses'].items() if k not in _excluded},
                 'timestamp': snapshot['timestamp'].isoformat(),
                 'snapshot_type': snapshot['snapshot_type']
@@ -741,31 +2357,6 @@ def get_all_kc():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def count_unique_drops(docs, window_seconds=5):
-    """
-    Count real drop events from history docs, collapsing paired 'loot' + 'collection_log'
-    entries that Dink can send for the same physical item pickup (one item, two Discord
-    messages) into a single count. Docs are NOT modified or removed - this only affects
-    how many "actual drops" we report, not what's stored in history.
-    """
-    # Group by player so timestamps are only compared within the same player's drops
-    by_player = {}
-    for doc in docs:
-        by_player.setdefault(doc['player'], []).append(doc['timestamp'])
-
-    total = 0
-    for timestamps in by_player.values():
-        timestamps.sort()
-        last_counted = None
-        for ts in timestamps:
-            if last_counted is not None and (ts - last_counted).total_seconds() <= window_seconds:
-                continue  # same physical drop as the previous one we counted (loot + collection_log pair)
-            total += 1
-            last_counted = ts
-
-    return total
-
-
 @app.route('/kc/notable-drops', methods=['GET'])
 def get_notable_drops():
     """Count actual drops of a notable item (e.g. Enhanced crystal weapon seed) from drop history"""
@@ -778,11 +2369,8 @@ def get_notable_drops():
     collections = get_tenant_collections(tenant_id)
 
     try:
-        docs = list(collections['history'].find(
-            {'item': {'$regex': f'^{item_name}$', '$options': 'i'}},
-            {'player': 1, 'timestamp': 1}
-        ))
-        count = count_unique_drops(docs)
+        # One is_primary doc per real drop - loot/collection_log twins are linked at ingest
+        count = collections['history'].count_documents({**history_search_filter(item_name, 'exact'), 'is_primary': True})
         return jsonify({'item': item_name, 'count': count})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -799,48 +2387,10 @@ def get_kc_effort():
     collections = get_tenant_collections(tenant_id)
 
     try:
-        # Get all players
-        players = collections['kc'].distinct('player')
-
-        effort_results = []
-
-        for player in players:
-            # Get bingo start snapshot
-            start_snapshot = collections['kc'].find_one({
-                'player': player,
-                'snapshot_type': 'start'
-            }, sort=[('timestamp', -1)])
-
-            # Get latest current snapshot
-            current_snapshot = collections['kc'].find_one({
-                'player': player,
-                'snapshot_type': 'current'
-            }, sort=[('timestamp', -1)])
-
-            if not start_snapshot or not current_snapshot:
-                continue  # Skip if missing either snapshot
-
-            # Calculate effort (current - start)
-            start_bosses = start_snapshot.get('bosses', {})
-            current_bosses = current_snapshot.get('bosses', {})
-
-            _excluded = {'Brutus'}
-            effort = {}
-            for boss, current_kc in current_bosses.items():
-                if boss in _excluded:
-                    continue
-                start_kc = start_bosses.get(boss, 0)
-                gain = current_kc - start_kc
-                if gain > 0:
-                    effort[boss] = gain
-
-            if effort:  # Only include if there are gains
-                effort_results.append({
-                    'player': player,
-                    'effort': effort,
-                    'start_timestamp': start_snapshot['timestamp'].isoformat(),
-                    'current_timestamp': current_snapshot['timestamp'].isoformat()
-                })
+        effort_results = [{**entry,
+                           'start_timestamp': entry['start_timestamp'].isoformat(),
+                           'current_timestamp': entry['current_timestamp'].isoformat()}
+                          for entry in kc_effort(collections)]
 
         if not effort_results:
             return jsonify({
@@ -901,16 +2451,17 @@ def save_kc():
         return jsonify({'success': False, 'error': 'Missing player or bosses'}), 400
 
     try:
-        result = collections['kc'].insert_one({
+        written = write_kc_snapshots(collections, [{
             'player': player,
             'timestamp': datetime.utcnow(),
             'snapshot_type': snapshot_type,
             'bosses': bosses
-        })
+        }])
 
         return jsonify({
             'success': True,
-            'id': str(result.inserted_id)
+            'id': str(written[0]['_id']) if written[0] else None,
+            'unchanged': written[0] is None
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -921,14 +2472,12 @@ if USE_MONGODB:
     kc_collection = db['kc_snapshots']
 
 
-def check_duplicate_in_history(player, item, message_timestamp, seconds=5):
+def check_duplicate_in_history(player, item, message_timestamp, seconds=5, tenant_id=None):
     """Check if this drop already exists in history (within N seconds of the message timestamp)"""
     if not USE_MONGODB:
         return False  # Skip deduplication for file storage
 
     try:
-        tenant = get_tenant_from_request()
-        tenant_id = tenant['tenant_id'] if tenant else DEFAULT_TENANT_ID
         collections = get_tenant_collections(tenant_id)
 
         # Parse timestamp if it's a string
@@ -957,6 +2506,92 @@ def check_duplicate_in_history(player, item, message_timestamp, seconds=5):
         return False
 
 
+# /drop used to walk every tile and every item on the board, re-normalizing
+# both sides of each comparison, for every incoming drop. Instead each tenant's
+# board is compiled once into a lookup keyed by normalized item name, and only
+# recompiled when the board itself is saved (save_bingo_data, which /update
+# goes through, and /shuffle-board). Kept in-process, so like the rate limiter
+# this assumes a single API instance; a process that hasn't compiled a board
+# yet does so from the first board it loads.
+_tile_match_indexes = {}  # tenant_id -> compiled index (see compile_tile_match_index)
+
+
+def normalize_item_name(name):
+    return (name or '').strip().lower()
+
+
+def compile_tile_match_index(board):
+    """
+    Compile a board's tiles into:
+      'exact':    {normalized item name: [(tile index, requirement slot), ...]}
+      'partial':  [(normalized required item, tile index, slot), ...] for
+                  multi-item tiles, which (unlike regular tiles) also accept
+                  a substring match either way - see record_drop
+      'required': {tile index: set of normalized required items} (multi-item tiles)
+      'tiles':    {tile index: the tile's items/value, for responses and for
+                  pinning atomic updates to the tile this was compiled from}
+    The slot is the position in the tile's requiredItems, or None for a
+    regular tile (where any one of its items completes it).
+    """
+    exact = {}
+    partial = []
+    required = {}
+    tiles = {}
+    for index, tile in enumerate(board.get('tiles', [])):
+        if not tile.get('items'):
+            continue
+        tiles[index] = {'items': list(tile['items']), 'value': tile.get('value', 0)}
+        if tile.get('requiredItems') and len(tile['requiredItems']) > 1:
+            required[index] = set()
+            for slot, req_item in enumerate(tile['requiredItems']):
+                req_clean = normalize_item_name(req_item)
+                required[index].add(req_clean)
+                partial.append((req_clean, index, slot))
+                matches = exact.setdefault(req_clean, [])
+                if not any(i == index for i, _ in matches):
+                    matches.append((index, slot))
+        else:
+            for tile_item in tile['items']:
+                matches = exact.setdefault(normalize_item_name(tile_item), [])
+                if not any(i == index for i, _ in matches):
+                    matches.append((index, None))
+    return {'exact': exact, 'partial': partial, 'required': required, 'tiles': tiles}
+
+
+def get_tile_match_index(tenant_id, board=None):
+    """The tenant's compiled board, compiling it (from `board`, or a fresh load) if this process hasn't yet."""
+    index = _tile_match_indexes.get(tenant_id)
+    if index is None:
+        if board is None:
+            board = load_bingo_data(tenant_id)
+        index = _tile_match_indexes[tenant_id] = compile_tile_match_index(board)
+    return index
+
+
+def refresh_tile_match_index(tenant_id, board):
+    """Recompile after a board save. tenant_id=None (tenant unknown) drops every compiled board."""
+    if tenant_id is None:
+        _tile_match_indexes.clear()
+    else:
+        _tile_match_indexes[tenant_id] = compile_tile_match_index(board)
+
+
+def match_drop_to_tiles(index, item_name):
+    """
+    Tiles an item counts toward, as [(tile index, slot)] in board order -
+    one entry per tile, using the first requirement slot that matches.
+    Exact matches are a dict lookup; only multi-item tiles' requirements are
+    scanned for the substring case.
+    """
+    item_clean = normalize_item_name(item_name)
+    matches = {tile: slot for tile, slot in index['exact'].get(item_clean, [])}
+    for req_clean, tile, slot in index['partial']:
+        if req_clean in item_clean or item_clean in req_clean:
+            if tile not in matches or (matches[tile] is not None and slot < matches[tile]):
+                matches[tile] = slot
+    return sorted(matches.items())
+
+
 def load_bingo_data(tenant_id=None):
     """Load bingo board data from MongoDB or file"""
     if USE_MONGODB:
@@ -1005,12 +2640,18 @@ def load_bingo_data(tenant_id=None):
 
 def save_bingo_data(data, tenant_id=None):
     """Save bingo board data to MongoDB or file"""
+    refresh_tile_match_index(tenant_id, data)
     if USE_MONGODB:
         try:
             # Get tenant-specific collection
             collections = get_tenant_collections(tenant_id)
             bingo_coll = collections['bingo']
 
+            # Every write to the board bumps its version (see apply_drop_to_board);
+            # a full replace carries the count on rather than trusting the
+            # version in whatever copy of the board the caller started from.
+            current = bingo_coll.find_one({'type': 'current_board'}, {'version': 1}) or {}
+            data['version'] = current.get('version', 0) + 1
             data['type'] = 'current_board'
             bingo_coll.replace_one(
                 {'type': 'current_board'},
@@ -1027,6 +2668,219 @@ def save_bingo_data(data, tenant_id=None):
         json.dump(data, f, indent=2)
 
 
+# Drops and manual overrides only ever touch one tile's completedBy/completedAt/
+# itemProgress, so they're written as targeted $addToSet/$push/$set updates on
+# tiles.N.* instead of load -> mutate -> replace_one of the whole board. That
+# keeps each write small, and two drops landing at once (the bot can send up
+# to 300/min) can no longer overwrite each other's completions. Each update is
+# pinned to the tile's items as compiled, so if the board was shuffled or
+# replaced in the meantime it matches nothing and the drop is re-evaluated
+# against a freshly compiled board instead of landing on the wrong tile.
+#
+# Player names become keys in those paths (tiles.N.completedAt.<player>), so
+# a name Mongo would read as nesting ('.') or an operator (leading '$') is
+# refused before any board write - RuneScape names can't contain either, so
+# only forged or malformed names are affected. Their drops are still recorded
+# in history; they just never touch the board.
+
+def board_safe_player_name(player_name):
+    """True if player_name can be used as a completedAt/itemProgress key."""
+    return (isinstance(player_name, str) and bool(player_name)
+            and '.' not in player_name and not player_name.startswith('$') and '\0' not in player_name)
+
+
+def _pinned_tile_filter(index, tile_meta):
+    return {'type': 'current_board', f'tiles.{index}.items': tile_meta['items']}
+
+
+def _complete_tile(bingo_coll, tile_filter, index, player_name, completed_at_iso):
+    """Add player_name to a tile's completedBy (stamping completedAt). False if they were already on it."""
+    result = bingo_coll.update_one(
+        {**tile_filter, f'tiles.{index}.completedBy': {'$ne': player_name}},
+        {
+            '$addToSet': {f'tiles.{index}.completedBy': player_name},
+            '$set': {f'tiles.{index}.completedAt.{player_name}': completed_at_iso},
+            '$inc': {'version': 1}
+        }
+    )
+    return result.modified_count == 1
+
+
+def _apply_drop_atomically(bingo_coll, match_index, player_name, item_name, completed_at_iso):
+    """Returns (updated, completed_tiles, stale) - stale meaning a matched tile has moved since compiling."""
+    updated = False
+    completed_tiles = []
+    stale = False
+
+    for index, slot in match_drop_to_tiles(match_index, item_name):
+        tile_meta = match_index['tiles'][index]
+        tile_filter = _pinned_tile_filter(index, tile_meta)
+
+        if slot is not None:
+            # Multi-item tile - record progress, then complete once every required item is in
+            progress_path = f'tiles.{index}.itemProgress.{player_name}'
+            board = bingo_coll.find_one_and_update(
+                {**tile_filter, progress_path: {'$ne': item_name}},
+                {'$push': {progress_path: item_name}, '$inc': {'version': 1}},
+                projection={'tiles': {'$slice': [index, 1]}},
+                return_document=ReturnDocument.AFTER
+            )
+            if board is None:
+                # Already in this player's progress - still check completion, in
+                # case the write that added it never got as far as completing
+                board = bingo_coll.find_one(tile_filter, {'tiles': {'$slice': [index, 1]}})
+                if board is None:
+                    stale = True
+                    continue
+                player_items = board['tiles'][0].get('itemProgress', {}).get(player_name, [])
+            else:
+                updated = True
+                player_items = board['tiles'][0].get('itemProgress', {}).get(player_name, [])
+                print(f"   Tile {index + 1}: Added {item_name} to {player_name}'s progress "
+                      f"({len(player_items)}/{len(match_index['required'][index])})")
+
+            if not match_index['required'][index] <= {normalize_item_name(pi) for pi in player_items}:
+                continue
+            if _complete_tile(bingo_coll, tile_filter, index, player_name, completed_at_iso):
+                completed_tiles.append({'tile': index + 1, 'items': tile_meta['items'], 'value': tile_meta['value']})
+                updated = True
+                print(f"   ✅ Tile {index + 1} COMPLETED by {player_name} (all items collected)!")
+        else:
+            # Regular tile - any matching item completes it
+            print(f"      ✓ MATCH: '{item_name}' matches tile {index + 1}")
+            if _complete_tile(bingo_coll, tile_filter, index, player_name, completed_at_iso):
+                completed_tiles.append({'tile': index + 1, 'items': tile_meta['items'], 'value': tile_meta['value']})
+                updated = True
+                print(f"      → Added {player_name} to completedBy list")
+            elif not bingo_coll.count_documents(tile_filter, limit=1):
+                stale = True
+            else:
+                print(f"      → {player_name} already completed this tile")
+
+    return updated, completed_tiles, stale
+
+
+def _evaluate_drops_in_memory(board, match_index, player_name, item_names, completed_at_iso):
+    """
+    Apply one player's drops to an in-memory copy of the board. Returns
+    (updated, completed_tiles, update), where update is the same change as
+    a single MongoDB update document, for callers that write it back in one
+    go rather than saving the whole board.
+    """
+    updated = False
+    completed_tiles = []
+    update = {'$addToSet': {}, '$set': {}, '$push': {}}
+
+    for item_name in item_names:
+        for index, slot in match_drop_to_tiles(match_index, item_name):
+            tile = board['tiles'][index]
+            if slot is not None:
+                player_items = tile.setdefault('itemProgress', {}).setdefault(player_name, [])
+                if item_name not in player_items:
+                    player_items.append(item_name)
+                    update['$push'].setdefault(f'tiles.{index}.itemProgress.{player_name}', {'$each': []})['$each'].append(item_name)
+                    updated = True
+                if not match_index['required'][index] <= {normalize_item_name(pi) for pi in player_items}:
+                    continue
+            if player_name not in tile.setdefault('completedBy', []):
+                tile['completedBy'].append(player_name)
+                tile.setdefault('completedAt', {})[player_name] = completed_at_iso
+                update['$addToSet'][f'tiles.{index}.completedBy'] = player_name
+                update['$set'][f'tiles.{index}.completedAt.{player_name}'] = completed_at_iso
+                completed_tiles.append({'tile': index + 1, 'items': tile['items'], 'value': tile['value']})
+                updated = True
+
+    update = {op: fields for op, fields in update.items() if fields}
+    return updated, completed_tiles, update
+
+
+def _apply_drop_in_memory(tenant_id, player_name, item_names, completed_at_iso):
+    """File-storage fallback: no atomic updates available, so load -> mutate -> save the board."""
+    bingo_data = load_bingo_data(tenant_id)
+    updated, completed_tiles, _ = _evaluate_drops_in_memory(
+        bingo_data, get_tile_match_index(tenant_id, bingo_data), player_name, item_names, completed_at_iso)
+    if updated:
+        save_bingo_data(bingo_data, tenant_id)
+    return updated, completed_tiles
+
+
+def _compiled_index_matches_board(match_index, board):
+    tiles = board.get('tiles', [])
+    return all(index < len(tiles) and tiles[index].get('items') == meta['items']
+               for index, meta in match_index['tiles'].items())
+
+
+def apply_drops_to_board(tenant_id, player_name, item_names, completed_at_iso, max_attempts=5):
+    """
+    Evaluate several of one player's drops (e.g. every item in one Dink loot
+    message) against the board with one read and at most one write: the
+    changes are worked out on an in-memory copy, then written as a single
+    update conditional on the board's version being unchanged - if another
+    write got in first, re-read and try again. Returns (updated, completed_tiles)
+    like apply_drop_to_board.
+    """
+    if not board_safe_player_name(player_name):
+        print(f"[!] Not applying drops to the board for unusable player name {player_name!r}")
+        return False, []
+    if not USE_MONGODB:
+        return _apply_drop_in_memory(tenant_id, player_name, item_names, completed_at_iso)
+
+    bingo_coll = get_tenant_collections(tenant_id)['bingo']
+    for _ in range(max_attempts):
+        board = bingo_coll.find_one({'type': 'current_board'})
+        if not board:
+            return False, []
+        match_index = get_tile_match_index(tenant_id, board)
+        if not _compiled_index_matches_board(match_index, board):
+            refresh_tile_match_index(tenant_id, board)
+            match_index = get_tile_match_index(tenant_id, board)
+
+        updated, completed_tiles, update = _evaluate_drops_in_memory(
+            board, match_index, player_name, item_names, completed_at_iso)
+        if not updated:
+            return False, []
+
+        update['$inc'] = {'version': 1}
+        result = bingo_coll.update_one({'type': 'current_board', 'version': board.get('version')}, update)
+        if result.modified_count:
+            return True, completed_tiles
+        print(f"[!] Board changed while applying batch for {player_name} - retrying")
+
+    print(f"[X] Gave up applying batch for {player_name} after {max_attempts} attempts")
+    return False, []
+
+
+def apply_drop_to_board(tenant_id, player_name, item_name, completed_at_iso):
+    """
+    Evaluate one drop against the tenant's board, recording item progress
+    and tile completions. Returns (updated, completed_tiles), where updated
+    means the board changed at all (progress counts, even without a
+    completion).
+    """
+    if not board_safe_player_name(player_name):
+        print(f"[!] Not applying drop to the board for unusable player name {player_name!r}")
+        return False, []
+    if not USE_MONGODB:
+        return _apply_drop_in_memory(tenant_id, player_name, [item_name], completed_at_iso)
+
+    bingo_coll = get_tenant_collections(tenant_id)['bingo']
+    updated, completed_tiles, stale = _apply_drop_atomically(
+        bingo_coll, get_tile_match_index(tenant_id), player_name, item_name, completed_at_iso)
+
+    if stale:
+        # Board layout changed under us (shuffled/replaced by another process) -
+        # recompile and go again. Tiles already applied above are no-ops the
+        # second time round thanks to the $ne guards.
+        print(f"[!] Board changed since it was compiled - re-evaluating drop")
+        refresh_tile_match_index(tenant_id, load_bingo_data(tenant_id))
+        retry_updated, retry_completed, _ = _apply_drop_atomically(
+            bingo_coll, get_tile_match_index(tenant_id), player_name, item_name, completed_at_iso)
+        updated = updated or retry_updated
+        completed_tiles.extend(retry_completed)
+
+    return updated, completed_tiles
+
+
 @app.route('/bingo', methods=['GET'])
 def get_bingo():
     """Get current bingo board state"""
@@ -1048,6 +2902,170 @@ def admin_login():
         return jsonify({'success': False, 'message': 'Incorrect password'}), 401
 
 
+# ============================================
+# ASYNC INGESTION (optional write-behind queue)
+# ============================================
+# With ASYNC_INGEST=true, /drop, /drops/batch, /death and /pb only validate
+# the request (auth, required fields, event window) and then hand the work
+# to a bounded in-process queue, answering 202 with an ingest_id straight
+# away. A single worker thread drains the queue in batches: one insert_many
+# per tenant collection, then tile evaluation grouped per player. That keeps
+# Mongo latency spikes on Render's free tier from turning into bot timeouts.
+# The trade-off is that the bot no longer hears which tiles a drop completed,
+# and anything still queued is lost if the process is killed outright
+# (a normal exit flushes it - see _flush_ingest_queue). The worker is started
+# by the first enqueue, in whichever process actually serves requests, so a
+# pre-fork server's workers each get their own. Only `python bingo_api.py`
+# turns SIGTERM into a normal exit; a host server keeps its own signal
+# handling.
+# Off by default: the synchronous path is the simpler one to reason about.
+ASYNC_INGEST = os.environ.get('ASYNC_INGEST', 'false').lower() == 'true'
+INGEST_QUEUE_MAX = int(os.environ.get('INGEST_QUEUE_MAX', 5000))
+INGEST_BATCH_MAX = 200
+
+_ingest_queue = queue.Queue(maxsize=INGEST_QUEUE_MAX)
+_ingest_stop = threading.Event()
+_ingest_worker = None
+_ingest_worker_lock = threading.Lock()
+_ingest_stats = {
+    'enqueued': 0,
+    'processed': 0,
+    'failed': 0,
+    'rejected_full': 0,
+    'last_batch_size': 0,
+    'last_lag_seconds': None,
+    'max_lag_seconds': 0.0
+}
+_ingest_stats_lock = threading.Lock()
+
+
+def enqueue_ingest(kind, tenant_id, **payload):
+    """Queue one ingest job. Returns its ingest_id, or None if the queue is full."""
+    start_ingest_worker()
+    job = {'id': uuid.uuid4().hex, 'kind': kind, 'tenant_id': tenant_id,
+           'enqueued_at': time.monotonic(), **payload}
+    try:
+        _ingest_queue.put_nowait(job)
+    except queue.Full:
+        with _ingest_stats_lock:
+            _ingest_stats['rejected_full'] += 1
+        return None
+    with _ingest_stats_lock:
+        _ingest_stats['enqueued'] += 1
+    return job['id']
+
+
+def accepted_or_busy(ingest_id):
+    """The response for an async-ingest handler once it has tried to enqueue."""
+    if ingest_id is None:
+        return jsonify({'success': False, 'error': 'Ingest queue is full, retry shortly'}), 503
+    return jsonify({'success': True, 'queued': True, 'ingest_id': ingest_id}), 202
+
+
+def _process_ingest_batch(jobs):
+    inserts = {}  # (tenant_id, collection key) -> [docs]
+    for job in jobs:
+        tenant_id = job['tenant_id']
+        if job['kind'] == 'drop':
+            inserts.setdefault((tenant_id, 'history'), []).extend(job['history_docs'])
+        elif job['kind'] == 'death':
+            inserts.setdefault((tenant_id, 'deaths'), []).append(job['doc'])
+        elif job['kind'] == 'pb':
+            inserts.setdefault((tenant_id, 'personal_bests'), []).append(job['doc'])
+
+    failed = 0
+    board_updates = {}  # (tenant_id, player, completed_at_iso) -> [item names]
+    for (tenant_id, key), docs in inserts.items():
+        try:
+            collections = get_tenant_collections(tenant_id)
+            if key == 'history':
+                inserted = record_history_docs(collections, docs, tenant_id)
+            elif key == 'personal_bests':
+                inserted = save_personal_bests(collections, docs)
+            else:
+                inserted = insert_ingest_docs(collections[key], docs)
+        except Exception as e:
+            failed += len(docs)
+            print(f"[X] Ingest worker: failed writing {len(docs)} docs to {key} for {tenant_id}: {e}")
+            continue
+        if key == 'history':
+            # Replays (duplicate ingest keys) aren't re-evaluated against the board
+            for doc in inserted:
+                update_key = (tenant_id, doc['player'], completion_timestamp_iso(doc['timestamp']))
+                board_updates.setdefault(update_key, []).append(doc['item'])
+    for (tenant_id, player_name, completed_at_iso), item_names in board_updates.items():
+        try:
+            apply_drops_to_board(tenant_id, player_name, item_names, completed_at_iso)
+        except Exception as e:
+            print(f"[X] Ingest worker: tile evaluation failed for {player_name}: {e}")
+    return failed
+
+
+def _ingest_worker_loop():
+    while not _ingest_stop.is_set() or not _ingest_queue.empty():
+        try:
+            jobs = [_ingest_queue.get(timeout=1)]
+        except queue.Empty:
+            continue
+        while len(jobs) < INGEST_BATCH_MAX:
+            try:
+                jobs.append(_ingest_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        lag = time.monotonic() - min(job['enqueued_at'] for job in jobs)
+        try:
+            failed = _process_ingest_batch(jobs)
+        except Exception as e:
+            failed = len(jobs)
+            print(f"[X] Ingest worker: batch of {len(jobs)} failed: {e}")
+        with _ingest_stats_lock:
+            _ingest_stats['processed'] += len(jobs)
+            _ingest_stats['failed'] += failed
+            _ingest_stats['last_batch_size'] = len(jobs)
+            _ingest_stats['last_lag_seconds'] = round(lag, 3)
+            _ingest_stats['max_lag_seconds'] = round(max(_ingest_stats['max_lag_seconds'], lag), 3)
+        for _ in jobs:
+            _ingest_queue.task_done()
+
+
+def start_ingest_worker():
+    """Start this process's ingest worker if it isn't running yet (queued work is flushed at exit)."""
+    global _ingest_worker
+    with _ingest_worker_lock:
+        if _ingest_worker and _ingest_worker.is_alive():
+            return
+        if _ingest_worker is None:
+            atexit.register(_flush_ingest_queue)
+        _ingest_worker = threading.Thread(target=_ingest_worker_loop, name='ingest-worker', daemon=True)
+        _ingest_worker.start()
+    print(f"[OK] Async ingestion worker started (queue size {INGEST_QUEUE_MAX})")
+
+
+def _flush_ingest_queue(timeout=30):
+    """Stop taking new work and let the worker drain what's already queued."""
+    _ingest_stop.set()
+    if _ingest_worker and _ingest_worker.is_alive():
+        remaining = _ingest_queue.qsize()
+        if remaining:
+            print(f"[*] Flushing {remaining} queued ingest jobs before shutdown...")
+        _ingest_worker.join(timeout)
+
+
+def get_ingest_stats():
+    with _ingest_queue.mutex:
+        oldest = _ingest_queue.queue[0]['enqueued_at'] if _ingest_queue.queue else None
+    with _ingest_stats_lock:
+        stats = dict(_ingest_stats)
+    return {
+        **stats,
+        'enabled': ASYNC_INGEST,
+        'depth': _ingest_queue.qsize(),
+        'max_depth': INGEST_QUEUE_MAX,
+        'oldest_queued_seconds': round(time.monotonic() - oldest, 3) if oldest is not None else None
+    }
+
+
 @app.route('/drop', methods=['POST'])
 @limiter.limit("300 per minute")
 def record_drop():
@@ -1060,7 +3078,6 @@ def record_drop():
     value = data.get('value', 0)  #Get value from bot
     value_string = data.get('value_string', '')  #Original value text (e.g., "2.95M")
     rarity = data.get('rarity')  # Raw "1 in X" text from Dink, when known (single-item drops only)
-    rarity_1_in = parse_rarity_denominator(rarity)
     timestamp = data.get('timestamp', datetime.utcnow().isoformat())
 
     tenant = get_authenticated_tenant_by_api_key()
@@ -1071,14 +3088,28 @@ def record_drop():
 
     # Check if within event window
     if not is_within_event_window(tenant_id=tenant_id):
-        event_config = collections['bingo'].find_one({'_id': 'event_config'})
-        event_name = event_config.get('eventName', 'Event') if event_config else 'Event'
+        event_name = get_event_window(tenant_id)['name']
         print(f"[!] Drop rejected: Outside event window ({event_name})")
         return jsonify({
             'success': False,
             'message': f'Drop rejected: Outside {event_name} event window'
         })
 
+    if not player_name or not item_name:
+        return jsonify({'error': 'Missing player or item'}), 400
+
+    completed_at_iso = completion_timestamp_iso(timestamp)
+
+    ingest_key = get_ingest_key(data)
+
+    if ASYNC_INGEST and USE_MONGODB:
+        try:
+            history_doc = build_history_doc(
+                player_name, item_name, drop_type, source, value, value_string, rarity, timestamp, ingest_key)
+        except ValueError:
+            return jsonify({'error': 'Invalid timestamp'}), 400
+        return accepted_or_busy(enqueue_ingest('drop', tenant_id, history_docs=[history_doc]))
+
     print(f"\n{'=' * 60}")
     print(f"[DROP] Received from Discord bot:")
     print(f"   Tenant: {tenant['name'] if tenant else 'default'}")
@@ -1088,116 +3119,27 @@ def record_drop():
     print(f"   Value: {value_string} ({value:,.0f} gp)")
     print(f"{'=' * 60}")
 
-    if not player_name or not item_name:
-        return jsonify({'error': 'Missing player or item'}), 400
-
     # Save to tenant's history collection
     if USE_MONGODB:
         try:
-            collections['history'].insert_one({
-                'player': player_name,
-                'item': item_name,
-                'drop_type': drop_type,
-                'source': source,
-                'value': value,
-                'value_string': value_string,
-                'rarity': rarity,
-                'rarity_1_in': rarity_1_in,
-                'timestamp': datetime.fromisoformat(timestamp.replace('Z', '+00:00')) if isinstance(timestamp,
-                                                                                                    str) else timestamp
-            })
+            inserted = record_history_docs(collections, [build_history_doc(
+                player_name, item_name, drop_type, source, value, value_string, rarity, timestamp, ingest_key)],
+                tenant_id)
+            if not inserted:
+                print(f"[!] Duplicate drop ignored (ingest key {ingest_key})")
+                return jsonify({
+                    'success': False,
+                    'message': 'Drop already recorded',
+                    'duplicate': True
+                })
             print(f"[OK] Saved to history collection (type: {drop_type})")
         except Exception as e:
             print(f"[X] Error saving to history: {e}")
 
-    # Normalize the drop timestamp once so it can be stamped onto any tile
-    # this drop completes (see completedAt below).
-    try:
-        completed_at_iso = (datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                             if isinstance(timestamp, str) else timestamp).isoformat()
-    except (ValueError, AttributeError):
-        completed_at_iso = datetime.utcnow().isoformat()
-
     # Check tiles for completion (using tenant's bingo data)
-    bingo_data = load_bingo_data(tenant_id)
-    updated = False
-    completed_tiles = []
-
-    print(f"[*] Checking {len(bingo_data['tiles'])} tiles...")
-
-    for index, tile in enumerate(bingo_data['tiles']):
-        if not tile['items']:
-            continue
-
-        # Check if this is a multi-item requirement tile
-        if tile.get('requiredItems') and len(tile['requiredItems']) > 1:
-            # Multi-item tile - track progress
-            if 'itemProgress' not in tile:
-                tile['itemProgress'] = {}
-
-            if player_name not in tile['itemProgress']:
-                tile['itemProgress'][player_name] = []
-
-            player_items = tile['itemProgress'][player_name]
-
-            # Check if this item is required and not yet collected
-            for req_item in tile['requiredItems']:
-                req_item_clean = req_item.strip().lower()
-                item_name_clean = item_name.strip().lower()
-
-                if (req_item_clean == item_name_clean or
-                        req_item_clean in item_name_clean or
-                        item_name_clean in req_item_clean):
-
-                    # Add to progress if not already there
-                    if item_name not in player_items:
-                        player_items.append(item_name)
-                        print(
-                            f"   Tile {index + 1}: Added {item_name} to {player_name}'s progress ({len(player_items)}/{len(tile['requiredItems'])})")
-                        updated = True
-
-                    # Check if all items collected
-                    has_all = all(
-                        any(req_item.strip().lower() == pi.strip().lower() for pi in player_items)
-                        for req_item in tile['requiredItems']
-                    )
-
-                    if has_all and player_name not in tile['completedBy']:
-                        tile['completedBy'].append(player_name)
-                        tile.setdefault('completedAt', {})[player_name] = completed_at_iso
-                        completed_tiles.append({
-                            'tile': index + 1,
-                            'items': tile['items'],
-                            'value': tile['value']
-                        })
-                        print(f"   ✅ Tile {index + 1} COMPLETED by {player_name} (all items collected)!")
-
-                    break
-        else:
-            # Regular tile - any matching item completes it
-            for tile_item in tile['items']:
-                tile_item_clean = tile_item.strip().lower()
-                item_name_clean = item_name.strip().lower()
-
-                if tile_item_clean == item_name_clean:
-                    print(f"      ✓ MATCH: '{item_name}' matches '{tile_item}'")
-
-                    if player_name not in tile['completedBy']:
-                        tile['completedBy'].append(player_name)
-                        tile.setdefault('completedAt', {})[player_name] = completed_at_iso
-                        completed_tiles.append({
-                            'tile': index + 1,
-                            'items': tile['items'],
-                            'value': tile['value']
-                        })
-                        updated = True
-                        print(f"      → Added {player_name} to completedBy list")
-                    else:
-                        print(f"      → {player_name} already completed this tile")
-                    break
+    updated, completed_tiles = apply_drop_to_board(tenant_id, player_name, item_name, completed_at_iso)
 
     if updated:
-        save_bingo_data(bingo_data, tenant_id)
         print(f"[OK] Saved updated board data")
         print(f"{'=' * 60}\n")
         return jsonify({
@@ -1216,6 +3158,92 @@ def record_drop():
     })
 
 
+@app.route('/drops/batch', methods=['POST'])
+@limiter.limit("300 per minute")
+def record_drop_batch():
+    """
+    Every item from one Dink loot message in a single call - what the bot
+    uses for live drops. Same effect as one /drop per item, but auth, the
+    event-window check and the history insert happen once, and the board is
+    read once and written at most once (see apply_drops_to_board).
+
+    Body: {player, drop_type, source, timestamp?, items: [{item, value,
+    value_string, rarity, idempotency_key}, ...]}
+    Items whose idempotency_key was already recorded are skipped entirely.
+    """
+    data = request.json or {}
+    player_name = data.get('player')
+    drop_type = data.get('drop_type', 'loot')
+    source = data.get('source')
+    timestamp = data.get('timestamp', datetime.utcnow().isoformat())
+    items = data.get('items')
+
+    tenant = get_authenticated_tenant_by_api_key()
+    if not tenant:
+        return jsonify({'error': 'Unauthorized'}), 401
+    tenant_id = tenant['tenant_id']
+    collections = get_tenant_collections(tenant_id)
+
+    if not player_name or not isinstance(items, list) or not items:
+        return jsonify({'error': 'Missing player or items'}), 400
+    if any(not isinstance(entry, dict) or not entry.get('item') for entry in items):
+        return jsonify({'error': 'Every entry in items needs an item name'}), 400
+
+    if not is_within_event_window(tenant_id=tenant_id):
+        event_name = get_event_window(tenant_id)['name']
+        print(f"[!] Drop batch rejected: Outside event window ({event_name})")
+        return jsonify({
+            'success': False,
+            'message': f'Drops rejected: Outside {event_name} event window'
+        })
+
+    item_names = [entry['item'] for entry in items]
+    completed_at_iso = completion_timestamp_iso(timestamp)
+
+    if USE_MONGODB:
+        try:
+            history_docs = [
+                build_history_doc(player_name, entry['item'], drop_type, source,
+                                  entry.get('value', 0), entry.get('value_string', ''),
+                                  entry.get('rarity'), timestamp, entry.get('idempotency_key'))
+                for entry in items
+            ]
+        except ValueError:
+            return jsonify({'error': 'Invalid timestamp'}), 400
+
+        if ASYNC_INGEST:
+            return accepted_or_busy(enqueue_ingest('drop', tenant_id, history_docs=history_docs))
+
+        print(f"[DROP BATCH] {player_name}: {', '.join(item_names)} ({drop_type})")
+        try:
+            inserted = record_history_docs(collections, history_docs, tenant_id)
+            if not inserted:
+                return jsonify({
+                    'success': False,
+                    'message': 'Drops already recorded',
+                    'duplicate': True,
+                    'items': len(items)
+                })
+            item_names = [doc['item'] for doc in inserted]
+        except Exception as e:
+            print(f"[X] Error saving batch to history: {e}")
+
+    updated, completed_tiles = apply_drops_to_board(tenant_id, player_name, item_names, completed_at_iso)
+
+    if updated:
+        return jsonify({
+            'success': True,
+            'message': f'{player_name} completed {len(completed_tiles)} tile(s)!',
+            'completedTiles': completed_tiles,
+            'items': len(items)
+        })
+    return jsonify({
+        'success': False,
+        'message': 'No matching tiles found or already completed',
+        'items': len(items)
+    })
+
+
 @app.route('/manual-drop', methods=['POST'])
 @limiter.limit("30 per minute")
 def manual_drop():
@@ -1249,15 +3277,8 @@ def manual_drop():
     # Save to tenant's history collection (no tile checking)
     if USE_MONGODB:
         try:
-            collections['history'].insert_one({
-                'player': player_name,
-                'item': item_name,
-                'drop_type': 'loot',
-                'source': 'Manual Entry',
-                'value': 0,
-                'value_string': '',
-                'timestamp': datetime.utcnow()
-            })
+            record_history_docs(collections, [build_history_doc(
+                player_name, item_name, drop_type='loot', source='Manual Entry')], tenant_id)
             print(f"[OK] Saved to history collection")
             print(f"{'=' * 60}\n")
             return jsonify({
@@ -1283,7 +3304,6 @@ def record_history_only():
     value = data.get('value', 0)
     value_string = data.get('value_string', '')
     rarity = data.get('rarity')
-    rarity_1_in = parse_rarity_denominator(rarity)
 
     tenant = get_authenticated_tenant_by_api_key()
     if not tenant:
@@ -1295,20 +3315,17 @@ def record_history_only():
         return jsonify({'error': 'Missing player or item'}), 400
 
     # Save to tenant's history collection
-    if USE_MONGODB:
-        try:
-            collections['history'].insert_one({
-                'player': player_name,
-                'item': item_name,
-                'drop_type': drop_type,
-                'source': source,
-                'timestamp': datetime.fromisoformat(timestamp.replace('Z', '+00:00')) if isinstance(timestamp,
-                                                                                                    str) else timestamp,
-                'value': value,
-                'value_string': value_string,
-                'rarity': rarity,
-                'rarity_1_in': rarity_1_in,
-            })
+    if USE_MONGODB:
+        try:
+            inserted = record_history_docs(collections, [build_history_doc(
+                player_name, item_name, drop_type, source, value, value_string, rarity, timestamp,
+                get_ingest_key(data))], tenant_id)
+            if not inserted:
+                return jsonify({
+                    'success': False,
+                    'message': f'{player_name} - {item_name} already in history',
+                    'duplicate': True
+                })
             return jsonify({
                 'success': True,
                 'message': f'Saved {player_name} - {item_name} to history (type: {drop_type})',
@@ -1412,7 +3429,27 @@ def backfill_rarity():
                 update_fields['value_string'] = total_value
 
         if update_fields:
-            collections['history'].update_one({'_id': target_doc['_id']}, {'$set': update_fields})
+            collections['history'].update_one({'_id': target_doc['_id']},
+                                              {'$set': {**update_fields, 'changed_at': datetime.utcnow()}})
+            # Keep the daily rollup in step with the filled-in value/rarity
+            rollup_update = {}
+            if 'value' in update_fields:
+                rollup_update['$inc'] = {'value': update_fields['value'] - (target_doc.get('value') or 0)}
+                if target_doc.get('is_primary') is not False:
+                    rollup_update['$inc']['drop_value'] = rollup_update['$inc']['value']
+                rollup_update['$max'] = {'max_value': update_fields['value']}
+            if update_fields.get('rarity_1_in') is not None:
+                rollup_update.setdefault('$max', {})['max_rarity_1_in'] = update_fields['rarity_1_in']
+            if 'value' in update_fields:
+                add_to_value_totals(collections, tenant_id, [
+                    {**target_doc, 'value': update_fields['value'] - (target_doc.get('value') or 0)}], adjustment=True)
+            if rollup_update:
+                collections['history_daily'].update_one({
+                    'day': history_day(target_doc['timestamp']),
+                    'player': target_doc['player'],
+                    'item': target_doc['item'],
+                    'drop_type': target_doc.get('drop_type', 'loot')
+                }, rollup_update)
             updated += 1
 
     return jsonify({
@@ -1439,16 +3476,12 @@ def record_death():
     tenant_id = tenant['tenant_id']
     collections = get_tenant_collections(tenant_id)
 
-    npc_text = f" to {npc}" if npc else ""
-    print(f"\n[DEATH] {player_name}{npc_text}")
-
     if not player_name:
         return jsonify({'error': 'Missing player name'}), 400
 
     # Check if within event window
     if not is_within_event_window(tenant_id=tenant_id):
-        event_config = collections['bingo'].find_one({'_id': 'event_config'})
-        event_name = event_config.get('eventName', 'Event') if event_config else 'Event'
+        event_name = get_event_window(tenant_id)['name']
         print(f"[!] Death rejected: Outside event window ({event_name})")
         return jsonify({
             'success': False,
@@ -1457,12 +3490,30 @@ def record_death():
 
     if USE_MONGODB:
         try:
-            collections['deaths'].insert_one({
+            death_doc = {
                 'player': player_name,
                 'npc': npc,
                 'timestamp': datetime.fromisoformat(timestamp.replace('Z', '+00:00')) if isinstance(timestamp,
                                                                                                     str) else timestamp
-            })
+            }
+            ingest_key = get_ingest_key(data)
+            if ingest_key:
+                death_doc['ingest_key'] = ingest_key
+        except ValueError:
+            return jsonify({'error': 'Invalid timestamp'}), 400
+
+        if ASYNC_INGEST:
+            return accepted_or_busy(enqueue_ingest('death', tenant_id, doc=death_doc))
+
+        npc_text = f" to {npc}" if npc else ""
+        print(f"\n[DEATH] {player_name}{npc_text}")
+        try:
+            if not insert_ingest_docs(collections['deaths'], [death_doc]):
+                return jsonify({
+                    'success': False,
+                    'message': f'{player_name} death already recorded',
+                    'duplicate': True
+                })
             return jsonify({
                 'success': True,
                 'message': f'{player_name} death recorded'
@@ -1522,7 +3573,7 @@ def cleanup_death_markdown():
             if cleaned_npc != original_npc and cleaned_npc:
                 collections['deaths'].update_one(
                     {'_id': death['_id']},
-                    {'$set': {'npc': cleaned_npc}}
+                    {'$set': {'npc': cleaned_npc, 'changed_at': datetime.utcnow()}}
                 )
                 updated_count += 1
                 print(f"Cleaned: '{original_npc}' → '{cleaned_npc}'")
@@ -1717,6 +3768,7 @@ def save_rank_snapshot():
             'timestamp': {'$gte': today_start}
         })
 
+        snapshot['changed_at'] = datetime.utcnow()
         if existing:
             # Update today's snapshot
             collections['rank_history'].update_one(
@@ -1734,9 +3786,82 @@ def save_rank_snapshot():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Item search runs against item_key, the lowercased/trimmed item name written
+# by build_history_doc (backfilled for older docs at startup - see
+# backfill_item_keys), so it never needs a case-insensitive regex:
+#   exact    - item_key equality, an index point lookup
+#   prefix   - anchored regex on item_key, an index range scan
+#   text     - $text word search on the item_text index ("whip" finds
+#              "Abyssal whip")
+#   contains - unanchored substring match (the default, as /history has
+#              always behaved); scans the item_key index rather than documents
+HISTORY_SEARCH_MODES = ('contains', 'exact', 'prefix', 'text')
+
+
+def history_search_filter(search, mode='contains'):
+    """Query fragment matching history items against a user search term (input is never treated as a regex)."""
+    key = normalize_item_name(search)
+    if mode == 'exact':
+        return {'item_key': key}
+    if mode == 'prefix':
+        return {'item_key': {'$regex': f'^{re.escape(key)}'}}
+    if mode == 'text':
+        return {'$text': {'$search': search}}
+    return {'item_key': {'$regex': re.escape(key)}}
+
+
+# /history pages newest-first on (timestamp, _id) rather than by skip/offset:
+# each response carries an opaque `next` token encoding the last row's sort
+# key, and the following page starts strictly after it. Every page is then an
+# index range scan of `limit` rows however deep the caller has scrolled, and
+# rows inserted meanwhile don't shift or repeat entries across pages.
+HISTORY_PAGE_MAX = 10000
+
+
+def encode_keyset_token(timestamp, object_id):
+    """Opaque token for a (datetime, _id) keyset position - /history cursors and change feed tokens."""
+    key = {'id': str(object_id)}
+    if isinstance(timestamp, datetime):
+        key['t'] = timestamp.isoformat()
+    else:
+        key['s'] = timestamp  # legacy string timestamp
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_keyset_token(token):
+    """(timestamp, ObjectId) from an encode_keyset_token token; raises ValueError if it's malformed."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        timestamp = datetime.fromisoformat(key['t']) if 't' in key else key['s']
+        return timestamp, ObjectId(key['id'])
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def encode_history_cursor(doc):
+    """Opaque continuation token for the /history page after `doc`."""
+    return encode_keyset_token(doc['timestamp'], doc['_id'])
+
+
+def history_page_query(query, cursor):
+    """Narrow a /history filter to the rows strictly after `cursor` in (timestamp, _id) descending order."""
+    if not cursor:
+        return query
+    timestamp, last_id = decode_keyset_token(cursor)
+    after = {'$or': [
+        {'timestamp': {'$lt': timestamp}},
+        {'timestamp': timestamp, '_id': {'$lt': last_id}}
+    ]}
+    return {'$and': [query, after]} if query else after
+
+
 @app.route('/history', methods=['GET'])
 def get_history():
-    """Get drop history with optional filters"""
+    """
+    Get drop history with optional filters, newest first. Pass the response's
+    `next` token back as ?cursor= to get the following page (`next` is None on
+    the last page).
+    """
     if not USE_MONGODB:
         return jsonify({'error': 'MongoDB not available'}), 503
 
@@ -1753,18 +3878,28 @@ def get_history():
         drop_type = request.args.get('type')  # 'loot' or 'collection_log'
         min_value = request.args.get('minValue')  # minimum value filter
         search = request.args.get('search')  # item name search
-        limit = int(request.args.get('limit', 100))
+        search_mode = request.args.get('search_mode', 'contains')  # see HISTORY_SEARCH_MODES
+        cursor = request.args.get('cursor')  # `next` token from the previous page
+        try:
+            limit = min(max(int(request.args.get('limit', 100)), 1), HISTORY_PAGE_MAX)
+            min_value = int(min_value) if min_value else 0
+        except ValueError:
+            return jsonify({'error': 'limit and minValue must be integers'}), 400
+        start = _parse_event_date(start_date)
+        end = _parse_event_date(end_date)
+        if (start_date and start is None) or (end_date and end is None):
+            return jsonify({'error': 'Invalid start_date/end_date'}), 400
 
         # Build query
         query = {}
         if player:
             query['player'] = player
-        if start_date or end_date:
+        if start or end:
             query['timestamp'] = {}
-            if start_date:
-                query['timestamp']['$gte'] = datetime.fromisoformat(start_date)
-            if end_date:
-                query['timestamp']['$lte'] = datetime.fromisoformat(end_date)
+            if start:
+                query['timestamp']['$gte'] = start
+            if end:
+                query['timestamp']['$lte'] = end
 
         # Drop type filter
         if drop_type:
@@ -1772,14 +3907,27 @@ def get_history():
 
         # Minimum value filter
         if min_value:
-            query['value'] = {'$gte': int(min_value)}
+            query['value'] = {'$gte': min_value}
 
         # Item search filter (case-insensitive)
         if search:
-            query['item'] = {'$regex': search, '$options': 'i'}
+            if search_mode not in HISTORY_SEARCH_MODES:
+                return jsonify({'error': f'search_mode must be one of {", ".join(HISTORY_SEARCH_MODES)}'}), 400
+            query.update(history_search_filter(search, search_mode))
 
-        # Fetch history from tenant collection
-        history = list(collections['history'].find(query).sort('timestamp', -1).limit(limit))
+        try:
+            query = history_page_query(query, cursor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Fetch one row past the page to know whether there is a next one
+        history = list(collections['history'].find(query)
+                       .sort([('timestamp', -1), ('_id', -1)])
+                       .limit(limit + 1))
+        next_cursor = None
+        if len(history) > limit:
+            history = history[:limit]
+            next_cursor = encode_history_cursor(history[-1])
 
         # Format results (remove MongoDB _id)
         for item in history:
@@ -1789,7 +3937,8 @@ def get_history():
 
         return jsonify({
             'history': history,
-            'count': len(history)
+            'count': len(history),
+            'next': next_cursor
         })
 
     except Exception as e:
@@ -1813,26 +3962,332 @@ def get_total_value_looted():
     try:
         all_time = request.args.get('all_time', 'false').lower() == 'true'
 
-        match_query = {}
         since = None
+        since_dt = None
         if not all_time:
-            event_config = collections['bingo'].find_one({'_id': 'event_config'})
-            if event_config and event_config.get('enabled') and event_config.get('startDate'):
-                since = event_config['startDate']
-                match_query['timestamp'] = {'$gte': datetime.fromisoformat(since.replace('Z', '+00:00'))}
-
-        result = list(collections['history'].aggregate([
-            {'$match': match_query},
-            {'$group': {'_id': None, 'total': {'$sum': '$value'}}}
-        ]))
+            window = get_event_window(tenant_id)
+            if window['enabled'] and window['start']:
+                since = window['start_date']
+                since_dt = window['start']
 
-        total = result[0]['total'] if result else 0
+        # One or two counter reads - see add_to_value_totals
+        total = get_value_total(collections, since_dt)
         return jsonify({'total_value': total, 'since': since})
 
     except Exception as e:
         return jsonify({'error': f'Failed to get total value: {str(e)}'}), 500
 
 
+# Analytics dashboard series, computed in Mongo rather than in the browser.
+# js/app.js used to pull /history?limit=10000 and bucket the rows itself,
+# which shipped megabytes per page view and silently capped the charts at 10k
+# drops. /analytics/summary returns only the bucketed numbers.
+#
+# Buckets are computed in the caller's timezone (?tz=Europe/London or
+# ?tz=+01:00, default UTC) so "which day/hour" matches what the browser
+# shows. The loot + collection_log pair Dink sends for one pickup counts
+# once: only its is_primary doc is counted (see link_drop_twins), so the
+# pipeline is a plain filter rather than a window over every player/item.
+#
+# Once a tenant's history_daily rollup is ready, the per-player and top-item
+# series (and, for a UTC request, the per-day/per-month ones) are summed from
+# its rows instead - O(days x players x items) however many drops there are.
+# That only holds for filters the rollup can answer: a whole-day start_date
+# and no end_date, minValue or search. The heatmap, totals and most valuable
+# drops need individual drops, so they're always read from history.
+ANALYTICS_TOP_MAX = 50
+ANALYTICS_ROLLUP_FACETS = ('per_player', 'top_items')
+ANALYTICS_ROLLUP_UTC_FACETS = ('per_day', 'per_day_player', 'per_month')
+_TZ_OFFSET_RE = re.compile(r'^[+-]\d{2}(:?\d{2})?$')
+
+
+def _valid_timezone(tz):
+    """Olson names (validated against the local tz database) or +HH:MM offsets, as Mongo's date operators accept."""
+    if _TZ_OFFSET_RE.match(tz):
+        return True
+    try:
+        from zoneinfo import ZoneInfo
+        ZoneInfo(tz)
+        return True
+    except Exception:
+        return False
+
+
+def _is_utc_timezone(tz):
+    """True for a timezone whose days are UTC days, so history_daily's day buckets line up."""
+    if _TZ_OFFSET_RE.match(tz):
+        return not tz[1:].replace(':', '').strip('0')
+    return tz in ('UTC', 'Etc/UTC', 'GMT', 'Etc/GMT')
+
+
+def build_analytics_pipeline(match_query, tz='UTC', top=10, skip=()):
+    """Aggregation pipeline for /analytics/summary: one $facet over the filtered drop events, minus `skip`."""
+    day_of_week = {'$subtract': [{'$dayOfWeek': {'date': '$timestamp', 'timezone': tz}}, 1]}  # 0 = Sunday, as JS getDay()
+    hour = {'$hour': {'date': '$timestamp', 'timezone': tz}}
+
+    facets = {
+        'totals': [
+            {'$group': {'_id': None, 'drops': {'$sum': 1}, 'value': {'$sum': '$value'},
+                        'players': {'$addToSet': '$player'}, 'items': {'$addToSet': '$item'},
+                        'tiles_completed': {'$sum': {'$cond': [{'$eq': ['$tileCompleted', True]}, 1, 0]}},
+                        'first': {'$min': '$timestamp'}, 'last': {'$max': '$timestamp'}}},
+            {'$project': {'_id': 0, 'drops': 1, 'value': 1, 'first': 1, 'last': 1, 'tiles_completed': 1,
+                          'players': {'$size': '$players'}, 'unique_items': {'$size': '$items'}}}
+        ],
+        'per_day': [
+            {'$group': {'_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$timestamp', 'timezone': tz}},
+                        'drops': {'$sum': 1}, 'value': {'$sum': '$value'}}},
+            {'$sort': {'_id': 1}}
+        ],
+        'per_day_player': [
+            {'$group': {'_id': {'date': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$timestamp', 'timezone': tz}},
+                                'player': '$player'},
+                        'drops': {'$sum': 1}}},
+            {'$sort': {'_id.date': 1, '_id.player': 1}}
+        ],
+        'per_month': [
+            {'$group': {'_id': {'$dateToString': {'format': '%Y-%m', 'date': '$timestamp', 'timezone': tz}},
+                        'drops': {'$sum': 1}, 'value': {'$sum': '$value'}}},
+            {'$sort': {'_id': 1}}
+        ],
+        'heatmap': [
+            {'$group': {'_id': {'day': day_of_week, 'hour': hour}, 'drops': {'$sum': 1}}}
+        ],
+        'per_player': [
+            {'$group': {'_id': '$player', 'drops': {'$sum': 1}, 'value': {'$sum': '$value'}}},
+            {'$sort': {'drops': -1, '_id': 1}}
+        ],
+        'top_items': [
+            {'$group': {'_id': '$item', 'drops': {'$sum': 1}, 'value': {'$sum': '$value'}}},
+            {'$sort': {'drops': -1, '_id': 1}},
+            {'$limit': top}
+        ],
+        'top_drops': [
+            {'$match': {'value': {'$gt': 0}}},
+            {'$sort': {'value': -1, 'timestamp': -1}},
+            {'$limit': top},
+            {'$project': {'_id': 0, 'player': 1, 'item': 1, 'value': 1, 'drop_type': 1, 'timestamp': 1}}
+        ]
+    }
+    return [
+        {'$match': {**match_query, 'is_primary': {'$ne': False}}},
+        {'$set': {'value': {'$ifNull': ['$value', 0]}}},
+        {'$facet': {name: stages for name, stages in facets.items() if name not in skip}}
+    ]
+
+
+def build_analytics_rollup_pipeline(match_query, top=10, only=ANALYTICS_ROLLUP_FACETS):
+    """
+    The `only` series of /analytics/summary summed from history_daily rows
+    (UTC days) rather than drops, in the same shape build_analytics_pipeline
+    gives them.
+    """
+    drops, value = {'$sum': '$drops'}, {'$sum': '$drop_value'}
+    facets = {
+        'per_day': [
+            {'$group': {'_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$day'}}, 'drops': drops, 'value': value}},
+            {'$sort': {'_id': 1}}
+        ],
+        'per_day_player': [
+            {'$group': {'_id': {'date': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$day'}}, 'player': '$player'},
+                        'drops': drops}},
+            {'$sort': {'_id.date': 1, '_id.player': 1}}
+        ],
+        'per_month': [
+            {'$group': {'_id': {'$dateToString': {'format': '%Y-%m', 'date': '$day'}}, 'drops': drops, 'value': value}},
+            {'$sort': {'_id': 1}}
+        ],
+        'per_player': [
+            {'$group': {'_id': '$player', 'drops': drops, 'value': value}},
+            {'$sort': {'drops': -1, '_id': 1}}
+        ],
+        'top_items': [
+            {'$group': {'_id': '$item', 'drops': drops, 'value': value}},
+            {'$sort': {'drops': -1, '_id': 1}},
+            {'$limit': top}
+        ]
+    }
+    return [
+        {'$match': {**match_query, 'drops': {'$gt': 0}}},
+        {'$facet': {name: facets[name] for name in only}}
+    ]
+
+
+def format_analytics_summary(facets):
+    """Shape the $facet output into the JSON /analytics/summary returns."""
+    totals = (facets.get('totals') or [{}])[0]
+    for field in ('first', 'last'):
+        if isinstance(totals.get(field), datetime):
+            totals[field] = totals[field].isoformat()
+
+    heatmap = [[0] * 24 for _ in range(7)]
+    for bucket in facets.get('heatmap', []):
+        heatmap[bucket['_id']['day']][bucket['_id']['hour']] = bucket['drops']
+    day_of_week = [sum(row) for row in heatmap]
+    hourly = [sum(heatmap[day][h] for day in range(7)) for h in range(24)]
+
+    for drop in facets.get('top_drops', []):
+        if isinstance(drop.get('timestamp'), datetime):
+            drop['timestamp'] = drop['timestamp'].isoformat()
+
+    def series(key, label):
+        return [{label: b['_id'], 'drops': b['drops'], 'value': b['value']} for b in facets.get(key, [])]
+
+    return {
+        'totals': {'drops': totals.get('drops', 0), 'value': totals.get('value', 0),
+                   'players': totals.get('players', 0), 'unique_items': totals.get('unique_items', 0),
+                   'tiles_completed': totals.get('tiles_completed', 0),
+                   'first': totals.get('first'), 'last': totals.get('last')},
+        'per_day': series('per_day', 'date'),
+        'per_day_player': [{'date': b['_id']['date'], 'player': b['_id']['player'], 'drops': b['drops']}
+                           for b in facets.get('per_day_player', [])],
+        'per_month': series('per_month', 'month'),
+        'day_of_week': day_of_week,
+        'hourly': hourly,
+        'heatmap': heatmap,
+        'per_player': series('per_player', 'player'),
+        'top_items': series('top_items', 'item'),
+        'top_drops': facets.get('top_drops', [])
+    }
+
+
+@app.route('/analytics/daily', methods=['GET'])
+def get_analytics_daily():
+    """
+    Drops and GP value per UTC day per player, read from the history_daily
+    rollup (raw history until it has been built). Query params: start_date,
+    end_date (ISO, whole days), player, type.
+    """
+    if not USE_MONGODB:
+        return jsonify({'error': 'MongoDB not available'}), 503
+
+    tenant = get_tenant_from_request()
+    tenant_id = tenant['tenant_id'] if tenant else DEFAULT_TENANT_ID
+    collections = get_tenant_collections(tenant_id)
+
+    start = _parse_event_date(request.args.get('start_date'))
+    end = _parse_event_date(request.args.get('end_date'))
+    if (request.args.get('start_date') and start is None) or (request.args.get('end_date') and end is None):
+        return jsonify({'error': 'Invalid start_date/end_date'}), 400
+
+    use_rollup = history_daily_ready(collections)
+    day_field = 'day' if use_rollup else 'timestamp'
+    match_query = {}
+    if start or end:
+        match_query[day_field] = {}
+        if start:
+            match_query[day_field]['$gte'] = history_day(start)
+        if end:
+            match_query[day_field]['$lt'] = history_day(end) + timedelta(days=1)
+    if request.args.get('player'):
+        match_query['player'] = request.args['player']
+    if request.args.get('type'):
+        match_query['drop_type'] = request.args['type']
+
+    if use_rollup:
+        group_day, count, value = '$day', {'$sum': '$count'}, {'$sum': '$value'}
+        source = collections['history_daily']
+    else:
+        group_day, count, value = {'$dateTrunc': {'date': '$timestamp', 'unit': 'day'}}, {'$sum': 1}, {'$sum': '$value'}
+        source = collections['history']
+
+    try:
+        rows = source.aggregate([
+            {'$match': match_query},
+            {'$group': {'_id': {'day': group_day, 'player': '$player'}, 'drops': count, 'value': value}},
+            {'$sort': {'_id.day': 1, '_id.player': 1}}
+        ], allowDiskUse=True)
+        days = [{
+            'date': row['_id']['day'].strftime('%Y-%m-%d'),
+            'player': row['_id']['player'],
+            'drops': row['drops'],
+            'value': row['value']
+        } for row in rows]
+        return jsonify({'days': days, 'count': len(days), 'source': 'rollup' if use_rollup else 'history'})
+    except Exception as e:
+        return jsonify({'error': f'Failed to get daily analytics: {str(e)}'}), 500
+
+
+@app.route('/analytics/summary', methods=['GET'])
+def get_analytics_summary():
+    """
+    Bucketed drop analytics for the dashboard: totals, drops/value per day and
+    per month (and drops per day per player), day-of-week and hourly counts, a
+    day x hour heatmap (rows are 0 = Sunday), per-player totals, most common
+    items and most valuable drops. Query params: start_date, end_date (ISO),
+    tz, player (or players, comma-separated), type, minValue, search
+    (+ search_mode, as for /history), top (default 10, max 50). `source` says
+    whether the day/player/item series came from the history_daily rollup.
+    """
+    if not USE_MONGODB:
+        return jsonify({'error': 'MongoDB not available'}), 503
+
+    tenant = get_tenant_from_request()
+    tenant_id = tenant['tenant_id'] if tenant else DEFAULT_TENANT_ID
+    collections = get_tenant_collections(tenant_id)
+
+    tz = request.args.get('tz', 'UTC')
+    if not _valid_timezone(tz):
+        return jsonify({'error': f'Unknown timezone: {tz}'}), 400
+    try:
+        top = min(max(int(request.args.get('top', 10)), 1), ANALYTICS_TOP_MAX)
+        min_value = int(request.args.get('minValue', 0) or 0)
+    except ValueError:
+        return jsonify({'error': 'top and minValue must be integers'}), 400
+
+    match_query = {}
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    start = _parse_event_date(start_date)
+    end = _parse_event_date(end_date)
+    if (start_date and start is None) or (end_date and end is None):
+        return jsonify({'error': 'Invalid start_date/end_date'}), 400
+    if start or end:
+        match_query['timestamp'] = {}
+        if start:
+            match_query['timestamp']['$gte'] = start
+        if end:
+            match_query['timestamp']['$lte'] = end
+    if request.args.get('player'):
+        match_query['player'] = request.args['player']
+    elif request.args.get('players'):
+        match_query['player'] = {'$in': [p for p in request.args['players'].split(',') if p]}
+    if request.args.get('type'):
+        match_query['drop_type'] = request.args['type']
+    if min_value > 0:
+        match_query['value'] = {'$gte': min_value}
+    if request.args.get('search'):
+        search_mode = request.args.get('search_mode', 'contains')
+        if search_mode not in HISTORY_SEARCH_MODES:
+            return jsonify({'error': f'search_mode must be one of {", ".join(HISTORY_SEARCH_MODES)}'}), 400
+        match_query.update(history_search_filter(request.args['search'], search_mode))
+
+    # Series the history_daily rollup can answer for this query (see ANALYTICS_ROLLUP_FACETS)
+    rollup_facets = ()
+    if (not end and min_value <= 0 and not request.args.get('search')
+            and (not start or start == history_day(start)) and history_daily_ready(collections)):
+        rollup_facets = ANALYTICS_ROLLUP_FACETS + (ANALYTICS_ROLLUP_UTC_FACETS if _is_utc_timezone(tz) else ())
+
+    try:
+        facets = next(collections['history'].aggregate(
+            build_analytics_pipeline(match_query, tz, top, skip=rollup_facets), allowDiskUse=True), {})
+        if rollup_facets:
+            rollup_query = {key: match_query[key] for key in ('player', 'drop_type') if key in match_query}
+            if start:
+                rollup_query['day'] = {'$gte': start}
+            facets.update(next(collections['history_daily'].aggregate(
+                build_analytics_rollup_pipeline(rollup_query, top, rollup_facets)), {}))
+        return jsonify({
+            'tz': tz,
+            'start_date': start_date,
+            'end_date': end_date,
+            'source': 'rollup' if rollup_facets else 'history',
+            **format_analytics_summary(facets)
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to build analytics summary: {str(e)}'}), 500
+
+
 @app.route('/update', methods=['POST'])
 @limiter.limit("60 per minute")
 def update_board():
@@ -1885,8 +4340,10 @@ def shuffle_board():
         # Update the board with shuffled tiles
         collections['bingo'].update_one(
             {'type': 'current_board'},
-            {'$set': {'tiles': tiles}}
+            {'$set': {'tiles': tiles}, '$inc': {'version': 1}}
         )
+        bingo_doc['tiles'] = tiles
+        refresh_tile_match_index(tenant_id, bingo_doc)
 
         print(f"[OK] Board shuffled successfully - {len(tiles)} tiles reordered")
 
@@ -1995,6 +4452,7 @@ def set_event_config():
             event_config,
             upsert=True
         )
+        invalidate_event_window(tenant_id)
 
         print(f"[OK] Event config updated: {event_name} ({start_date} to {end_date}, enabled={enabled})")
 
@@ -2009,42 +4467,95 @@ def set_event_config():
         return jsonify({'error': str(e)}), 500
 
 
+# The event window is checked on every /drop, /drops/batch and /death, and
+# read again by /history/total-value and /event/recap, but only changes when
+# an admin saves /event/config. So the config is parsed once per tenant and
+# cached with the dates already as datetimes. set_event_config invalidates
+# its tenant's entry; the short TTL only matters for changes made by another
+# process (e.g. a second worker), which otherwise show up once it lapses.
+# Dates are normalized to naive UTC (the stored strings are JS toISOString(),
+# always 'Z'-suffixed) so they compare directly against datetime.utcnow().
+EVENT_WINDOW_CACHE_TTL_SECONDS = 30
+
+_event_window_cache = {}  # tenant_id -> (expires_at, window)
+_event_window_lock = threading.Lock()
+
+
+def _parse_event_date(value):
+    """ISO string (or datetime) -> naive UTC datetime, None if missing or unparseable."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00')) if isinstance(value, str) else value
+    except ValueError:
+        return None
+    return as_naive_utc(parsed)
+
+
+def _load_event_window(tenant_id):
+    event_config = get_tenant_collections(tenant_id)['bingo'].find_one({'_id': 'event_config'})
+    if not event_config:
+        return {'configured': False, 'enabled': False, 'name': 'Event',
+                'start_date': None, 'end_date': None, 'start': None, 'end': None}
+    return {
+        'configured': True,
+        'enabled': bool(event_config.get('enabled', False)),
+        'name': event_config.get('eventName', 'Bingo Event'),
+        'start_date': event_config.get('startDate'),
+        'end_date': event_config.get('endDate'),
+        'start': _parse_event_date(event_config.get('startDate')),
+        'end': _parse_event_date(event_config.get('endDate'))
+    }
+
+
+def get_event_window(tenant_id=None):
+    """
+    The tenant's event config, parsed: {configured, enabled, name, start_date,
+    end_date (the stored ISO strings), start, end (naive UTC datetimes)}.
+    Served from the per-tenant cache when fresh.
+    """
+    if tenant_id is None:
+        tenant_id = get_tenant_context()['tenant_id']
+    now = time.monotonic()
+    with _event_window_lock:
+        entry = _event_window_cache.get(tenant_id)
+        if entry and entry[0] > now:
+            return entry[1]
+
+    window = _load_event_window(tenant_id)
+    with _event_window_lock:
+        _event_window_cache[tenant_id] = (now + EVENT_WINDOW_CACHE_TTL_SECONDS, window)
+    return window
+
+
+def invalidate_event_window(tenant_id=None):
+    """Drop the cached event window for one tenant, or for all of them if tenant_id is None."""
+    with _event_window_lock:
+        if tenant_id is None:
+            _event_window_cache.clear()
+        else:
+            _event_window_cache.pop(tenant_id, None)
+
+
 def is_within_event_window(timestamp=None, tenant_id=None):
     """Check if a timestamp is within the current event window"""
     try:
-        # Get tenant's bingo collection for event config
-        collections = get_tenant_collections(tenant_id)
-        event_config = collections['bingo'].find_one({'_id': 'event_config'})
+        window = get_event_window(tenant_id)
 
-        # If no event or event disabled, allow all
-        if not event_config or not event_config.get('enabled', False):
+        # If no event or event disabled (or half-configured), allow all
+        if not window['enabled'] or not window['start_date'] or not window['end_date']:
             return True
 
         # Use provided timestamp or current time
-        if timestamp is None:
+        check_time = _parse_event_date(timestamp) if timestamp is not None else None
+        if check_time is None:
             check_time = datetime.utcnow()
-        else:
-            # Convert timestamp to datetime if it's a string
-            if isinstance(timestamp, str):
-                check_time = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            elif isinstance(timestamp, datetime):
-                check_time = timestamp
-            else:
-                check_time = datetime.utcnow()
-
-        # Get event dates
-        start_date = event_config.get('startDate')
-        end_date = event_config.get('endDate')
-
-        if not start_date or not end_date:
-            return True
 
-        # Parse dates
-        start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        end = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        if window['start'] is None or window['end'] is None:
+            raise ValueError(f"unparseable event dates {window['start_date']!r} / {window['end_date']!r}")
 
         # Check if within window
-        return start <= check_time <= end
+        return window['start'] <= check_time <= window['end']
 
     except Exception as e:
         print(f"[!] Error checking event window: {e}")
@@ -2161,19 +4672,12 @@ def compute_event_recap(collections, start_date, end_date, board_doc=None):
         if stats['rarest_drop'] and (rarest_drop_overall is None or stats['rarest_drop'][0] > rarest_drop_overall[0]):
             rarest_drop_overall = (stats['rarest_drop'][0], player)
 
-    # --- KC gained per player, reusing the same start-vs-latest snapshot diff as /kc/player/<name> ---
-    kc_gained = {}
-    for snap_player in collections['kc'].distinct('player'):
-        start_snap = collections['kc'].find_one({'player': snap_player, 'snapshot_type': 'start'}, sort=[('timestamp', 1)])
-        current_snap = collections['kc'].find_one({'player': snap_player}, sort=[('timestamp', -1)])
-        if start_snap and current_snap:
-            total_gained = 0
-            for boss, current_kc in current_snap.get('bosses', {}).items():
-                gained = current_kc - start_snap.get('bosses', {}).get(boss, 0)
-                if gained > 0:
-                    total_gained += gained
-            if total_gained > 0:
-                kc_gained[snap_player] = total_gained
+    # --- KC gained per player since the bingo start snapshot (same numbers as /kc/effort) ---
+    # An event that has ended is measured as of its end date, so archiving it later changes nothing
+    kc_until = _parse_event_date(end_date)
+    if kc_until is not None and kc_until > datetime.utcnow():
+        kc_until = None
+    kc_gained = {entry['player']: sum(entry['effort'].values()) for entry in kc_effort(collections, kc_until)}
 
     roster = set(player_scores) | set(drop_stats) | set(kc_gained)
 
@@ -2248,29 +4752,18 @@ def get_event_recap(player_name):
     collections = get_tenant_collections(tenant_id)
 
     try:
-        event_config = collections['bingo'].find_one({'_id': 'event_config'})
-        if not event_config or not event_config.get('enabled'):
+        window = get_event_window(tenant_id)
+        if not window['enabled']:
             return jsonify({'error': 'No event is currently configured'}), 404
 
-        end_date = event_config.get('endDate')
-        event_over = False
-        if end_date:
-            # .replace(tzinfo=None): endDate is always stored as a UTC ISO string (JS
-            # toISOString(), always 'Z'-suffixed) — strip the offset fromisoformat adds
-            # so this compares safely against the naive datetime.utcnow() below.
-            end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00')).replace(tzinfo=None)
-            event_over = datetime.utcnow() > end_dt
+        # window['end'] is already naive UTC (see get_event_window)
+        event_over = window['end'] is not None and datetime.utcnow() > window['end']
         is_admin = verify_admin_password(tenant, request.headers.get('X-Admin-Password'))
 
         if not event_over and not is_admin:
-            event_name = event_config.get('eventName', 'Bingo Event')
-            return jsonify({'error': f'Recaps unlock once {event_name} ends'}), 403
+            return jsonify({'error': f"Recaps unlock once {window['name']} ends"}), 403
 
-        recap = compute_event_recap(
-            collections,
-            event_config.get('startDate'),
-            event_config.get('endDate')
-        )
+        recap = compute_event_recap(collections, window['start_date'], window['end_date'])
 
         player_recap = recap.get(player_name)
         if not player_recap:
@@ -2278,9 +4771,9 @@ def get_event_recap(player_name):
 
         return jsonify({
             'player': player_name,
-            'eventName': event_config.get('eventName', 'Bingo Event'),
-            'startDate': event_config.get('startDate'),
-            'endDate': event_config.get('endDate'),
+            'eventName': window['name'],
+            'startDate': window['start_date'],
+            'endDate': window['end_date'],
             **player_recap
         })
     except Exception as e:
@@ -2469,27 +4962,28 @@ def record_pb():
 
     try:
         ts = datetime.fromisoformat(timestamp.replace('Z', '+00:00')) if isinstance(timestamp, str) else timestamp
+    except ValueError:
+        return jsonify({'error': 'Invalid timestamp'}), 400
+
+    pb_doc = {
+        'player': player_name,
+        'boss': boss_name,
+        'time_seconds': time_seconds,
+        'time_string': time_string,
+        'party_size': party_size,
+        'invocation_level': invocation_level,
+        'timestamp': ts
+    }
+    ingest_key = get_ingest_key(data)
+    if ingest_key:
+        pb_doc['ingest_key'] = ingest_key
 
-        # Check for exact duplicate (same player, boss, time, party size, invocation, within 10s)
-        existing = collections['personal_bests'].find_one({
-            'player': player_name,
-            'boss': boss_name,
-            'time_seconds': time_seconds,
-            'party_size': party_size,
-            'invocation_level': invocation_level
-        })
-        if existing:
-            return jsonify({'success': True, 'duplicate': True, 'message': 'PB already recorded'})
+    if ASYNC_INGEST:
+        return accepted_or_busy(enqueue_ingest('pb', tenant_id, doc=pb_doc))
 
-        collections['personal_bests'].insert_one({
-            'player': player_name,
-            'boss': boss_name,
-            'time_seconds': time_seconds,
-            'time_string': time_string,
-            'party_size': party_size,
-            'invocation_level': invocation_level,
-            'timestamp': ts
-        })
+    try:
+        if not save_personal_best(collections, pb_doc):
+            return jsonify({'success': True, 'duplicate': True, 'message': 'PB already recorded'})
 
         print(f"[PB] {player_name} - {boss_name} in {time_string}"
               + (f" @ {invocation_level} invocations" if invocation_level else "")
@@ -2501,6 +4995,41 @@ def record_pb():
         return jsonify({'error': f'Failed to save PB: {str(e)}'}), 500
 
 
+# What makes two PB docs "the same PB" for the duplicate lookup below
+PB_IDENTITY_FIELDS = ('player', 'boss', 'time_seconds', 'party_size', 'invocation_level')
+
+
+def save_personal_best(collections, pb_doc):
+    """Insert a PB unless the exact same one is already recorded. Returns False for a duplicate."""
+    # Check for exact duplicate (same player, boss, time, party size, invocation).
+    # Kept alongside the ingest_key index because PBs recorded before keys
+    # existed have none, and the same PB can arrive from two different
+    # messages (e.g. a "Personal Best" and a "Completion Count" notification).
+    existing = collections['personal_bests'].find_one({field: pb_doc[field] for field in PB_IDENTITY_FIELDS})
+    if existing:
+        return False
+    return bool(insert_ingest_docs(collections['personal_bests'], [pb_doc]))
+
+
+def save_personal_bests(collections, pb_docs):
+    """
+    Batch form of save_personal_best for the ingest worker: one insert_many,
+    with replays of keyed docs rejected by the ingest_key index. Only docs
+    without a key get the duplicate lookup first. Returns the docs inserted.
+    """
+    docs = []
+    seen = set()
+    for doc in pb_docs:
+        if 'ingest_key' not in doc:
+            identity = tuple(doc[field] for field in PB_IDENTITY_FIELDS)
+            if identity in seen or collections['personal_bests'].find_one(
+                    dict(zip(PB_IDENTITY_FIELDS, identity)), {'_id': 1}):
+                continue
+            seen.add(identity)
+        docs.append(doc)
+    return insert_ingest_docs(collections['personal_bests'], docs)
+
+
 @app.route('/pbs', methods=['GET'])
 def get_personal_bests():
     """
@@ -2574,9 +5103,18 @@ def manual_override():
     if tile_index is None or not player_name or not action:
         return jsonify({'error': 'Missing required fields'}), 400
 
+    if not isinstance(tile_index, int) or tile_index < 0:
+        return jsonify({'error': 'Invalid tile index'}), 400
+
+    if not board_safe_player_name(player_name):
+        return jsonify({'error': 'Invalid player name'}), 400
+
+    if USE_MONGODB:
+        return _manual_override_atomic(tenant_id, tile_index, player_name, action)
+
     bingo_data = load_bingo_data(tenant_id)
 
-    if tile_index < 0 or tile_index >= len(bingo_data['tiles']):
+    if tile_index >= len(bingo_data['tiles']):
         return jsonify({'error': 'Invalid tile index'}), 400
 
     tile = bingo_data['tiles'][tile_index]
@@ -2618,6 +5156,47 @@ def manual_override():
     return jsonify({'error': 'Invalid action'}), 400
 
 
+def _manual_override_atomic(tenant_id, tile_index, player_name, action):
+    """manual_override's MongoDB path: a targeted update on tiles.N rather than a whole-board save."""
+    bingo_coll = get_tenant_collections(tenant_id)['bingo']
+    tile_filter = {'type': 'current_board', f'tiles.{tile_index}': {'$exists': True}}
+
+    if action == 'add':
+        # No drop event backs a manual override, so stamp it with "now" rather
+        # than leaving it unresolved on the Timeline.
+        if _complete_tile(bingo_coll, tile_filter, tile_index, player_name, datetime.utcnow().isoformat()):
+            print(f"[OK] Manual override: Added {player_name} to tile {tile_index + 1}")
+            return jsonify({
+                'success': True,
+                'message': f'Added {player_name} to tile {tile_index + 1}'
+            })
+        message = f'{player_name} already completed this tile'
+
+    elif action == 'remove':
+        result = bingo_coll.update_one(
+            {**tile_filter, f'tiles.{tile_index}.completedBy': player_name},
+            {
+                '$pull': {f'tiles.{tile_index}.completedBy': player_name},
+                '$unset': {f'tiles.{tile_index}.completedAt.{player_name}': ''},
+                '$inc': {'version': 1}
+            }
+        )
+        if result.modified_count:
+            print(f"[OK] Manual override: Removed {player_name} from tile {tile_index + 1}")
+            return jsonify({
+                'success': True,
+                'message': f'Removed {player_name} from tile {tile_index + 1}'
+            })
+        message = f'{player_name} has not completed this tile'
+
+    else:
+        return jsonify({'error': 'Invalid action'}), 400
+
+    if not bingo_coll.count_documents(tile_filter, limit=1):
+        return jsonify({'error': 'Invalid tile index'}), 400
+    return jsonify({'success': False, 'message': message})
+
+
 @app.route('/api/tenant/info', methods=['GET'])
 def get_tenant_info():
     """Get current tenant information and plan details"""
@@ -2664,6 +5243,17 @@ def get_tenant_info():
     })
 
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """In-process cache/queue counters for this API instance (tenant API key or admin password)"""
+    if not get_authenticated_tenant():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify({
+        'tenant_cache': get_tenant_cache_stats(),
+        'ingest': get_ingest_stats()
+    })
+
+
 @app.route('/rank/latest', methods=['GET'])
 def get_latest_rank():
     """Get the most recent rank snapshot (for quick widget loading)"""
@@ -2779,21 +5369,179 @@ EXPORT_DATASETS = {
 }
 
 
-def _csv_response(rows, fieldnames, filename):
-    """Build a Flask CSV file-download response from a list of dict rows."""
+# Exported columns per dataset, with the type each is written as in the
+# columnar formats (CSV just writes them in this order). Row producers in
+# export_dataset yield raw values - datetimes stay datetimes - and each
+# writer formats them its own way.
+EXPORT_COLUMNS = {
+    'history': [
+        ('timestamp', 'timestamp'), ('player', 'string'), ('item', 'string'), ('drop_type', 'string'),
+        ('value', 'int'), ('value_string', 'string'), ('rarity', 'string'), ('rarity_1_in', 'float'),
+        ('source', 'string'),
+    ],
+    'kc': [
+        ('player', 'string'), ('boss', 'string'), ('kill_count', 'int'), ('snapshot_type', 'string'),
+        ('snapshot_timestamp', 'timestamp'),
+    ],
+    'personal_bests': [
+        ('player', 'string'), ('boss', 'string'), ('time_string', 'string'), ('time_seconds', 'float'),
+        ('party_size', 'int'), ('invocation_level', 'int'), ('timestamp', 'timestamp'),
+    ],
+    'rank_history': [
+        ('timestamp', 'timestamp'), ('rank', 'int'), ('prestige_rank', 'int'), ('total_xp', 'int'),
+        ('rank_change', 'int'), ('prestige_rank_change', 'int'), ('xp_change', 'int'),
+    ],
+}
+
+# Exports are streamed: rows come off a Mongo cursor (EXPORT_BATCH_SIZE docs
+# per round trip, projected to just the exported fields) and are written out
+# EXPORT_FLUSH_ROWS at a time, so memory stays flat however big the dataset is
+# and the download starts straight away. ?gzip=true compresses the stream
+# into a .csv.gz. A failure part-way through can't become an error response
+# any more (the headers are already sent) - it's logged and the connection is
+# dropped, so the client sees a failed download rather than a short file.
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FLUSH_ROWS = 500
+
+
+def _iter_csv_chunks(rows, fieldnames):
     buffer = io.StringIO()
     writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
     writer.writeheader()
+    pending = 0
     for row in rows:
-        writer.writerow(row)
+        writer.writerow({key: value.isoformat() if isinstance(value, datetime) else value
+                         for key, value in row.items()})
+        pending += 1
+        if pending >= EXPORT_FLUSH_ROWS:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _export_response(chunks, filename, mimetype):
+    """A streaming file-download response over an iterable of byte chunks."""
+    def generate():
+        try:
+            yield from chunks
+        except Exception as e:
+            print(f"[X] Export of {filename} failed mid-stream: {e}")
+            raise
 
     return Response(
-        buffer.getvalue(),
-        mimetype='text/csv',
+        generate(),
+        mimetype=mimetype,
         headers={'Content-Disposition': f'attachment; filename="{filename}"'}
     )
 
 
+def _csv_response(rows, fieldnames, filename, compress=False):
+    """Build a streaming Flask CSV file-download response from an iterable of dict rows."""
+    chunks = _iter_csv_chunks(rows, fieldnames)
+    if compress:
+        return _export_response(_gzip_chunks(chunks), filename + '.gz', 'application/gzip')
+    return _export_response(chunks, filename, 'text/csv')
+
+
+# ?format=parquet / ?format=arrow (Arrow IPC stream) write the same rows as
+# typed, zstd-compressed columns, for loading straight into pandas/polars/
+# DuckDB without re-parsing CSV. Rows are gathered into EXPORT_COLUMNAR_ROWS
+# record batches (one Parquet row group each) and every batch's bytes are
+# sent as soon as it's written, so memory is bounded by one batch. pyarrow
+# is an optional dependency: without it these formats answer 501 and CSV
+# keeps working.
+EXPORT_FORMATS = ('csv', 'parquet', 'arrow')
+EXPORT_COLUMNAR_ROWS = 10000
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back in chunks (see _columnar_chunks)."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return b''.join(chunks)
+
+
+def _arrow_schema(columns):
+    types = {
+        'string': pa.string(),
+        'int': pa.int64(),
+        'float': pa.float64(),
+        'timestamp': pa.timestamp('ms', tz='UTC'),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def _coerce_export_value(value, kind):
+    """Fit a stored value to its export column type; values that don't fit become null."""
+    if value is None or value == '':
+        return None
+    try:
+        if kind == 'int':
+            return int(value)
+        if kind == 'float':
+            return float(value)
+        if kind == 'timestamp':
+            parsed = _parse_event_date(value)
+            return parsed.replace(tzinfo=timezone.utc) if parsed else None
+        return str(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _columnar_chunks(rows, columns, fmt):
+    """Serialize rows as a Parquet file or Arrow IPC stream, yielding bytes as each record batch is written."""
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression='zstd'))
+
+    def write(batch):
+        writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+        return sink.drain()
+
+    batch = []
+    for row in rows:
+        batch.append({name: _coerce_export_value(row.get(name), kind) for name, kind in columns})
+        if len(batch) >= EXPORT_COLUMNAR_ROWS:
+            yield write(batch)
+            batch = []
+    if batch:
+        yield write(batch)
+    writer.close()
+    yield sink.drain()
+
+
 @app.route('/export/meta', methods=['GET'])
 @limiter.limit("20 per minute")
 def export_meta():
@@ -2817,7 +5565,7 @@ def export_meta():
                 'key': 'kc',
                 'label': 'Boss Kill Counts',
                 'description': "Each player's latest kill count per boss.",
-                'count': len(collections['kc'].distinct('player'))
+                'count': collections['kc_latest'].count_documents({})
             },
             {
                 'key': 'personal_bests',
@@ -2840,49 +5588,41 @@ def export_meta():
 @app.route('/export/<dataset>', methods=['GET'])
 @limiter.limit("10 per minute")
 def export_dataset(dataset):
-    """Download a full dataset as CSV, for players who want to build their own analytics."""
+    """
+    Download a full dataset, for players who want to build their own
+    analytics. CSV by default (streamed - see _csv_response; ?gzip=true for a
+    .csv.gz), or ?format=parquet / ?format=arrow for typed columnar files.
+    """
     if not USE_MONGODB:
         return jsonify({'error': 'MongoDB not available'}), 503
 
     if dataset not in EXPORT_DATASETS:
         return jsonify({'error': f'Unknown dataset "{dataset}". Choose from: {", ".join(EXPORT_DATASETS)}'}), 404
 
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unknown format "{fmt}". Choose from: {", ".join(EXPORT_FORMATS)}'}), 400
+    if fmt != 'csv' and not HAS_PYARROW:
+        return jsonify({'error': f'{fmt} export is not available on this server (pyarrow not installed)'}), 501
+
     tenant = get_tenant_from_request()
     tenant_id = tenant['tenant_id'] if tenant else DEFAULT_TENANT_ID
     collections = get_tenant_collections(tenant_id)
 
     try:
         if dataset == 'history':
-            docs = list(collections['history'].find({}, {'_id': 0}).sort('timestamp', -1))
-            rows = []
-            for d in docs:
-                ts = d.get('timestamp')
-                rows.append({
-                    'timestamp': ts.isoformat() if hasattr(ts, 'isoformat') else ts,
-                    'player': d.get('player'),
-                    'item': d.get('item'),
-                    'drop_type': d.get('drop_type'),
-                    'value': d.get('value'),
-                    'value_string': d.get('value_string'),
-                    'rarity': d.get('rarity'),
-                    'rarity_1_in': d.get('rarity_1_in'),
-                    'source': d.get('source'),
-                })
-            fieldnames = ['timestamp', 'player', 'item', 'drop_type', 'value', 'value_string', 'rarity', 'rarity_1_in', 'source']
+            cursor = (collections['history']
+                      .find({}, {'_id': 0, **{name: 1 for name, _ in EXPORT_COLUMNS['history']}})
+                      .sort('timestamp', -1)
+                      .batch_size(EXPORT_BATCH_SIZE))
+            rows = ({name: d.get(name) for name, _ in EXPORT_COLUMNS['history']} for d in cursor)
 
         elif dataset == 'kc':
-            pipeline = [
-                {'$sort': {'timestamp': -1}},
-                {'$group': {'_id': '$player', 'latest_snapshot': {'$first': '$$ROOT'}}}
-            ]
-            results = list(collections['kc'].aggregate(pipeline))
+            latest = collections['kc_latest'].find({}, {'player': 1, 'bosses': 1, 'timestamp': 1, 'snapshot_type': 1})
             _excluded = {'Brutus'}
             rows = []
-            for result in results:
-                player = result['_id']
-                snapshot = result['latest_snapshot']
-                ts = snapshot.get('timestamp')
-                ts_iso = ts.isoformat() if hasattr(ts, 'isoformat') else ts
+            for snapshot in latest:
+                player = snapshot['player']
                 for boss, kc in snapshot.get('bosses', {}).items():
                     if boss in _excluded:
                         continue
@@ -2891,10 +5631,9 @@ def export_dataset(dataset):
                         'boss': boss,
                         'kill_count': kc,
                         'snapshot_type': snapshot.get('snapshot_type'),
-                        'snapshot_timestamp': ts_iso,
+                        'snapshot_timestamp': snapshot.get('timestamp'),
                     })
             rows.sort(key=lambda r: (r['player'].lower(), r['boss'].lower()))
-            fieldnames = ['player', 'boss', 'kill_count', 'snapshot_type', 'snapshot_timestamp']
 
         elif dataset == 'personal_bests':
             all_records = list(collections['personal_bests'].find({}, {'_id': 0}).sort('time_seconds', 1))
@@ -2906,44 +5645,152 @@ def export_dataset(dataset):
                 if key not in best or rec['time_seconds'] < best[key]['time_seconds']:
                     best[key] = rec
             result = sorted(best.values(), key=lambda x: (x['boss'].lower(), x['player'].lower()))
-            rows = []
-            for rec in result:
-                ts = rec.get('timestamp')
-                rows.append({
-                    'player': rec.get('player'),
-                    'boss': rec.get('boss'),
-                    'time_string': rec.get('time_string'),
-                    'time_seconds': rec.get('time_seconds'),
-                    'party_size': rec.get('party_size'),
-                    'invocation_level': rec.get('invocation_level'),
-                    'timestamp': ts.isoformat() if hasattr(ts, 'isoformat') else ts,
-                })
-            fieldnames = ['player', 'boss', 'time_string', 'time_seconds', 'party_size', 'invocation_level', 'timestamp']
+            rows = [{name: rec.get(name) for name, _ in EXPORT_COLUMNS['personal_bests']} for rec in result]
 
         elif dataset == 'rank_history':
-            docs = list(collections['rank_history'].find({}, {'_id': 0}).sort('timestamp', 1))
-            rows = []
-            for d in docs:
-                ts = d.get('timestamp')
-                rows.append({
-                    'timestamp': ts.isoformat() if hasattr(ts, 'isoformat') else ts,
-                    'rank': d.get('rank'),
-                    'prestige_rank': d.get('prestigeRank'),
-                    'total_xp': d.get('totalXp'),
-                    'rank_change': d.get('rankChange'),
-                    'prestige_rank_change': d.get('prestigeRankChange'),
-                    'xp_change': d.get('xpChange'),
-                })
-            fieldnames = ['timestamp', 'rank', 'prestige_rank', 'total_xp', 'rank_change', 'prestige_rank_change', 'xp_change']
-
-        filename = f'{dataset}_export_{datetime.utcnow().strftime("%Y%m%d")}.csv'
-        return _csv_response(rows, fieldnames, filename)
+            cursor = (collections['rank_history']
+                      .find({}, {'_id': 0, 'timestamp': 1, 'rank': 1, 'prestigeRank': 1, 'totalXp': 1,
+                                 'rankChange': 1, 'prestigeRankChange': 1, 'xpChange': 1})
+                      .sort('timestamp', 1)
+                      .batch_size(EXPORT_BATCH_SIZE))
+            rows = ({
+                'timestamp': d.get('timestamp'),
+                'rank': d.get('rank'),
+                'prestige_rank': d.get('prestigeRank'),
+                'total_xp': d.get('totalXp'),
+                'rank_change': d.get('rankChange'),
+                'prestige_rank_change': d.get('prestigeRankChange'),
+                'xp_change': d.get('xpChange'),
+            } for d in cursor)
+
+        columns = EXPORT_COLUMNS[dataset]
+        basename = f'{dataset}_export_{datetime.utcnow().strftime("%Y%m%d")}'
+        if fmt == 'parquet':
+            return _export_response(_columnar_chunks(rows, columns, fmt), basename + '.parquet',
+                                    'application/vnd.apache.parquet')
+        if fmt == 'arrow':
+            return _export_response(_columnar_chunks(rows, columns, fmt), basename + '.arrows',
+                                    'application/vnd.apache.arrow.stream')
+        compress = request.args.get('gzip', 'false').lower() == 'true'
+        return _csv_response(rows, [name for name, _ in columns], basename + '.csv', compress)
 
     except Exception as e:
         return jsonify({'error': f'Failed to export {dataset}: {str(e)}'}), 500
 
 
+# ============================================
+# CHANGE FEED (incremental sync)
+# ============================================
+# For anyone mirroring the data elsewhere: instead of re-downloading a full
+# export, a consumer keeps the `next` token from its last call and asks only
+# for what changed after it. Every write to these collections stamps
+# changed_at (inserts via insert_ingest_docs, plus the KC/rank/death/history
+# update paths), and the feed walks (changed_at, _id) in ascending order, so
+# a sync costs O(new rows). Pages are capped at `limit`; keep calling with
+# `next` while has_more is true, then poll again later with the last `next`.
+#
+# Rows changed in the last CHANGE_FEED_SETTLE_SECONDS are held back: two
+# writers can commit slightly out of changed_at order, and handing out a
+# token past a write that hasn't landed yet would skip it for good. Docs
+# from before changed_at existed are backfilled with their _id's creation
+# time (see backfill_changed_at), so a first sync without a token gets
+# everything.
+CHANGE_FEED_DATASETS = ('history', 'deaths', 'kc', 'personal_bests', 'rank_history')
+CHANGE_FEED_PAGE_MAX = 5000
+CHANGE_FEED_SETTLE_SECONDS = 5
+
+
+def backfill_changed_at(subdomains=None):
+    """Stamp changed_at (from the ObjectId's creation time) on docs written before the change feed existed."""
+    updated = 0
+    for subdomain in subdomains or _all_tenant_subdomains():
+        collections = tenant_collections_for_subdomain(subdomain)
+        for dataset in CHANGE_FEED_DATASETS:
+            result = collections[dataset].update_many(
+                {'changed_at': {'$exists': False}},
+                [{'$set': {'changed_at': {'$toDate': '$_id'}}}]
+            )
+            updated += result.modified_count
+    return updated
+
+
+@app.route('/export/<dataset>/changes', methods=['GET'])
+@limiter.limit("60 per minute")
+def export_changes(dataset):
+    """
+    Documents inserted or updated after ?since=<token> (everything if
+    omitted), oldest change first, at most ?limit= per page (default 1000).
+    """
+    if not USE_MONGODB:
+        return jsonify({'error': 'MongoDB not available'}), 503
+
+    if dataset not in CHANGE_FEED_DATASETS:
+        return jsonify({'error': f'Unknown dataset "{dataset}". Choose from: {", ".join(CHANGE_FEED_DATASETS)}'}), 404
+
+    tenant = get_tenant_from_request()
+    tenant_id = tenant['tenant_id'] if tenant else DEFAULT_TENANT_ID
+    collections = get_tenant_collections(tenant_id)
+
+    since = request.args.get('since')
+    try:
+        limit = min(max(int(request.args.get('limit', 1000)), 1), CHANGE_FEED_PAGE_MAX)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    query = {'changed_at': {'$lte': datetime.utcnow() - timedelta(seconds=CHANGE_FEED_SETTLE_SECONDS)}}
+    if since:
+        try:
+            changed_at, last_id = decode_keyset_token(since)
+        except ValueError:
+            return jsonify({'error': 'Invalid since token'}), 400
+        query = {'$and': [query, {'$or': [
+            {'changed_at': {'$gt': changed_at}},
+            {'changed_at': changed_at, '_id': {'$gt': last_id}}
+        ]}]}
+
+    try:
+        docs = list(collections[dataset].find(query)
+                    .sort([('changed_at', 1), ('_id', 1)])
+                    .limit(limit + 1))
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        next_token = encode_keyset_token(docs[-1]['changed_at'], docs[-1]['_id']) if docs else since
+        if dataset == 'kc':
+            # Consumers get full snapshots, not the stored deltas
+            reconstruct_kc_docs(collections['kc'], docs)
+
+        changes = []
+        for doc in docs:
+            for field in KC_DELTA_FIELDS if dataset == 'kc' else ():
+                doc.pop(field, None)
+            doc['_id'] = str(doc['_id'])
+            changes.append({key: value.isoformat() if isinstance(value, datetime) else value
+                            for key, value in doc.items()})
+
+        return jsonify({
+            'dataset': dataset,
+            'changes': changes,
+            'count': len(changes),
+            'next': next_token,
+            'has_more': has_more
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to read {dataset} changes: {str(e)}'}), 500
+
+
+# Off the main thread so startup (and the first requests) aren't held up
+# by one create_index round trip per index per tenant. Started once the whole
+# module is loaded, since the backfills it runs are defined all over it.
+if USE_MONGODB and os.environ.get('BOOTSTRAP_INDEXES', 'true').lower() == 'true':
+    threading.Thread(target=bootstrap_indexes, daemon=True).start()
+
+
 if __name__ == '__main__':
+    if ASYNC_INGEST:
+        # Render stops instances with SIGTERM, which by default skips atexit -
+        # turn it into a normal exit so queued writes get flushed first.
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
     port = int(os.environ.get('PORT', 5000))
     print(f"🚀 Bingo API Server running on port {port}")
     print(f"Discord bot will send drops to: /drop endpoint")
@@ -2100,6 +2100,26 @@
             }
         }
 
+        // Every /history row matching params, following the `next` cursor page by page -
+        // the API returns at most `limit` rows per response however many match.
+        const HISTORY_PAGE_SIZE = 1000;
+
+        async function fetchAllHistory(params = new URLSearchParams()) {
+            const rows = [];
+            let cursor = null;
+            do {
+                const pageParams = new URLSearchParams(params);
+                pageParams.set('limit', HISTORY_PAGE_SIZE);
+                if (cursor) pageParams.set('cursor', cursor);
+                const response = await fetch(`${API_URL}/history?${pageParams}`);
+                if (!response.ok) throw new Error('Failed to fetch history');
+                const data = await response.json();
+                rows.push(...(data.history || []));
+                cursor = data.next;
+            } while (cursor);
+            return rows;
+        }
+
         async function loadHistory() {
             const contentDiv = document.getElementById('historyContent');
             const countSpan = document.getElementById('historyCount');
@@ -2111,41 +2131,36 @@
             countSpan.textContent = '';
 
             try {
-                let url = `${API_URL}/history?limit=1000`;
+                const params = new URLSearchParams();
 
                 if (playerFilter) {
-                    url += `&player=${encodeURIComponent(playerFilter)}`;
+                    params.append('player', playerFilter);
                 }
 
                 if (startDate) {
-                    url += `&start_date=${startDate}T00:00:00Z`;
+                    params.append('start_date', `${startDate}T00:00:00Z`);
                 }
 
                 if (endDate) {
-                    url += `&end_date=${endDate}T23:59:59Z`;
+                    params.append('end_date', `${endDate}T23:59:59Z`);
                 }
 
-                console.log('Fetching history:', url);
+                console.log('Fetching history:', params.toString());
 
-                const response = await fetch(url);
-                if (!response.ok) {
-                    throw new Error('Failed to fetch history');
-                }
-
-                const data = await response.json();
+                const history = await fetchAllHistory(params);
 
-                if (!data.history  || data.history.length === 0) {
+                if (history.length === 0) {
                     contentDiv.innerHTML = '<div style="text-align: center; color: #666; padding: 40px;">No drops found for this time period!</div>';
                     countSpan.textContent = '(0 drops)';
                     return;
                 }
 
                 // Update count
-                countSpan.textContent = `(${data.count} drop${data.count !== 1 ? 's' : ''})`;
+                countSpan.textContent = `(${history.length} drop${history.length !== 1 ? 's' : ''})`;
 
                 // Render history
                 let html = '';
-                data.history.forEach((record, index) => {
+                history.forEach((record, index) => {
                     const timestamp = new Date(record.timestamp);
                     const timeAgo = getTimeAgo(timestamp);
                     const dateStr = timestamp.toLocaleDateString();
@@ -2211,7 +2226,7 @@
                 contentDiv.innerHTML = html;
 
                 // Update player filter with actual history data
-                updateHistoryPlayerFilter(data.history);
+                updateHistoryPlayerFilter(history);
 
             } catch (error) {
                 console.error('Error loading history:', error);
@@ -2328,7 +2343,7 @@
         let _analyticsMode = 'bingo'; // 'bingo' = current event only, 'alltime' = full history
         let _analyticsEventConfig = null;
         let _lootTableViewMode = 'everyone'; // 'everyone' = one combined table, 'byPlayer' = one table per player
-        let _lootTableDrops = []; // last-rendered filtered drops, cached so the view toggle can re-render without refetching
+        let _lootTableSummary = null; // last-rendered analytics summary, cached so the view toggle can re-render without refetching
 
         function openAnalyticsModal() {
             document.getElementById('analyticsModal').classList.add('active');
@@ -2390,6 +2405,76 @@
             return _analyticsEventConfig.startDate;
         }
 
+        // Analytics charts are drawn from /analytics/summary, which does the counting,
+        // loot/collection_log deduping and day/hour bucketing server-side (in the browser's
+        // timezone), so only the bucketed numbers come over the wire rather than every
+        // history row - and nothing is capped at the first 10k drops any more.
+        const ANALYTICS_TOP_DROPS = 50; // most valuable drops listed in the loot table (server max)
+
+        async function fetchAnalyticsSummary({ type = '', minValue = 0, search = '', players = [] } = {}) {
+            const params = new URLSearchParams({
+                tz: Intl.DateTimeFormat().resolvedOptions().timeZone || 'UTC',
+                top: ANALYTICS_TOP_DROPS
+            });
+            if (type) params.append('type', type);
+            if (minValue > 0) params.append('minValue', minValue);
+            if (search) params.append('search', search);
+            if (players.length > 0) params.append('players', players.join(','));
+            const startDate = getAnalyticsStartDate();
+            if (startDate) params.append('start_date', startDate);
+
+            const response = await fetch(`${API_URL}/analytics/summary?${params}`);
+            if (!response.ok) throw new Error('Failed to fetch analytics summary');
+            return response.json();
+        }
+
+        // YYYY-MM-DD in the browser's timezone - the same day keys the summary buckets by
+        function localDateKey(date) {
+            return `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}-${String(date.getDate()).padStart(2, '0')}`;
+        }
+
+        // The last 30 days and each player's drop count on them, from the summary's per_day_player
+        function dropsPerDayByPlayer(summary, players) {
+            const days = [];
+            const today = new Date();
+            for (let i = 29; i >= 0; i--) {
+                const date = new Date(today);
+                date.setDate(today.getDate() - i);
+                days.push(localDateKey(date));
+            }
+
+            const counts = {};
+            players.forEach(player => {
+                counts[player] = {};
+                days.forEach(d => counts[player][d] = 0);
+            });
+            (summary.per_day_player || []).forEach(row => {
+                if (counts[row.player] && counts[row.player].hasOwnProperty(row.date)) {
+                    counts[row.player][row.date] = row.drops;
+                }
+            });
+            return { days, counts };
+        }
+
+        // Draws every analytics card from one /analytics/summary response
+        function renderAnalyticsSummary(summary) {
+            const players = analyticsSelectedPlayers.length > 0
+                ? analyticsSelectedPlayers
+                : summary.per_player.map(p => p.player);
+
+            const playerColors = assignPlayerColors(players);
+
+            updateDropsOverTimeChart(summary, players, playerColors);
+            updateTopItemsChart(summary, players, playerColors);
+            renderActivityHeatmapGrid(summary.heatmap);
+
+            generateKeyStats(summary);
+            generatePlayerActivityChart(summary.per_player);
+            generateValueLeaderboardChart(summary.per_player);
+            generateLootValueTable(summary);
+            generateMonthComparisonChart(summary.per_month);
+        }
+
         // Dink can send two separate Discord messages for one physical item pickup - a "Loot
         // Drop" message and, if it's a new slot, a "Collection Log" message - and both get
         // saved as their own row in drop_history. That's correct for the raw History log, but
@@ -2397,6 +2482,9 @@
         // collapses same player+item rows that land within a few seconds of each other (i.e.
         // a loot/collection_log pair for the same pickup) into one, before any chart/stat sees
         // them. Does not touch the underlying data - only affects what Analytics computes.
+        // The analytics charts get this server-side (/analytics/summary counts only each pair's
+        // is_primary row, as linked at ingest); the Timeline, which lists individual drops, still
+        // collapses them here.
         function dedupeDropsForAnalytics(drops, windowSeconds = 5) {
             const byPlayer = {};
             drops.forEach(d => {
@@ -2534,16 +2622,14 @@
                 : 'No active event configured — grouping by calendar date';
 
             try {
-                const params = new URLSearchParams({ limit: 10000 });
+                const params = new URLSearchParams();
                 if (hasEvent) params.append('start_date', eventConfig.startDate);
 
-                const response = await fetch(`${API_URL}/history?${params}`);
-                if (!response.ok) throw new Error('Failed to fetch history');
-                const data = await response.json();
+                const history = await fetchAllHistory(params);
 
                 // Oldest first, and collapse the loot/collection_log duplicate
                 // messages Dink can send for a single pickup (see dedupeDropsForAnalytics).
-                const drops = dedupeDropsForAnalytics((data.history || []).map(d => ({
+                const drops = dedupeDropsForAnalytics(history.map(d => ({
                     ...d,
                     timestamp: new Date(d.timestamp)
                 }))).sort((a, b) => a.timestamp - b.timestamp);
@@ -2805,7 +2891,7 @@
             }
 
             // --- Fetch data ---
-            const params = new URLSearchParams({ limit: 1000 });
+            const params = new URLSearchParams();
             if (analyticsType)  params.append('type', analyticsType);
             if (analyticsValue > 0) params.append('minValue', analyticsValue);
             const effectiveSearch = itemSearch || analyticsSearch;
@@ -2825,9 +2911,7 @@
             }
 
             try {
-                const response = await fetch(`${API_URL}/history?${params}`);
-                const data = await response.json();
-                let drops = (data.history || []).map(d => ({ ...d, timestamp: new Date(d.timestamp) }));
+                let drops = (await fetchAllHistory(params)).map(d => ({ ...d, timestamp: new Date(d.timestamp) }));
 
                 // Client-side filters (day-of-week and hour have no API equivalent)
                 if (dayOfWeek !== null) drops = drops.filter(d => d.timestamp.getDay() === dayOfWeek);
@@ -3034,57 +3118,26 @@
             }, 100);
 
             try {
-                // Fetch history data, scoped to the current event unless in All Time mode
-                const params = new URLSearchParams({ limit: 10000 });
-                const startDate = getAnalyticsStartDate();
-                if (startDate) params.append('start_date', startDate);
-
-                const response = await fetch(`${API_URL}/history?${params}`);
-                if (!response.ok) throw new Error('Failed to fetch history');
-
-                const data = await response.json();
+                // Scoped to the current event unless in All Time mode
+                const summary = await fetchAnalyticsSummary();
 
-                if (!data.history || data.history.length === 0) {
-                    const msg = startDate ? 'No drops recorded yet for the current event!' : 'No data available yet!';
+                if (!summary.totals || summary.totals.drops === 0) {
+                    const msg = getAnalyticsStartDate() ? 'No drops recorded yet for the current event!' : 'No data available yet!';
                     loadingDiv.innerHTML = `<div style="text-align: center; padding: 60px; color: #666;">${msg}</div>`;
                     loadingDiv.style.display = 'block';
                     contentDiv.style.display = 'none';
                     return;
                 }
 
-                // Process data - convert timestamps to Date objects, then collapse
-                // loot/collection_log pairs so drop counts reflect real events
-                const drops = dedupeDropsForAnalytics(data.history.map(d => ({
-                    ...d,
-                    timestamp: new Date(d.timestamp)
-                })));
-
                 // Populate player filter (for filtering feature)
-                populateAnalyticsPlayerFilter(drops);
+                populateAnalyticsPlayerFilter(summary.per_player.map(p => p.player));
 
                 // Initialize filters
                 analyticsSelectedPlayers = [];
                 updateAnalyticsPlayerButton();
                 renderAnalyticsFilterChips();
 
-                // Generate all analytics with filtering support
-                const players = analyticsSelectedPlayers.length > 0
-                    ? analyticsSelectedPlayers
-                    : [...new Set(drops.map(r => r.player))];
-
-                const playerColors = assignPlayerColors(players);
-
-                // Use new chart update functions that support multi-player
-                updateDropsOverTimeChart(drops, players, playerColors);
-                updateTopItemsChart(drops, players, playerColors);
-                renderActivityHeatmapGrid(drops);
-
-                // Also generate the other charts
-                generateKeyStats(drops);
-                generatePlayerActivityChart(drops);
-                generateValueLeaderboardChart(drops);
-                generateLootValueTable(drops);
-                generateMonthComparisonChart(drops);
+                renderAnalyticsSummary(summary);
 
                 loadingDiv.style.display = 'none';
                 contentDiv.style.display = 'block';
@@ -3301,7 +3354,7 @@
             if (!expandedChartData) return;
 
             const dropdown = document.getElementById('expandedPlayerDropdown');
-            const players = [...new Set(expandedChartData.map(d => d.player))].sort();
+            const players = expandedChartData.per_player.map(p => p.player).sort();
 
             dropdown.innerHTML = players.map(player => {
                 const isChecked = expandedSelectedPlayers.includes(player);
@@ -3350,42 +3403,34 @@
             const valueFilter = parseInt(document.getElementById('expandedValueFilter')?.value || '0');
             const searchFilter = document.getElementById('expandedSearchFilter')?.value.toLowerCase() || '';
 
-            // Build query parameters
-            const params = new URLSearchParams({ limit: 10000 });
-            if (typeFilter) params.append('type', typeFilter);
-            if (valueFilter > 0) params.append('minValue', valueFilter);
-            if (searchFilter) params.append('search', searchFilter);
-            const expandedEventStartDate = getAnalyticsStartDate();
-            if (expandedEventStartDate) params.append('start_date', expandedEventStartDate);
-
             try {
-                const response = await fetch(`${API_URL}/history?${params}`);
-                const data = await response.json();
-
-                let filteredHistory = dedupeDropsForAnalytics((data.history || []).map(d => ({
-                    ...d,
-                    timestamp: new Date(d.timestamp)
-                })));
+                // Not narrowed to the selected players: they only pick the lines on the
+                // drops-over-time chart, and the player dropdown still lists everyone
+                const summary = await fetchAnalyticsSummary({
+                    type: typeFilter,
+                    minValue: valueFilter,
+                    search: searchFilter
+                });
 
                 // Store for player dropdown
-                expandedChartData = filteredHistory;
+                expandedChartData = summary;
 
                 // Get players to display
                 const players = expandedSelectedPlayers.length > 0
                     ? expandedSelectedPlayers
-                    : [...new Set(filteredHistory.map(r => r.player))];
+                    : summary.per_player.map(p => p.player);
 
                 const playerColors = assignPlayerColors(players);
 
                 // Update the expanded chart based on type
-                updateExpandedChartWithData(currentExpandedChart, filteredHistory, players, playerColors);
+                updateExpandedChartWithData(currentExpandedChart, summary, players, playerColors);
 
             } catch (error) {
                 console.error('Failed to apply expanded chart filters:', error);
             }
         }
 
-function updateExpandedChartWithData(chartId, drops, players, playerColors) {
+function updateExpandedChartWithData(chartId, summary, players, playerColors) {
             if (!expandedChartInstance) return;
 
             // Destroy current chart
@@ -3400,29 +3445,7 @@ function updateExpandedChartWithData(chartId, drops, players, playerColors) {
             switch(chartId) {
                 case 'dropsPerDayChart':
                     // Recreate drops over time chart with filtered data
-                    const last30Days = [];
-                    const dayCounts = {};
-                    const today = new Date();
-
-                    for (let i = 29; i >= 0; i--) {
-                        const date = new Date(today);
-                        date.setDate(today.getDate() - i);
-                        const dateStr = date.toISOString().split('T')[0];
-                        last30Days.push(dateStr);
-                        players.forEach(player => {
-                            if (!dayCounts[player]) dayCounts[player] = {};
-                            dayCounts[player][dateStr] = 0;
-                        });
-                    }
-
-                    drops.forEach(d => {
-                        const dateStr = d.timestamp.toISOString().split('T')[0];
-                        if (last30Days.includes(dateStr)) {
-                            if (dayCounts[d.player]) {
-                                dayCounts[d.player][dateStr] = (dayCounts[d.player][dateStr] || 0) + 1;
-                            }
-                        }
-                    });
+                    const { days: last30Days, counts: dayCounts } = dropsPerDayByPlayer(summary, players);
 
                     const datasets = players.map(player => ({
                         label: player,
@@ -3437,7 +3460,7 @@ function updateExpandedChartWithData(chartId, drops, players, playerColors) {
                         type: 'line',
                         data: {
                             labels: last30Days.map(d => {
-                                const date = new Date(d);
+                                const date = new Date(d + 'T12:00:00');
                                 return `${date.getMonth() + 1}/${date.getDate()}`;
                             }),
                             datasets: datasets
@@ -3466,18 +3489,9 @@ function updateExpandedChartWithData(chartId, drops, players, playerColors) {
                     break;
 
                 case 'topItemsChart':
-                    // Recreate top items chart with filtered data
-                    const itemValues = {};
-                    drops.forEach(d => {
-                        const value = d.value || 0;
-                        if (itemValues[d.item]) {
-                            itemValues[d.item] += value;
-                        } else {
-                            itemValues[d.item] = value;
-                        }
-                    });
-
-                    const sortedItems = Object.entries(itemValues)
+                    // Recreate top items chart with filtered data (the most common items, by total value)
+                    const sortedItems = summary.top_items
+                        .map(i => [i.item, i.value || 0])
                         .sort((a, b) => b[1] - a[1])
                         .slice(0, 10);
 
@@ -3528,12 +3542,8 @@ function updateExpandedChartWithData(chartId, drops, players, playerColors) {
 
                 case 'playerActivityChart':
                     // Recreate player activity chart with filtered data
-                    const playerCounts = {};
-                    drops.forEach(d => {
-                        playerCounts[d.player] = (playerCounts[d.player] || 0) + 1;
-                    });
-
-                    const sortedPlayers = Object.entries(playerCounts)
+                    const sortedPlayers = summary.per_player
+                        .map(p => [p.player, p.drops])
                         .sort((a, b) => b[1] - a[1]);
 
                     config = {
@@ -3566,12 +3576,8 @@ function updateExpandedChartWithData(chartId, drops, players, playerColors) {
 
                 case 'valueLeaderboardChart':
                     // Recreate drop value leaderboard with filtered data
-                    const playerValues2 = {};
-                    drops.forEach(d => {
-                        playerValues2[d.player] = (playerValues2[d.player] || 0) + (d.value || 0);
-                    });
-
-                    const sortedPlayerValues = Object.entries(playerValues2)
+                    const sortedPlayerValues = summary.per_player
+                        .map(p => [p.player, p.value || 0])
                         .sort((a, b) => b[1] - a[1]);
 
                     config = {
@@ -3618,15 +3624,9 @@ function updateExpandedChartWithData(chartId, drops, players, playerColors) {
                 case 'monthComparisonChart':
                     // Recreate month comparison chart with filtered data
                     const monthNames2 = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
-                    const monthCounts2 = {};
-
-                    drops.forEach(d => {
-                        const monthKey = `${d.timestamp.getFullYear()}-${String(d.timestamp.getMonth() + 1).padStart(2, '0')}`;
-                        monthCounts2[monthKey] = (monthCounts2[monthKey] || 0) + 1;
-                    });
 
-                    const sortedMonths = Object.entries(monthCounts2)
-                        .sort((a, b) => a[0].localeCompare(b[0]))
+                    const sortedMonths = summary.per_month
+                        .map(m => [m.month, m.drops])
                         .slice(-6);
 
                     config = {
@@ -3757,45 +3757,34 @@ function updateExpandedChartWithData(chartId, drops, players, playerColors) {
             makeChartExpandable('monthComparisonChart', '📆 Monthly Comparison');
         }
 
-        function generateKeyStats(drops) {
+        function generateKeyStats(summary) {
+            const totals = summary.totals;
+
             // Total drops
-            document.getElementById('totalDrops').textContent = drops.length.toLocaleString();
+            document.getElementById('totalDrops').textContent = totals.drops.toLocaleString();
 
             // Total value looted
-            const totalValue = drops.reduce((sum, d) => sum + (d.value || 0), 0);
-            document.getElementById('totalValueLooted').textContent = formatGP(totalValue) + ' gp';
+            document.getElementById('totalValueLooted').textContent = formatGP(totals.value || 0) + ' gp';
 
             // Unique players
-            const uniquePlayers = new Set(drops.map(d => d.player));
-            document.getElementById('uniquePlayers').textContent = uniquePlayers.size;
+            document.getElementById('uniquePlayers').textContent = totals.players;
 
             // Tiles completed
-            const tilesCompleted = drops.filter(d => d.tileCompleted).length;
-            document.getElementById('tilesCompleted').textContent = tilesCompleted.toLocaleString();
+            document.getElementById('tilesCompleted').textContent = (totals.tiles_completed || 0).toLocaleString();
 
             // Most active day
-            const dayCount = {};
-            drops.forEach(d => {
-                const dateStr = d.timestamp.toISOString().split('T')[0];
-                dayCount[dateStr] = (dayCount[dateStr] || 0) + 1;
-            });
-            const mostActiveDay = Object.entries(dayCount).sort((a, b) => b[1] - a[1])[0];
+            const mostActiveDay = [...summary.per_day].sort((a, b) => b.drops - a.drops)[0];
             if (mostActiveDay) {
-                const date = new Date(mostActiveDay[0]);
-                document.getElementById('mostActiveDay').textContent = `${date.toLocaleDateString()} (${mostActiveDay[1]} drops)`;
+                const date = new Date(mostActiveDay.date + 'T12:00:00');
+                document.getElementById('mostActiveDay').textContent = `${date.toLocaleDateString()} (${mostActiveDay.drops} drops)`;
             }
 
             // Best month
-            const monthCount = {};
             const monthNames = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
-            drops.forEach(d => {
-                const monthKey = `${d.timestamp.getFullYear()}-${String(d.timestamp.getMonth() + 1).padStart(2, '0')}`;
-                monthCount[monthKey] = (monthCount[monthKey] || 0) + 1;
-            });
-            const bestMonth = Object.entries(monthCount).sort((a, b) => b[1] - a[1])[0];
+            const bestMonth = [...summary.per_month].sort((a, b) => b.drops - a.drops)[0];
             if (bestMonth) {
-                const [year, month] = bestMonth[0].split('-');
-                document.getElementById('bestMonth').textContent = `${monthNames[parseInt(month) - 1]} ${year} (${bestMonth[1]} drops)`;
+                const [year, month] = bestMonth.month.split('-');
+                document.getElementById('bestMonth').textContent = `${monthNames[parseInt(month) - 1]} ${year} (${bestMonth.drops} drops)`;
             }
         }
 
@@ -3804,18 +3793,14 @@ function updateExpandedChartWithData(chartId, drops, players, playerColors) {
         // "Activity by Day of Week" and "Activity by Hour of Day" bar charts — a single
         // 7x24 grid can actually show something like "busiest Saturday evenings",
         // which two independent 1-D breakdowns can't distinguish from e.g. Tuesday mornings.
-        function renderActivityHeatmapGrid(drops) {
+        function renderActivityHeatmapGrid(counts) {
             const container = document.getElementById('activityHeatmapGrid');
             if (!container) return;
 
             const dayLabels = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat'];
             const dayNamesFull = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday'];
 
-            // counts[day][hour]
-            const counts = Array.from({ length: 7 }, () => Array(24).fill(0));
-            drops.forEach(d => {
-                counts[d.timestamp.getDay()][d.timestamp.getHours()]++;
-            });
+            // counts[day][hour], day 0 = Sunday - the summary's heatmap, bucketed in the browser's timezone
 
             const maxCount = Math.max(1, ...counts.flat());
 
@@ -3854,15 +3839,11 @@ function updateExpandedChartWithData(chartId, drops, players, playerColors) {
             container.innerHTML = html;
         }
 
-        function generatePlayerActivityChart(drops) {
+        function generatePlayerActivityChart(perPlayer) {
             const ctx = document.getElementById('playerActivityChart').getContext('2d');
 
-            const playerCounts = {};
-            drops.forEach(d => {
-                playerCounts[d.player] = (playerCounts[d.player] || 0) + 1;
-            });
-
-            const sortedPlayers = Object.entries(playerCounts)
+            const sortedPlayers = perPlayer
+                .map(p => [p.player, p.drops])
                 .sort((a, b) => b[1] - a[1])
                 .slice(0, 10); // Top 10 players
 
@@ -3914,18 +3895,13 @@ function updateExpandedChartWithData(chartId, drops, players, playerColors) {
             return value.toLocaleString();
         }
 
-        function generateValueLeaderboardChart(drops) {
+        function generateValueLeaderboardChart(perPlayer) {
             const canvas = document.getElementById('valueLeaderboardChart');
             if (!canvas) return;
             const ctx = canvas.getContext('2d');
 
-            // Sum drop value per player
-            const playerValues = {};
-            drops.forEach(d => {
-                playerValues[d.player] = (playerValues[d.player] || 0) + (d.value || 0);
-            });
-
-            const sortedPlayers = Object.entries(playerValues)
+            const sortedPlayers = perPlayer
+                .map(p => [p.player, p.value || 0])
                 .sort((a, b) => b[1] - a[1])
                 .slice(0, 10); // Top 10 players
 
@@ -3993,27 +3969,27 @@ function updateExpandedChartWithData(chartId, drops, players, playerColors) {
             document.getElementById('lootTableViewByPlayer').classList.toggle('active', mode === 'byPlayer');
             document.getElementById('lootTableViewEveryoneExpanded').classList.toggle('active', mode === 'everyone');
             document.getElementById('lootTableViewByPlayerExpanded').classList.toggle('active', mode === 'byPlayer');
-            renderLootValueTable(_lootTableDrops, 'lootValueTableWrap', 'lootValueTableMeta');
-            if (_lootTableExpandOpen) renderLootValueTable(_lootTableDrops, 'lootValueTableWrapExpanded', 'lootValueTableMetaExpanded');
+            renderLootValueTable(_lootTableSummary, 'lootValueTableWrap', 'lootValueTableMeta');
+            if (_lootTableExpandOpen) renderLootValueTable(_lootTableSummary, 'lootValueTableWrapExpanded', 'lootValueTableMetaExpanded');
         }
 
-        // Called alongside the other generate*Chart functions with the same filtered drop set
-        // (already scoped to Current Bingo / All Time and the analytics filter bar) — cached so
-        // the Everyone / By Player toggle (and the expand modal) can re-render instantly without
+        // Called alongside the other generate*Chart functions with the same summary (already
+        // scoped to Current Bingo / All Time and the analytics filter bar) — cached so the
+        // Everyone / By Player toggle (and the expand modal) can re-render instantly without
         // a refetch.
-        function generateLootValueTable(drops) {
-            _lootTableDrops = drops;
-            renderLootValueTable(drops, 'lootValueTableWrap', 'lootValueTableMeta');
-            if (_lootTableExpandOpen) renderLootValueTable(drops, 'lootValueTableWrapExpanded', 'lootValueTableMetaExpanded');
+        function generateLootValueTable(summary) {
+            _lootTableSummary = summary;
+            renderLootValueTable(summary, 'lootValueTableWrap', 'lootValueTableMeta');
+            if (_lootTableExpandOpen) renderLootValueTable(summary, 'lootValueTableWrapExpanded', 'lootValueTableMetaExpanded');
         }
 
         // Opens a big modal version of the loot table — same data, same view-mode toggle, just
-        // full-size with nothing capped (the inline card view is unlimited too, this is purely
-        // about screen real estate, same as expanding one of the Chart.js charts).
+        // full-size (this is purely about screen real estate, same as expanding one of the
+        // Chart.js charts).
         function openLootTableExpand() {
             _lootTableExpandOpen = true;
             document.getElementById('lootTableExpandModal').classList.add('active');
-            renderLootValueTable(_lootTableDrops, 'lootValueTableWrapExpanded', 'lootValueTableMetaExpanded');
+            renderLootValueTable(_lootTableSummary, 'lootValueTableWrapExpanded', 'lootValueTableMetaExpanded');
         }
 
         function closeLootTableExpand() {
@@ -4021,17 +3997,20 @@ function updateExpandedChartWithData(chartId, drops, players, playerColors) {
             document.getElementById('lootTableExpandModal').classList.remove('active');
         }
 
-        function renderLootValueTable(drops, wrapId, metaId) {
+        function renderLootValueTable(summary, wrapId, metaId) {
             const wrap = document.getElementById(wrapId);
             const meta = document.getElementById(metaId);
-            if (!wrap) return;
+            if (!wrap || !summary) return;
 
             // Loot only — drops with an actual GE value. Collection Log completions for
             // untradeable items (or ones the price lookup missed) carry no GP value at all, and
             // showing those in a table titled "by value" just fills it with meaningless "no
             // value" rows. This is a different, narrower count than "Most Dropped Items" /
             // "Total Drops by Player" on purpose — those count every drop event, this counts loot.
-            const valued = drops.filter(d => (d.value || 0) > 0).sort((a, b) => (b.value || 0) - (a.value || 0));
+            // The summary's top_drops are the ANALYTICS_TOP_DROPS most valuable, richest first.
+            const valued = (summary.top_drops || []).map(d => ({ ...d, timestamp: new Date(d.timestamp) }));
+            const playerValues = {};
+            (summary.per_player || []).forEach(p => { playerValues[p.player] = p.value || 0; });
 
             if (valued.length === 0) {
                 meta.textContent = '';
@@ -4065,24 +4044,22 @@ function updateExpandedChartWithData(chartId, drops, players, playerColors) {
                 <tbody>`;
             const tableClose = '</tbody></table>';
 
-            const totalValue = valued.reduce((sum, d) => sum + (d.value || 0), 0);
+            const totalValue = summary.totals.value || 0;
 
             if (_lootTableViewMode === 'everyone') {
-                meta.innerHTML = `<strong style="color:#cd8b2d;">${valued.length}</strong> valued drop${valued.length !== 1 ? 's' : ''} &nbsp;·&nbsp; Total: <strong>${formatGP(totalValue)} gp</strong>`;
+                meta.innerHTML = `Top <strong style="color:#cd8b2d;">${valued.length}</strong> valued drop${valued.length !== 1 ? 's' : ''} &nbsp;·&nbsp; Total: <strong>${formatGP(totalValue)} gp</strong>`;
                 wrap.innerHTML = tableOpen(true) + valued.map(d => rowHtml(d, true)).join('') + tableClose;
             } else {
                 // Group by player, order players by their combined value (richest first)
                 const byPlayer = {};
                 valued.forEach(d => { (byPlayer[d.player] = byPlayer[d.player] || []).push(d); });
-                const players = Object.keys(byPlayer).sort((a, b) =>
-                    byPlayer[b].reduce((s, d) => s + (d.value || 0), 0) - byPlayer[a].reduce((s, d) => s + (d.value || 0), 0)
-                );
+                const players = Object.keys(byPlayer).sort((a, b) => (playerValues[b] || 0) - (playerValues[a] || 0));
 
                 meta.innerHTML = `<strong style="color:#cd8b2d;">${players.length}</strong> player${players.length !== 1 ? 's' : ''} &nbsp;·&nbsp; Total: <strong>${formatGP(totalValue)} gp</strong>`;
 
                 wrap.innerHTML = players.map(player => {
                     const rows = byPlayer[player];
-                    const playerTotal = rows.reduce((s, d) => s + (d.value || 0), 0);
+                    const playerTotal = playerValues[player] || 0;
                     return `<div style="margin-bottom:4px;">
                         <div style="background:#f4ecdc;padding:6px 10px;font-weight:bold;color:#2c1810;font-size:13px;display:flex;justify-content:space-between;position:sticky;top:0;">
                             <span>👤 ${player}</span>
@@ -4094,19 +4071,14 @@ function updateExpandedChartWithData(chartId, drops, players, playerColors) {
             }
         }
 
-        function generateMonthComparisonChart(drops) {
+        function generateMonthComparisonChart(perMonth) {
             const ctx = document.getElementById('monthComparisonChart').getContext('2d');
 
-            const monthCounts = {};
             const monthNames = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
 
-            drops.forEach(d => {
-                const monthKey = `${d.timestamp.getFullYear()}-${String(d.timestamp.getMonth() + 1).padStart(2, '0')}`;
-                monthCounts[monthKey] = (monthCounts[monthKey] || 0) + 1;
-            });
-
-            const sortedMonths = Object.entries(monthCounts)
-                .sort((a, b) => a[0].localeCompare(b[0]))
+            // Already sorted oldest first by the server
+            const sortedMonths = perMonth
+                .map(m => [m.month, m.drops])
                 .slice(-12); // Last 12 months
 
             const labels = sortedMonths.map(m => {
@@ -4185,19 +4157,11 @@ function updateExpandedChartWithData(chartId, drops, players, playerColors) {
             }
         });
 
-        function populateAnalyticsPlayerFilter(historyData) {
+        function populateAnalyticsPlayerFilter(playerNames) {
             const dropdown = document.getElementById('analyticsPlayerDropdown');
             if (!dropdown) return;
 
-            // Get unique players from history
-            const allPlayers = new Set();
-            historyData.forEach(record => {
-                if (record.player) {
-                    allPlayers.add(record.player);
-                }
-            });
-
-            const sortedPlayers = Array.from(allPlayers).sort();
+            const sortedPlayers = playerNames.filter(Boolean).sort();
 
             // Build checkbox list
             let html = '';
@@ -4413,58 +4377,14 @@ async function loadAnalyticsWithFilters() {
             const valueFilter = parseInt(document.getElementById('analyticsValueFilter')?.value || '0');
             const searchFilter = document.getElementById('analyticsSearchFilter')?.value.toLowerCase() || '';
 
-            // Build query parameters
-            const params = new URLSearchParams({
-                limit: 10000
-            });
-
-            if (typeFilter) params.append('type', typeFilter);
-            if (valueFilter > 0) params.append('minValue', valueFilter);
-            if (searchFilter) params.append('search', searchFilter);
-
-            const eventStartDate = getAnalyticsStartDate();
-            if (eventStartDate) params.append('start_date', eventStartDate);
-
             try {
-                const response = await fetch(`${API_URL}/history?${params}`);
-                const data = await response.json();
-
-                let filteredHistory = data.history || [];
-
-                //Process data - convert timestamps to Date objects
-                filteredHistory = filteredHistory.map(d => ({
-                    ...d,
-                    timestamp: new Date(d.timestamp)
-                }));
-
-                // Collapse loot/collection_log pairs so drop counts reflect real events
-                filteredHistory = dedupeDropsForAnalytics(filteredHistory);
-
-                // Apply player filter (client-side for multi-select)
-                if (analyticsSelectedPlayers.length > 0) {
-                    filteredHistory = filteredHistory.filter(record =>
-                        analyticsSelectedPlayers.includes(record.player)
-                    );
-                }
-
-                // Get player list and colors
-                const players = analyticsSelectedPlayers.length > 0
-                    ? analyticsSelectedPlayers
-                    : [...new Set(filteredHistory.map(r => r.player))];
-
-                const playerColors = assignPlayerColors(players);
-
-                // Update multi-player charts
-                updateDropsOverTimeChart(filteredHistory, players, playerColors);
-                updateTopItemsChart(filteredHistory, players, playerColors);
-                renderActivityHeatmapGrid(filteredHistory);
-
-                // Update other charts
-                generateKeyStats(filteredHistory);
-                generatePlayerActivityChart(filteredHistory);
-                generateValueLeaderboardChart(filteredHistory);
-                generateLootValueTable(filteredHistory);
-                generateMonthComparisonChart(filteredHistory);
+                const summary = await fetchAnalyticsSummary({
+                    type: typeFilter,
+                    minValue: valueFilter,
+                    search: searchFilter,
+                    players: analyticsSelectedPlayers
+                });
+                renderAnalyticsSummary(summary);
 
             } catch (error) {
                 console.error('Failed to load analytics:', error);
@@ -4504,19 +4424,11 @@ async function loadAnalyticsWithFilters() {
         }
 
 
-        function updateDropsOverTimeChart(historyData, players, playerColors) {
+        function updateDropsOverTimeChart(summary, players, playerColors) {
             const ctx = document.getElementById('dropsPerDayChart').getContext('2d');
 
-            // Get last 30 days
-            const last30Days = [];
-            const today = new Date();
-
-            for (let i = 29; i >= 0; i--) {
-                const date = new Date(today);
-                date.setDate(today.getDate() - i);
-                const dateStr = date.toISOString().split('T')[0];
-                last30Days.push(dateStr);
-            }
+            // Last 30 days
+            const { days: last30Days, counts } = dropsPerDayByPlayer(summary, players);
 
             const labels = last30Days.map(d => {
                 const date = new Date(d + 'T12:00:00');
@@ -4533,19 +4445,7 @@ async function loadAnalyticsWithFilters() {
 
             // Create datasets for each player
             const datasets = players.map(player => {
-                const dayCounts = {};
-                last30Days.forEach(d => dayCounts[d] = 0);
-
-                historyData.forEach(drop => {
-                    if (drop.player === player) {
-                        const dateStr = drop.timestamp.toISOString().split('T')[0];
-                        if (dayCounts.hasOwnProperty(dateStr)) {
-                            dayCounts[dateStr]++;
-                        }
-                    }
-                });
-
-                const data = last30Days.map(d => dayCounts[d]);
+                const data = last30Days.map(d => counts[player][d]);
                 const color = playerColors[player] || '#cd8b2d';
 
                 return {
@@ -4605,19 +4505,13 @@ async function loadAnalyticsWithFilters() {
             });
         }
 
-        function updateTopItemsChart(historyData, players, playerColors) {
+        function updateTopItemsChart(summary, players, playerColors) {
             const ctx = document.getElementById('topItemsChart').getContext('2d');
 
             if (players.length === 1) {
-                const itemCounts = {};
-                historyData.forEach(d => {
-                    if (d.player === players[0]) {
-                        itemCounts[d.item] = (itemCounts[d.item] || 0) + 1;
-                    }
-                });
-
-                const sortedItems = Object.entries(itemCounts)
-                    .sort((a, b) => b[1] - a[1])
+                // The summary was fetched for just this player, so its top items are theirs
+                const sortedItems = summary.top_items
+                    .map(i => [i.item, i.drops])
                     .slice(0, 10);
 
                 if (analyticsCharts.topItems) analyticsCharts.topItems.destroy();
@@ -4665,8 +4559,9 @@ async function loadAnalyticsWithFilters() {
                 });
             } else {
                 const playerDropCounts = {};
-                players.forEach(player => {
-                    playerDropCounts[player] = historyData.filter(d => d.player === player).length;
+                players.forEach(player => playerDropCounts[player] = 0);
+                summary.per_player.forEach(p => {
+                    if (playerDropCounts.hasOwnProperty(p.player)) playerDropCounts[p.player] = p.drops;
                 });
 
                 const sortedPlayers = Object.entries(playerDropCounts)
@@ -0,0 +1,36 @@
+"""
+Shared fixtures: bingo_api is imported against an in-memory mongomock
+client, so the suite needs no MongoDB server. Each test gets its own tenant
+(fresh per-tenant collections and an api_key to send as X-API-Key).
+"""
+import os
+import sys
+import uuid
+
+import mongomock
+import pymongo
+import pytest
+
+os.environ['BOOTSTRAP_INDEXES'] = 'false'
+pymongo.MongoClient = mongomock.MongoClient
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bingo_api  # noqa: E402
+
+
+@pytest.fixture
+def tenant():
+    subdomain = f'test{uuid.uuid4().hex[:8]}'
+    doc = {'tenant_id': f'{subdomain}_001', 'subdomain': subdomain, 'api_key': uuid.uuid4().hex}
+    bingo_api.tenants_collection.insert_one(dict(doc))
+    collections = bingo_api.tenant_collections_for_subdomain(subdomain)
+    yield {**doc, 'collections': collections}
+    for collection in collections.values():
+        collection.drop()
+    bingo_api.tenants_collection.delete_one({'tenant_id': doc['tenant_id']})
+    bingo_api.invalidate_tenant_cache()
+
+
+@pytest.fixture
+def client():
+    return bingo_api.app.test_client()
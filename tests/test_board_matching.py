@@ -0,0 +1,71 @@
+"""Compiled tile matching (compile_tile_match_index / match_drop_to_tiles) and the in-memory drop evaluation."""
+import bingo_api
+
+
+def board():
+    return {'tiles': [
+        {'items': ['Abyssal whip', 'Abyssal dagger'], 'value': 10},
+        {'items': ['Dragon warhammer'], 'value': 20},
+        {'items': ['Godsword shard 1', 'Godsword shard 2'], 'value': 30,
+         'requiredItems': ['Godsword shard 1', 'Godsword shard 2']},
+        {'items': [], 'value': 5},
+    ]}
+
+
+def test_exact_matches_ignore_case_and_whitespace():
+    index = bingo_api.compile_tile_match_index(board())
+    assert bingo_api.match_drop_to_tiles(index, '  abyssal WHIP ') == [(0, None)]
+    assert bingo_api.match_drop_to_tiles(index, 'Dragon warhammer') == [(1, None)]
+    assert bingo_api.match_drop_to_tiles(index, 'Bones') == []
+
+
+def test_regular_tiles_need_an_exact_match():
+    index = bingo_api.compile_tile_match_index(board())
+    assert bingo_api.match_drop_to_tiles(index, 'Dragon') == []
+
+
+def test_multi_item_tiles_match_substrings_to_their_slot():
+    index = bingo_api.compile_tile_match_index(board())
+    assert bingo_api.match_drop_to_tiles(index, 'Godsword shard 2') == [(2, 1)]
+    # Either way round: the drop's name inside the requirement, or the requirement inside it
+    assert bingo_api.match_drop_to_tiles(index, 'Godsword shard 1 (noted)') == [(2, 0)]
+    assert bingo_api.match_drop_to_tiles(index, 'godsword shard') == [(2, 0)]
+
+
+def test_empty_tiles_are_not_compiled():
+    assert 3 not in bingo_api.compile_tile_match_index(board())['tiles']
+
+
+def test_regular_tile_completes_on_one_item():
+    data = board()
+    index = bingo_api.compile_tile_match_index(data)
+    updated, completed, update = bingo_api._evaluate_drops_in_memory(data, index, 'Alice', ['Abyssal dagger'], 'T')
+
+    assert updated
+    assert completed == [{'tile': 1, 'items': ['Abyssal whip', 'Abyssal dagger'], 'value': 10}]
+    assert data['tiles'][0]['completedBy'] == ['Alice']
+    assert update == {'$addToSet': {'tiles.0.completedBy': 'Alice'}, '$set': {'tiles.0.completedAt.Alice': 'T'}}
+
+
+def test_multi_item_tile_completes_once_every_item_is_in():
+    data = board()
+    index = bingo_api.compile_tile_match_index(data)
+
+    updated, completed, update = bingo_api._evaluate_drops_in_memory(data, index, 'Alice', ['Godsword shard 1'], 'T1')
+    assert updated and completed == []
+    assert update == {'$push': {'tiles.2.itemProgress.Alice': {'$each': ['Godsword shard 1']}}}
+
+    updated, completed, _ = bingo_api._evaluate_drops_in_memory(data, index, 'Alice', ['Godsword shard 2'], 'T2')
+    assert [tile['tile'] for tile in completed] == [3]
+    assert data['tiles'][2]['completedAt'] == {'Alice': 'T2'}
+
+
+def test_repeat_drops_change_nothing():
+    data = board()
+    index = bingo_api.compile_tile_match_index(data)
+    bingo_api._evaluate_drops_in_memory(data, index, 'Alice', ['Abyssal whip', 'Godsword shard 1'], 'T1')
+
+    updated, completed, update = bingo_api._evaluate_drops_in_memory(
+        data, index, 'Alice', ['Abyssal whip', 'Godsword shard 1'], 'T2')
+    assert not updated and completed == [] and update == {}
+    assert data['tiles'][2]['itemProgress']['Alice'] == ['Godsword shard 1']
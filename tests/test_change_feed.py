@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import bingo_api
+
+
+def read_changes(client, tenant, dataset, since=None, limit=2):
+    """Every settled change after `since`, following `next` tokens. Returns (changes, last token)."""
+    changes = []
+    while True:
+        query = {'limit': limit}
+        if since:
+            query['since'] = since
+        response = client.get(f'/export/{dataset}/changes', query_string=query,
+                              headers={'X-API-Key': tenant['api_key']})
+        assert response.status_code == 200
+        changes.extend(response.json['changes'])
+        since = response.json['next']
+        if not response.json['has_more']:
+            return changes, since
+
+
+def test_change_feed_pages_and_resumes(client, tenant):
+    deaths = tenant['collections']['deaths']
+    settled = datetime.utcnow() - timedelta(minutes=10)
+    # Pairs share a changed_at, so paging has to break ties on _id
+    ids = deaths.insert_many([{'player': 'Zezima', 'npc': f'Npc {i}', 'changed_at': settled + timedelta(seconds=i // 2)}
+                              for i in range(5)]).inserted_ids
+
+    changes, token = read_changes(client, tenant, 'deaths')
+    assert [change['_id'] for change in changes] == [str(i) for i in ids]
+
+    # Nothing new: the token stays put
+    assert read_changes(client, tenant, 'deaths', since=token) == ([], token)
+
+    # An update moves the doc past the token; a write still inside the settle window waits
+    deaths.update_one({'_id': ids[1]}, {'$set': {'npc': 'Renamed', 'changed_at': settled + timedelta(minutes=5)}})
+    deaths.insert_one({'player': 'Zezima', 'npc': 'Too new', 'changed_at': datetime.utcnow()})
+    changes, _ = read_changes(client, tenant, 'deaths', since=token)
+    assert [(change['_id'], change['npc']) for change in changes] == [(str(ids[1]), 'Renamed')]
+
+
+def test_kc_changes_are_full_snapshots(client, tenant):
+    collections = tenant['collections']
+    start = datetime(2026, 1, 1)
+    bingo_api.write_kc_snapshots(collections, [{'player': 'Zezima', 'bosses': {'zulrah': 1}, 'timestamp': start,
+                                                'snapshot_type': 'start'}])
+    bingo_api.write_kc_snapshots(collections, [{'player': 'Zezima', 'bosses': {'zulrah': 4},
+                                                'timestamp': start + timedelta(hours=3), 'snapshot_type': 'current'}])
+    collections['kc'].update_many({}, {'$set': {'changed_at': datetime.utcnow() - timedelta(minutes=1)}})
+
+    changes, _ = read_changes(client, tenant, 'kc', limit=10)
+    assert [change['bosses'] for change in changes] == [{'zulrah': 1}, {'zulrah': 4}]
+    assert not any(field in change for change in changes for field in bingo_api.KC_DELTA_FIELDS)
+
+
+def test_change_feed_rejects_bad_input(client, tenant):
+    headers = {'X-API-Key': tenant['api_key']}
+    assert client.get('/export/tenants/changes', headers=headers).status_code == 404
+    assert client.get('/export/deaths/changes?since=garbage', headers=headers).status_code == 400
+    assert client.get('/export/deaths/changes?limit=lots', headers=headers).status_code == 400
@@ -0,0 +1,56 @@
+"""history_daily rollup: per-event counts and the /analytics/summary series summed from it."""
+from datetime import datetime, timedelta
+
+import bingo_api
+
+
+def record(collections, *docs):
+    return bingo_api.record_history_docs(collections, [bingo_api.build_history_doc(**doc) for doc in docs])
+
+
+def rollup_series(collections, only=bingo_api.ANALYTICS_ROLLUP_FACETS + bingo_api.ANALYTICS_ROLLUP_UTC_FACETS):
+    facets = next(collections['history_daily'].aggregate(bingo_api.build_analytics_rollup_pipeline({}, 10, only)))
+    return bingo_api.format_analytics_summary(facets)
+
+
+def test_twin_pair_counts_once_as_a_drop(tenant):
+    c = tenant['collections']
+    t = datetime(2026, 3, 1, 12)
+    record(c,
+           {'player': 'Alice', 'item': 'Abyssal whip', 'value': 100, 'timestamp': t},
+           {'player': 'Alice', 'item': 'Abyssal whip', 'drop_type': 'collection_log',
+            'timestamp': t + timedelta(seconds=2)})
+
+    rows = list(c['history_daily'].find({'player': 'Alice'}))
+    assert sum(row['count'] for row in rows) == 2
+    assert sum(row['drops'] for row in rows) == 1
+    assert sum(row['drop_value'] for row in rows) == 100
+
+
+def test_rollup_series_match_history(tenant):
+    c = tenant['collections']
+    t = datetime(2026, 3, 1, 12)
+    record(c,
+           {'player': 'Alice', 'item': 'Abyssal whip', 'value': 100, 'timestamp': t},
+           {'player': 'Alice', 'item': 'Abyssal whip', 'drop_type': 'collection_log',
+            'timestamp': t + timedelta(seconds=2)},
+           {'player': 'Alice', 'item': 'Bones', 'value': 1, 'timestamp': t + timedelta(days=1)},
+           {'player': 'Bob', 'item': 'Bones', 'value': 1, 'timestamp': datetime(2026, 4, 2, 8)})
+
+    summary = rollup_series(c)
+    assert summary['per_player'] == [{'player': 'Alice', 'drops': 2, 'value': 101},
+                                     {'player': 'Bob', 'drops': 1, 'value': 1}]
+    assert summary['top_items'] == [{'item': 'Bones', 'drops': 2, 'value': 2},
+                                     {'item': 'Abyssal whip', 'drops': 1, 'value': 100}]
+    assert summary['per_day'] == [{'date': '2026-03-01', 'drops': 1, 'value': 100},
+                                  {'date': '2026-03-02', 'drops': 1, 'value': 1},
+                                  {'date': '2026-04-02', 'drops': 1, 'value': 1}]
+    assert summary['per_month'] == [{'month': '2026-03', 'drops': 2, 'value': 101},
+                                    {'month': '2026-04', 'drops': 1, 'value': 1}]
+
+
+def test_utc_timezones():
+    assert bingo_api._is_utc_timezone('UTC')
+    assert bingo_api._is_utc_timezone('+00:00')
+    assert not bingo_api._is_utc_timezone('+01:00')
+    assert not bingo_api._is_utc_timezone('Europe/London')
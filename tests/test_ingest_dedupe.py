@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+
+import bingo_api
+
+
+@pytest.fixture
+def history(tenant):
+    collection = tenant['collections']['history']
+    # mongomock ignores partialFilterExpression, so the registered index is
+    # stood in for by a sparse one: same effect on docs with and without a key
+    collection.create_index('ingest_key', unique=True, sparse=True)
+    return collection
+
+
+def drop(item, ingest_key=None, value=0):
+    return bingo_api.build_history_doc('Zezima', item, value=value, timestamp=datetime(2026, 1, 1),
+                                       ingest_key=ingest_key)
+
+
+def test_replayed_ingest_keys_are_skipped(history):
+    first = bingo_api.insert_ingest_docs(history, [drop('Abyssal whip', 'msg-1:0'), drop('Dragon bones', 'msg-1:1')])
+    assert len(first) == 2
+
+    replay = bingo_api.insert_ingest_docs(history, [drop('Abyssal whip', 'msg-1:0'), drop('Big bones', 'msg-2:0'),
+                                                    drop('Dragon bones', 'msg-1:1')])
+    assert [doc['item'] for doc in replay] == ['Big bones']
+    assert history.count_documents({}) == 3
+
+
+def test_docs_without_a_key_are_not_deduplicated(history):
+    bingo_api.insert_ingest_docs(history, [drop('Abyssal whip'), drop('Abyssal whip')])
+    assert history.count_documents({}) == 2
+
+
+def test_inserted_docs_get_changed_at(history):
+    inserted = bingo_api.insert_ingest_docs(history, [drop('Abyssal whip', 'msg-1:0')])
+    assert isinstance(history.find_one({'_id': inserted[0]['_id']})['changed_at'], datetime)
+
+
+def test_duplicate_drop_does_not_count_twice_in_value_total(tenant, history):
+    collections = tenant['collections']
+    bingo_api.record_history_docs(collections, [drop('Abyssal whip', 'msg-1:0', value=1500000)], tenant['tenant_id'])
+    assert bingo_api.record_history_docs(
+        collections, [drop('Abyssal whip', 'msg-1:0', value=1500000)], tenant['tenant_id']) == []
+    assert bingo_api.get_value_total(collections) == 1500000
+
+
+def test_ingest_key_from_header_or_body():
+    with bingo_api.app.test_request_context(headers={'Idempotency-Key': 'abc'}):
+        assert bingo_api.get_ingest_key({}) == 'abc'
+        assert bingo_api.get_ingest_key({'idempotency_key': 42}) == '42'
+    with bingo_api.app.test_request_context():
+        assert bingo_api.get_ingest_key({}) is None
+
+
+def pb(time_seconds, ingest_key=None):
+    doc = {'player': 'Zezima', 'boss': 'Zulrah', 'time_seconds': time_seconds, 'time_string': '',
+           'party_size': 1, 'invocation_level': None, 'timestamp': datetime(2026, 1, 1)}
+    if ingest_key:
+        doc['ingest_key'] = ingest_key
+    return doc
+
+
+def test_pb_batch_dedupes_keys_by_index_and_keyless_by_fields(tenant):
+    pbs = tenant['collections']['personal_bests']
+    pbs.create_index('ingest_key', unique=True, sparse=True)
+    bingo_api.save_personal_bests(tenant['collections'], [pb(60, 'msg-1'), pb(70)])
+
+    inserted = bingo_api.save_personal_bests(tenant['collections'],
+                                             [pb(60, 'msg-1'), pb(70), pb(70), pb(80), pb(90, 'msg-2')])
+    assert [doc['time_seconds'] for doc in inserted] == [80, 90]
+    assert pbs.count_documents({}) == 4
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+import bingo_api
+
+NOW = datetime(2026, 1, 1)
+
+
+def row(player, **bosses):
+    return {'player': player, 'bosses': bosses, 'timestamp': NOW}
+
+
+def test_ties_share_a_rank_and_skip_the_next():
+    boards = bingo_api.compute_kc_leaderboards([
+        row('alice', zulrah=50), row('Bob', zulrah=80), row('carol', zulrah=50), row('dave', zulrah=10)
+    ])
+    assert [(e['player'], e['kc'], e['rank']) for e in boards['zulrah']] == [
+        ('Bob', 80, 1), ('alice', 50, 2), ('carol', 50, 2), ('dave', 10, 4)
+    ]
+
+
+def test_percentile_is_share_at_or_below():
+    boards = bingo_api.compute_kc_leaderboards([
+        row('alice', zulrah=50), row('Bob', zulrah=80), row('carol', zulrah=50), row('dave', zulrah=10)
+    ])
+    assert [e['percentile'] for e in boards['zulrah']] == [100.0, 75.0, 75.0, 25.0]
+
+
+def test_boards_are_per_boss_and_skip_excluded_and_missing_kc():
+    excluded = next(iter(bingo_api.EXCLUDED_BOSSES))
+    boards = bingo_api.compute_kc_leaderboards([
+        row('alice', zulrah=5, vorkath=None, **{excluded: 9}), row('Bob', vorkath=3)
+    ])
+    assert sorted(boards) == ['vorkath', 'zulrah']
+    assert [e['player'] for e in boards['vorkath']] == ['Bob']
+    assert boards['zulrah'][0] == {'player': 'alice', 'kc': 5, 'rank': 1, 'percentile': 100.0,
+                                   'timestamp': NOW.isoformat()}
+
+
+def test_endpoint_serves_fresh_boards_after_a_snapshot(client, tenant):
+    collections = tenant['collections']
+    headers = {'X-API-Key': tenant['api_key']}
+    bingo_api.write_kc_snapshots(collections, [
+        {'player': 'alice', 'bosses': {'zulrah': 5}, 'timestamp': NOW, 'snapshot_type': 'start'},
+        {'player': 'Bob', 'bosses': {'zulrah': 7}, 'timestamp': NOW, 'snapshot_type': 'start'}
+    ])
+    first = client.get('/kc/leaderboards', headers=headers).json
+    assert [e['player'] for e in first['leaderboards']['zulrah']] == ['Bob', 'alice']
+
+    bingo_api.write_kc_snapshots(collections, [
+        {'player': 'alice', 'bosses': {'zulrah': 9}, 'timestamp': NOW + timedelta(hours=3), 'snapshot_type': 'current'}
+    ])
+    second = client.get('/kc/leaderboards?limit=1', headers=headers).json
+    assert second['leaderboards']['zulrah'] == [
+        {'player': 'alice', 'kc': 9, 'rank': 1, 'percentile': 100.0,
+         'timestamp': (NOW + timedelta(hours=3)).isoformat()}
+    ]
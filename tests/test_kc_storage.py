@@ -0,0 +1,65 @@
+import random
+from datetime import datetime, timedelta
+
+import bingo_api
+
+
+def snapshot(player, bosses, hours, snapshot_type='current'):
+    return {'player': player, 'bosses': dict(bosses), 'timestamp': datetime(2026, 1, 1) + timedelta(hours=hours),
+            'snapshot_type': snapshot_type}
+
+
+def test_deltas_round_trip_through_keyframes(tenant):
+    collections = tenant['collections']
+    rng = random.Random(7)
+    bosses = {'zulrah': 10, 'vorkath': 5, 'kraken': 0}
+    expected = []
+    for i in range(bingo_api.KC_KEYFRAME_EVERY * 2 + 3):
+        boss = rng.choice(sorted(bosses))
+        bosses[boss] += rng.randint(1, 3)
+        if i == 5:
+            del bosses['kraken']  # a boss WOM stopped reporting is recorded as removed
+        expected.append(snapshot('Zezima', bosses, i, 'start' if i == 0 else 'current'))
+        bingo_api.write_kc_snapshots(collections, [expected[-1]])
+
+    stored = list(collections['kc'].find().sort('timestamp', 1))
+    assert sum('delta' in doc for doc in stored) > sum('delta' not in doc for doc in stored)
+    assert max(doc.get('depth', 0) for doc in stored) < bingo_api.KC_KEYFRAME_EVERY
+
+    # Sequential replay and the random-access reconstruction agree with what was written
+    assert [doc['bosses'] for doc in bingo_api.replay_kc_docs([dict(d) for d in stored])] == \
+        [s['bosses'] for s in expected]
+    shuffled = [dict(d) for d in stored]
+    rng.shuffle(shuffled)
+    bingo_api.reconstruct_kc_docs(collections['kc'], shuffled)
+    by_timestamp = {s['timestamp']: s['bosses'] for s in expected}
+    assert all(doc['bosses'] == by_timestamp[doc['timestamp']] for doc in shuffled)
+
+    latest = bingo_api.latest_kc_snapshots(collections['kc'])['Zezima']
+    assert latest['bosses'] == expected[-1]['bosses']
+    assert collections['kc_latest'].find_one({'player': 'Zezima'})['bosses'] == expected[-1]['bosses']
+
+
+def test_unchanged_snapshot_only_moves_kc_latest(tenant):
+    collections = tenant['collections']
+    bingo_api.write_kc_snapshots(collections, [snapshot('Zezima', {'zulrah': 10}, 0, 'start')])
+    bingo_api.write_kc_snapshots(collections, [snapshot('Zezima', {'zulrah': 12}, 1)])
+
+    written = bingo_api.write_kc_snapshots(collections, [snapshot('Zezima', {'zulrah': 12}, 5)])
+
+    assert written == [None]
+    assert collections['kc'].count_documents({}) == 2
+    row = collections['kc_latest'].find_one({'player': 'Zezima'})
+    assert row['timestamp'] == row['current_timestamp'] == datetime(2026, 1, 1, 5)
+
+
+def test_effort_live_and_as_of_an_end_date(tenant):
+    collections = tenant['collections']
+    bingo_api.write_kc_snapshots(collections, [snapshot('Zezima', {'zulrah': 10, 'vorkath': 1}, 0, 'start')])
+    bingo_api.write_kc_snapshots(collections, [snapshot('Zezima', {'zulrah': 15, 'vorkath': 1}, 24)])
+    bingo_api.write_kc_snapshots(collections, [snapshot('Zezima', {'zulrah': 30, 'vorkath': 4}, 48)])
+
+    live = bingo_api.kc_effort(collections)
+    assert [entry['effort'] for entry in live] == [{'zulrah': 20, 'vorkath': 3}]
+    ended = bingo_api.kc_effort(collections, until=datetime(2026, 1, 2, 12))
+    assert [entry['effort'] for entry in ended] == [{'zulrah': 5}]
@@ -0,0 +1,36 @@
+"""fetch_wom_group_bosses: members changed on WOM are read from the group's per-boss hiscores when that's cheaper."""
+import uuid
+
+import bingo_api
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.status_code = 200
+        self.payload = payload
+        self.text = ''
+
+    def json(self):
+        return self.payload
+
+
+def test_active_members_come_from_group_hiscores(monkeypatch):
+    names = [f'p{uuid.uuid4().hex[:6]}' for _ in range(3)]
+    calls = []
+
+    def fake_wom_get(url, timeout=10):
+        calls.append(url)
+        if '/hiscores' in url:
+            return FakeResponse([{'player': {'displayName': names[0]}, 'data': {'kills': 12}},
+                                 {'player': {'displayName': names[1]}, 'data': {'kills': 3}}])
+        return FakeResponse({'memberships': [{'player': {'displayName': n, 'updatedAt': 't1'}} for n in names]})
+
+    monkeypatch.setattr(bingo_api, 'wom_get', fake_wom_get)
+    monkeypatch.setattr(bingo_api, 'WOM_BOSS_MAPPING', {'zulrah': 'Zulrah'})
+
+    resolved, _ = bingo_api.fetch_wom_group_bosses(1)
+
+    assert len(calls) == 2  # roster + one hiscores page, rather than three player calls
+    assert resolved[bingo_api._wom_cache_key(names[0])] == {'Zulrah': 12}
+    assert resolved[bingo_api._wom_cache_key(names[1])] == {'Zulrah': 3}
+    assert bingo_api._wom_cache_key(names[2]) not in resolved  # no kills anywhere: left to a player call